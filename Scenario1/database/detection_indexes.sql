@@ -0,0 +1,10 @@
+-- /detections 목록 조회(최신순 keyset pagination)용 인덱스
+-- 조회 조건: (DETECTION_TIME, DETECTION_ID) < 커서 ORDER BY DETECTION_TIME DESC, DETECTION_ID DESC
+-- 인덱스를 역순으로 읽으므로 정렬 없이 페이지 크기만큼만 읽음 (카메라/위험도 필터는 선두 컬럼 인덱스 사용)
+
+CREATE INDEX DETECTION_TIME_ID_IDX ON DETECTION (DETECTION_TIME, DETECTION_ID);
+CREATE INDEX DETECTION_CAMERA_TIME_IDX ON DETECTION (CAMERA_ID, DETECTION_TIME, DETECTION_ID);
+CREATE INDEX DETECTION_RISK_TIME_IDX ON DETECTION (RISK_LEVEL, DETECTION_TIME, DETECTION_ID);
+
+-- DETECTION_OBJECT는 Scenario1/2/3 모두 JSON으로 저장 - JSON 필터 조회 시 형식 검사 (기존 str(dict) 행 정리 후 적용)
+-- ALTER TABLE DETECTION ADD CONSTRAINT DETECTION_OBJECT_JSON CHECK (DETECTION_OBJECT IS JSON) ENABLE NOVALIDATE;
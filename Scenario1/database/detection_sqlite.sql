@@ -0,0 +1,16 @@
+-- DETECTION 테이블의 로컬 SQLite 대체 스키마 (테스트/개발용 SQLiteDB)
+-- DETECTION_TIME은 'YYYY-MM-DD HH:MM:SS[.ffffff]' 문자열 (문자열 순서 = 시간 순서)
+
+CREATE TABLE IF NOT EXISTS detection (
+    detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    camera_id TEXT,
+    detection_time TEXT,
+    detection_object TEXT,
+    risk_level TEXT,
+    content TEXT,
+    image_url TEXT
+);
+
+CREATE INDEX IF NOT EXISTS detection_time_id_idx ON detection (detection_time, detection_id);
+CREATE INDEX IF NOT EXISTS detection_camera_time_idx ON detection (camera_id, detection_time, detection_id);
+CREATE INDEX IF NOT EXISTS detection_risk_time_idx ON detection (risk_level, detection_time, detection_id);
@@ -0,0 +1,117 @@
+# database/migrate_evidence.py
+# 구버전 DETECTION.IMAGE_URL(BLOB 이미지)을 증거 저장소로 옮기고 IMAGE_URL을 증거 ID(VARCHAR2(128)) 컬럼으로 변경
+#
+#   cd Scenario1 && EVIDENCE_DIR=<증거 저장소> python -m database.migrate_evidence
+#
+# 1) IMAGE_REF 컬럼 추가  2) BLOB 이미지를 증거 저장소에 저장하고 증거 ID를 IMAGE_REF에 기록 (배치마다 커밋)
+# 3) 옮기지 못한 행이 없을 때만 IMAGE_URL을 삭제하고 IMAGE_REF를 IMAGE_URL로 변경
+# 중간에 중단돼도 다시 실행하면 IMAGE_REF가 비어 있는 행부터 이어서 옮긴다.
+import os
+import sys
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from common.evidence_store import EvidenceStore
+
+# 이미 추가된 컬럼 (ORA-01430: column being added already exists in table)
+COLUMN_EXISTS_CODE = 1430
+
+
+def _read(value):
+    """Oracle BLOB(LOB 객체)은 바이트로 읽음"""
+    return value.read() if hasattr(value, 'read') else value
+
+
+def add_reference_column(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("ALTER TABLE DETECTION ADD IMAGE_REF VARCHAR2(128)")
+    except Exception as e:
+        code = getattr(e.args[0], 'code', None) if e.args else None
+        if code != COLUMN_EXISTS_CODE and 'duplicate column' not in str(e):
+            raise
+    finally:
+        cursor.close()
+
+
+def copy_images(connection, store, batch_size=100, dialect='oracle') -> tuple:
+    """IMAGE_REF가 비어 있는 BLOB 행을 증거 저장소로 옮김 -> (옮긴 행 수, 옮기지 못한 DETECTION_ID 목록)"""
+    migrated, failed = 0, []
+    last_id = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(
+                "SELECT DETECTION_ID, IMAGE_URL FROM DETECTION"
+                " WHERE DETECTION_ID > :last_id AND IMAGE_REF IS NULL AND IMAGE_URL IS NOT NULL"
+                " ORDER BY DETECTION_ID"
+                + (" FETCH FIRST :row_limit ROWS ONLY" if dialect == 'oracle' else " LIMIT :row_limit"),
+                {'last_id': last_id, 'row_limit': batch_size})
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for detection_id, image in rows:
+                last_id = detection_id
+                image_bytes = _read(image)
+                frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    failed.append(detection_id)
+                    continue
+                # 원본 JPEG 바이트를 그대로 저장 (다시 인코딩하지 않음)
+                updates.append({'evidence_id': store.save_evidence(frame, image_bytes),
+                                'detection_id': detection_id})
+            if updates:
+                cursor.executemany("UPDATE DETECTION SET IMAGE_REF = :evidence_id WHERE DETECTION_ID = :detection_id",
+                                   updates)
+                connection.commit()
+            migrated += len(updates)
+            print(f"Migrated {migrated} evidence images (last DETECTION_ID {last_id})")
+    finally:
+        cursor.close()
+    return migrated, failed
+
+
+def replace_image_column(connection):
+    """옮기지 못한 BLOB이 남아 있으면 컬럼을 삭제하지 않음"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM DETECTION WHERE IMAGE_URL IS NOT NULL AND IMAGE_REF IS NULL")
+        remaining = cursor.fetchone()[0]
+        if remaining:
+            raise RuntimeError(f"{remaining}건의 BLOB 이미지를 옮기지 못해 IMAGE_URL 컬럼을 유지합니다")
+        cursor.execute("ALTER TABLE DETECTION DROP COLUMN IMAGE_URL")
+        cursor.execute("ALTER TABLE DETECTION RENAME COLUMN IMAGE_REF TO IMAGE_URL")
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def migrate(connection, store, batch_size=100, dialect='oracle') -> int:
+    add_reference_column(connection)
+    migrated, failed = copy_images(connection, store, batch_size, dialect)
+    if failed:
+        print(f"Undecodable evidence images (not migrated): DETECTION_ID {failed}")
+    replace_image_column(connection)
+    return migrated
+
+
+def main():
+    import cx_Oracle
+    from database.config import DatabaseConfig
+
+    connection = cx_Oracle.connect(**DatabaseConfig().get_connection_params())
+    try:
+        migrated = migrate(connection, EvidenceStore())
+    finally:
+        connection.close()
+    print(f"Evidence migration complete: {migrated} images moved to the evidence store")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse, HTMLResponse, Response, FileResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from safewatch.db_config import OracleDB
+import os
 import uvicorn
 import asyncio
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
-from safewatch.util.stream import StreamHandler
+from safewatch.registry import CameraRegistry
+from safewatch.util.pipeline import PersistencePolicy, ViolationEventPolicy
+from safewatch.detection_config import DetectConfig
+from safewatch.detection_query import MAX_PAGE_SIZE, DetectionReader, decode_cursor
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from common.evidence_store import EVIDENCE_CACHE_HEADERS
+from common.spool import DetectionSpool, ReconnectingSink, spool_path
+from common.metrics import registry as metrics_registry, enable_stage_metrics
 
 app = FastAPI()
 
@@ -25,47 +32,82 @@ app.add_middleware(
 
 # 전역 변수
 detection_running = False
-latest_detection_result = None
-latest_detection_time = None
 
-# DB 연결 초기화
+# DB 저장 최소 간격 - 장면 변화로 추론된 결과를 놓치지 않도록 최소 추론 간격과 맞춤
+# (추론 시점은 카메라 레지스트리의 파이프라인이 장면 변화/heartbeat로 결정)
+PERSIST_INTERVAL = DetectConfig()['schedule']['min_interval']
+# 카메라별 DB 저장 정책
+persistence_policies = {}
+# 카메라별 위반 이벤트 정책 - 같은 작업자의 같은 위반은 재알림 간격마다만 저장
+REALERT_INTERVAL = DetectConfig()['tracking']['realert_interval']
+violation_policies = {}
+
+# 탐지 결과는 먼저 로컬 spool(SQLite)에 기록하고, drainer가 순서대로 DB에 배치 저장
+# (DB 연결은 첫 저장 시 생성하고 실패하면 재연결 - DB가 내려가 있어도 이벤트를 잃지 않음)
 try:
-    db = OracleDB()
+    db = DetectionSpool(spool_path("scenario1"), ReconnectingSink(OracleDB), name="scenario1",
+                        max_attempts=int(os.getenv("SPOOL_MAX_ATTEMPTS", "10")),
+                        max_pending=int(os.getenv("SPOOL_MAX_PENDING", "100000")))
 except Exception as e:
-    print(f"Database connection failed: {e}")
+    print(f"Detection spool initialization failed: {e}")
     db = None
 
+# /detections 조회용 DB 연결 (spool과 별개, 첫 조회 시 연결하고 오류 시 다시 연결)
+detection_reader = DetectionReader(OracleDB)
+
 thread_pool = ThreadPoolExecutor(max_workers=3)
 
+# 단계별 처리 시간을 /metrics 히스토그램으로 기록
+enable_stage_metrics()
+
 async def continuous_detection():
-    """10초마다 객체 탐지를 수행하는 백그라운드 태스크"""
-    global detection_running, latest_detection_result, latest_detection_time
+    """파이프라인 링 버퍼의 탐지 결과를 저장 정책에 따라 DB에 저장하는 백그라운드 태스크"""
+    global detection_running
     
     while detection_running:
-        if not hasattr(app.state, 'stream_handler'):
-            print("StreamHandler not initialized")
+        if not hasattr(app.state, 'registry'):
+            print("CameraRegistry not initialized")
             await asyncio.sleep(5)
             continue
             
-        try:
-            # 스트리밍과 독립적으로 프레임 읽기
-            frame = app.state.stream_handler.read_frame()
-            if frame is not None:
-                # Thread Pool 활용 detection 처리
+        for stream_handler in app.state.registry:
+            try:
+                policy = persistence_policies.setdefault(
+                    stream_handler.camera_id, PersistencePolicy(interval=PERSIST_INTERVAL))
+                # 별도 추론 없이 파이프라인이 만든 최신 결과를 사용
+                record = policy.select(stream_handler.results)
+                if record is None:
+                    continue
                 loop = asyncio.get_event_loop()
-                # DB 저장을 위한 detection (save_to_db=True) >> ThreadPoolExecutor 활용 처리 개선
-                detection_results = await loop.run_in_executor(thread_pool, partial(
-                    app.state.stream_handler.detector.process_detections,frame,save_to_db=True)
-                )         
-                # detection_results = app.state.stream_handler.detector.process_detections(frame, save_to_db=True)
-                latest_detection_result = detection_results
-                latest_detection_time = datetime.now()
-                print(f"Detection completed at {latest_detection_time}")
-            
-        except Exception as e:
-            print(f"Error during detection: {e}")
-        # 객체 탐지 루프 10초 
-        await asyncio.sleep(10)
+                # DB 저장 >> ThreadPoolExecutor 활용 처리
+                await loop.run_in_executor(thread_pool, partial(save_record, stream_handler, record))
+                policy.mark_persisted(record)
+                print(f"Detection completed at {record['captured_at']} "
+                      f"({stream_handler.camera_id} frame #{record['seq']})")
+                
+            except Exception as e:
+                print(f"Error during detection: {e}")
+        await asyncio.sleep(1)
+
+def save_record(stream_handler, record):
+    """위반이 시작/변경된 트랙만 DB에 저장 - 증거 이미지는 스트리밍과 같은 인코딩 캐시를 사용"""
+    policy = violation_policies.setdefault(
+        stream_handler.camera_id, ViolationEventPolicy(realert_interval=REALERT_INTERVAL))
+    events = policy.select(record['results'])
+    if not events:
+        return
+    image_bytes = stream_handler.encode_record(record)
+    stream_handler.detector.save_detections(record['frame'], events,
+                                            stream_handler.camera_id, image_bytes=image_bytes)
+
+def get_stream_handler(camera_id: str = None):
+    """camera_id에 해당하는 StreamHandler 조회 (없으면 기본 카메라)"""
+    registry = getattr(app.state, 'registry', None)
+    if registry is None:
+        return None
+    if camera_id is None:
+        return registry.default
+    return registry.get(camera_id)
  
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -74,16 +116,20 @@ async def root(request: Request):
 @app.on_event("startup")
 async def startup_event():
     """앱 시작 시 객체 탐지 태스크 시작"""
-    app.state.stream_handler = StreamHandler(db_connection=db)
+    app.state.registry = CameraRegistry(db_connection=db)
     global detection_running
     detection_running = True
     asyncio.create_task(continuous_detection())
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    if hasattr(app.state, 'stream_handler'):
-        app.state.stream_handler.cleanup()
+    if hasattr(app.state, 'registry'):
+        app.state.registry.cleanup()
     thread_pool.shutdown(wait=True)
+    detection_reader.close()
+    # 대기 중인 탐지 결과 저장을 시도한 뒤 종료 (남은 결과는 spool 파일에서 다음 시작 시 저장)
+    if db is not None:
+        db.close()
 
 @app.get("/start_detection")
 async def start_detection():
@@ -91,6 +137,7 @@ async def start_detection():
     global detection_running
     if not detection_running:
         detection_running = True
+        app.state.registry.set_detection_enabled(True)
         asyncio.create_task(continuous_detection())
         return {"status": "success", "message": "Detection started"}
     return {"status": "info", "message": "Detection already running"}
@@ -101,13 +148,23 @@ async def stop_detection():
     global detection_running
     if detection_running:
         detection_running = False
+        app.state.registry.set_detection_enabled(False)
         return {"status": "success", "message": "Detection stopped"}
     return {"status": "info", "message": "Detection not running"}
 
 @app.get("/latest_result")
 async def get_latest_result():
-    """가장 최근 탐지 결과 조회"""
-    if latest_detection_result is None:
+    """가장 최근 탐지 결과 조회 (기본 카메라)"""
+    return latest_result_response(get_stream_handler())
+
+@app.get("/cameras/{camera_id}/latest_result")
+async def get_camera_latest_result(camera_id: str):
+    """카메라별 가장 최근 탐지 결과 조회"""
+    return latest_result_response(require_stream_handler(camera_id))
+
+def latest_result_response(stream_handler):
+    record = stream_handler.results.latest() if stream_handler else None
+    if record is None:
         return {
             "status": "error",
             "message": "No detection results available yet"
@@ -115,37 +172,163 @@ async def get_latest_result():
     
     return {
         "status": "success",
-        "data": latest_detection_result,
-        "timestamp": latest_detection_time
+        "camera_id": stream_handler.camera_id,
+        "data": record['results'],
+        "timestamp": record['captured_at'],
+        "seq": record['seq']
     }
+
+def require_stream_handler(camera_id: str):
+    stream_handler = get_stream_handler(camera_id)
+    if stream_handler is None:
+        raise HTTPException(status_code=404, detail=f"Unknown camera: {camera_id}")
+    return stream_handler
     
 @app.get("/video_feed")
 async def video_feed():
     return StreamingResponse(
-        app.state.stream_handler.generate_frames(draw_detection=True),
+        get_stream_handler().stream_frames(draw_detection=True),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
     
 @app.get("/raw_feed")
 async def raw_feed():
     return StreamingResponse(
-        app.state.stream_handler.generate_frames(draw_detection=False),
+        get_stream_handler().stream_frames(draw_detection=False),
         media_type = "multipart/x-mixed-replace; boundary=frame"
     )
+
+@app.get("/cameras/{camera_id}/video_feed")
+async def camera_video_feed(camera_id: str):
+    return StreamingResponse(
+        require_stream_handler(camera_id).stream_frames(draw_detection=True),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+@app.get("/cameras/{camera_id}/raw_feed")
+async def camera_raw_feed(camera_id: str):
+    return StreamingResponse(
+        require_stream_handler(camera_id).stream_frames(draw_detection=False),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+@app.get("/snapshot.jpg")
+async def snapshot(annotated: bool = True, quality: int = None):
+    """기본 카메라의 최신 프레임 JPEG (인코딩 캐시에서 제공)"""
+    return await snapshot_response(get_stream_handler(), annotated, quality)
+
+@app.get("/cameras/{camera_id}/snapshot.jpg")
+async def camera_snapshot(camera_id: str, annotated: bool = True, quality: int = None):
+    return await snapshot_response(require_stream_handler(camera_id), annotated, quality)
+
+async def snapshot_response(stream_handler, annotated: bool, quality: int):
+    if stream_handler is None:
+        raise HTTPException(status_code=404, detail="No camera available")
+    loop = asyncio.get_event_loop()
+    # 캐시에 없을 때의 인코딩은 이벤트 루프 밖에서 수행
+    image_bytes = await loop.run_in_executor(
+        thread_pool, partial(stream_handler.snapshot, annotated, quality))
+    if image_bytes is None:
+        raise HTTPException(status_code=404, detail="No frame available yet")
+    return Response(content=image_bytes, media_type="image/jpeg",
+                    headers={"Cache-Control": "no-store"})
+
+@app.get("/evidence/{evidence_id}")
+async def get_evidence(evidence_id: str, variant: str = "frame"):
+    """DB의 image_url(증거 ID)로 증거 이미지 조회 - variant: frame/crop/thumb"""
+    registry = getattr(app.state, 'registry', None)
+    if registry is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    path = registry.detector.evidence_store.path_for(evidence_id, variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    # 내용 주소 기반 파일이라 내용이 바뀌지 않으므로 장기 캐시 허용
+    return FileResponse(path, media_type="image/jpeg",
+                        headers={**EVIDENCE_CACHE_HEADERS, "ETag": f'"{evidence_id}.{variant}"'})
+
+@app.get("/detections")
+async def list_detections(camera_id: str = None, start: datetime = None, end: datetime = None,
+                          risk_level: str = None, content: str = None, cursor: str = None, limit: int = 50):
+    """저장된 탐지 이력 조회 (최신순, 이미지 제외)
+
+    start/end: 탐지 시각 범위 [start, end), risk_level: 위험도 (쉼표로 여러 개), content: 내용에 포함된 문자열
+    다음 페이지는 응답의 next_cursor를 cursor로 전달 (없으면 마지막 페이지)
+    이미지는 /detections/{detection_id}/image 로 한 건씩 조회
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit은 1~{MAX_PAGE_SIZE} 사이여야 합니다.")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    risk_levels = [level.strip().upper() for level in risk_level.split(',') if level.strip()] if risk_level else None
+
+    loop = asyncio.get_event_loop()
+    try:
+        page = await loop.run_in_executor(thread_pool, partial(
+            detection_reader.list_detections, camera_id=camera_id, start=start, end=end,
+            risk_levels=risk_levels, content=content, cursor=cursor, limit=limit))
+    except Exception as e:
+        print(f"Error querying detections: {e}")
+        raise HTTPException(status_code=503, detail="Detection database unavailable")
+    return {
+        "status": "success",
+        "data": [dict(item, image=f"/detections/{item['detection_id']}/image") for item in page['items']],
+        "next_cursor": page['next_cursor']
+    }
+
+@app.get("/detections/{detection_id}/image")
+async def get_detection_image(detection_id: int, variant: str = "frame"):
+    """탐지 1건의 증거 이미지 - variant: frame/crop/thumb"""
+    loop = asyncio.get_event_loop()
+    try:
+        image_ref = await loop.run_in_executor(thread_pool, detection_reader.get_image_ref, detection_id)
+    except Exception as e:
+        print(f"Error querying detection image: {e}")
+        raise HTTPException(status_code=503, detail="Detection database unavailable")
+    if not image_ref:
+        raise HTTPException(status_code=404, detail="Detection image not found")
+    return await get_evidence(image_ref, variant)
+
+@app.get("/cameras")
+async def list_cameras():
+    """등록된 카메라 목록 조회"""
+    registry = getattr(app.state, 'registry', None)
+    return {"cameras": registry.camera_ids() if registry else []}
     
 @app.get("/status")
 async def get_status():
     """현재 탐지 상태 조회"""
-    stream_handler = getattr(app.state, 'stream_handler', None)
+    stream_handler = get_stream_handler()
     camera_status = "connected" if (stream_handler and stream_handler.camera) else "disconnected"
     detector_status = "initialized" if (stream_handler and stream_handler.detector) else "not initialized"
+    record = stream_handler.results.latest() if stream_handler else None
+    registry = getattr(app.state, 'registry', None)
     
     return {
         "detection_running": detection_running,
-        "latest_detection_time": latest_detection_time,
+        "latest_detection_time": record['captured_at'] if record else None,
         "camera_status": camera_status,
-        "detector_status": detector_status
+        "detector_status": detector_status,
+        "camera_count": len(registry) if registry else 0,
+        "last_batch_size": registry.inference.last_batch_size if registry else 0,
+        "execution_mode": registry.execution_mode if registry else None,
+        "workers": registry.inference.stats() if registry and registry.execution_mode == 'process' else None,
+        # 마지막 추론 사유 (viewer/motion/heartbeat/startup)
+        "last_trigger_reason": stream_handler.scheduler.last_reason if stream_handler else None,
+        "last_trigger_time": stream_handler.scheduler.last_trigger_time if stream_handler else None,
+        "triggers": {handler.camera_id: handler.scheduler.last_reason for handler in registry} if registry else {},
+        # 키프레임 모드의 카메라별 추론 간격(K)/추론 지연
+        "keyframes": {handler.camera_id: handler.keyframes.stats() for handler in registry}
+                     if registry and registry.keyframe_enabled else None,
+        "db_spool": db.get_stats() if db is not None else None
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (캡처 FPS, 단계별 지연 시간, DB 큐, 스트림 클라이언트 등)"""
+    return PlainTextResponse(metrics_registry.render(), media_type=metrics_registry.content_type)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 시나리오 공용 모듈(common) 경로 추가
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
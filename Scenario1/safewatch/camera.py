@@ -1,19 +1,24 @@
 import cv2
 
 class Camera:
-    def __init__(self):
-        self.camera = cv2.VideoCapture(1)
+    def __init__(self, source=1, width=640, height=480, fps=30):
+        # source: 장치 번호(int) 또는 RTSP/동영상 경로(str)
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.camera = cv2.VideoCapture(source)
         self.setup_camera()
         
     def setup_camera(self):
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
+        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.camera.set(cv2.CAP_PROP_FPS, self.fps)
 
     def read_frame(self):
         success, frame = self.camera.read()
         if success:
-            return cv2.resize(frame, (640, 480))
+            return cv2.resize(frame, (self.width, self.height))
         return None
     
     def release(self):
@@ -0,0 +1,44 @@
+import json
+import os
+from dotenv import load_dotenv
+
+class CameraConfig:
+    """카메라 목록 설정 (CAMERA_CONFIG 경로의 JSON 파일 또는 단일 카메라 환경변수)"""
+    def __init__(self, config_path=None):
+        load_dotenv()
+
+        config_path = config_path or os.getenv('CAMERA_CONFIG', '')
+        if config_path and os.path.exists(config_path):
+            with open(config_path, encoding='utf-8') as f:
+                cameras = json.load(f)
+        else:
+            # 설정 파일이 없으면 기존과 동일하게 카메라 1대로 동작
+            cameras = [{
+                'camera_id': os.getenv('CAMERA_ID', 'CAM_001'),
+                'source': os.getenv('CAMERA_SOURCE', '1')
+            }]
+
+        self.cameras = [self._normalize(camera) for camera in cameras]
+
+    @staticmethod
+    def _normalize(camera):
+        source = camera['source']
+        # "0", "1" 처럼 숫자 문자열이면 장치 번호로 변환
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        return {
+            'camera_id': camera['camera_id'],
+            'source': source,
+            'width': camera.get('width', 640),
+            'height': camera.get('height', 480),
+            'fps': camera.get('fps', 30)
+        }
+
+    def __getitem__(self, index):
+        return self.cameras[index]
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def get_cameras(self):
+        return self.cameras
@@ -3,12 +3,14 @@ from datetime import datetime
 import json
 import os
 import sys
+from typing import Optional
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from database.config import DatabaseConfig
+from safewatch.detection_query import build_list_query, read_image_ref, to_page
 
 class OracleDB:
     def __init__(self):
@@ -22,23 +24,37 @@ class OracleDB:
         
     def insert_detection(self, camera_id: str, detection_time: datetime, 
                         detection_object: dict, risk_level: str, 
-                        content: str, image_url: bytes):
+                        content: str, image_url: str):
+        self.insert_detections([{
+            'camera_id': camera_id,
+            'detection_time': detection_time,
+            'detection_object': detection_object,
+            'risk_level': risk_level,
+            'content': content,
+            'image_url': image_url
+        }])
+
+    def insert_detections(self, records: list):
+        """여러 탐지 결과를 array DML(executemany)로 한 번에 INSERT 후 1회 커밋"""
+        if not records:
+            return
         cursor = self.connection.cursor()
         try:
-            detection_object_json = json.dumps(detection_object)
-            
-            blob_var = cursor.var(cx_Oracle.BLOB)
-            blob_var.setvalue(0, image_url)
+            rows = [
+                (record['camera_id'], record['detection_time'],
+                 json.dumps(record['detection_object']), record['risk_level'],
+                 record['content'], record['image_url'])
+                for record in records
+            ]
             
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO detection
                 (detection_id, camera_id, detection_time, detection_object, 
                  risk_level, content, image_url)
                 VALUES 
                 (detection_id_seq.NEXTVAL, :1, :2, :3, :4, :5, :6)
                 """, 
-                (camera_id, detection_time, detection_object_json,
-                 risk_level, content, blob_var)
+                rows
             )
             
             self.connection.commit()
@@ -50,6 +66,33 @@ class OracleDB:
         finally:
             cursor.close()
             
+    def list_detections(self, camera_id: Optional[str] = None, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, risk_levels: Optional[list] = None,
+                        content: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """탐지 이력 한 페이지 (최신순, 이미지 컬럼 제외) -> {'items': [...], 'next_cursor': ...}
+
+        인덱스는 database/detection_indexes.sql 참고
+        """
+        sql, params = build_list_query('oracle', camera_id, start, end, risk_levels, content, cursor, limit)
+        db_cursor = self.connection.cursor()
+        try:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+        finally:
+            db_cursor.close()
+        return to_page(rows, limit)
+
+    def get_image_ref(self, detection_id: int):
+        """탐지 1건의 IMAGE_URL (증거 ID) - 없으면 None"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT image_url FROM detection WHERE detection_id = :detection_id",
+                           {'detection_id': detection_id})
+            row = cursor.fetchone()
+            return read_image_ref(row[0]) if row else None
+        finally:
+            cursor.close()
+
     def close(self):
         if self.connection:
             self.connection.close()
@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+from safewatch.detection_query import build_list_query, read_image_ref, to_page
+
+# DETECTION 테이블 대체 스키마 (Oracle 인덱스와 같은 구성)
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'database', 'detection_sqlite.sql')
+
+
+def _to_db_time(value: datetime) -> str:
+    return value.isoformat(sep=' ')
+
+
+class SQLiteDB:
+    """OracleDB와 같은 인터페이스를 가진 로컬 SQLite 대체 DB (테스트/개발용)"""
+
+    def __init__(self, path: str = ":memory:"):
+        # 백그라운드 writer 스레드에서도 사용하므로 스레드 검사 해제 후 lock으로 보호
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with open(SCHEMA_PATH, encoding='utf-8') as f:
+            self.connection.executescript(f.read())
+        self.connection.commit()
+
+    def insert_detection(self, camera_id: str, detection_time: datetime,
+                         detection_object: dict, risk_level: str,
+                         content: str, image_url: str):
+        self.insert_detections([{
+            'camera_id': camera_id,
+            'detection_time': detection_time,
+            'detection_object': detection_object,
+            'risk_level': risk_level,
+            'content': content,
+            'image_url': image_url
+        }])
+
+    def insert_detections(self, records: list):
+        if not records:
+            return
+        rows = [
+            (record['camera_id'], _to_db_time(record['detection_time']),
+             json.dumps(record['detection_object']), record['risk_level'],
+             record['content'], record['image_url'])
+            for record in records
+        ]
+        with self.lock:
+            try:
+                self.connection.executemany("""
+                    INSERT INTO detection
+                    (camera_id, detection_time, detection_object, risk_level, content, image_url)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+                self.connection.commit()
+            except Exception as e:
+                print(f"Error inserting data: {e}")
+                self.connection.rollback()
+                raise
+
+    def list_detections(self, camera_id: Optional[str] = None, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, risk_levels: Optional[list] = None,
+                        content: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """탐지 이력 한 페이지 (이미지 제외) - OracleDB.list_detections와 같은 결과 형식"""
+        sql, params = build_list_query('sqlite', camera_id, start, end, risk_levels, content, cursor, limit,
+                                       to_db_time=_to_db_time)
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return to_page(rows, limit, from_db_time=datetime.fromisoformat)
+
+    def get_image_ref(self, detection_id: int):
+        """탐지 1건의 IMAGE_URL (증거 ID) - 없으면 None"""
+        with self.lock:
+            row = self.connection.execute("SELECT image_url FROM detection WHERE detection_id = ?",
+                                          (detection_id,)).fetchone()
+        return read_image_ref(row[0]) if row else None
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM detection").fetchone()[0]
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
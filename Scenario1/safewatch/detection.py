@@ -1,100 +1,106 @@
-from ultralytics import YOLO
+import time
 import cv2
 from datetime import datetime
-from safewatch.util.check_overlap import check_overlap
+from safewatch.util.ppe import extract_boxes, filter_detections, match_ppe, person_regions
 from safewatch.detection_config import DetectConfig
+from common.evidence_store import EvidenceStore
+from common.inference import create_engine
+from common.profiling import stage_timer
+from common.metrics import DB_RECORDS, DETECTIONS, INFERENCE_SECONDS
 
 class SafetyDetector:
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, evidence_store=None, load_model=True):
         config_dict = DetectConfig()
         self.CLASS_NAMES = config_dict['classes']
         self.COLORS = config_dict['colors']
         self.CONF_THRESHOLDS = config_dict['thresholds']
-        self.model = YOLO('models/best_final.pt')
-        self.model.conf = min(self.CONF_THRESHOLDS.values())
-        self.model.iou = 0.5
+        # 추론 백엔드/장치/스레드 수는 INFERENCE_BACKEND, INFERENCE_DEVICE, INFERENCE_THREADS 로 설정
+        # load_model=False: 추론을 작업 프로세스가 맡는 경우 (저장/추적만 사용)
+        self.model = create_engine('models/best_final.pt',
+                                   conf=min(self.CONF_THRESHOLDS.values()), iou=0.5) if load_model else None
         self.db = db_connection
+        # 증거 이미지는 DB BLOB 대신 로컬 내용 주소 저장소에 저장
+        self.evidence_store = evidence_store or EvidenceStore()
 
-    def process_detections(self, frame, save_to_db=True):
+    def process_detections(self, frame, save_to_db=True, camera_id="CAM_001", tracker=None):
         """객체를 탐지하고 결과를 반환하는 함수"""
-        results = self.model(frame, verbose=False)
-        detections = {
-            'human': [],
-            'hard_hat': [],
-            'safety_vest': []
+        results = self.run_model(frame)
+        detection_results = self.process_results(frame, results, tracker)
+
+        # DB 저장 로직
+        if save_to_db:
+            self.save_detections(frame, detection_results, camera_id)
+
+        return detection_results
+
+    def process_batch(self, frames, trackers=None, timestamps=None):
+        """여러 카메라의 프레임을 한 번의 배치 추론으로 처리하는 함수
+
+        trackers/timestamps: 프레임별(카메라별) 사람 추적기와 캡처 시각(초)
+        """
+        if not frames:
+            return []
+        trackers = trackers or [None] * len(frames)
+        timestamps = timestamps or [None] * len(frames)
+        results = self.run_model(list(frames))
+        return [self.process_results(frame, [r], tracker, now)
+                for frame, r, tracker, now in zip(frames, results, trackers, timestamps)]
+
+    def run_model(self, source):
+        """모델 호출 (프레임 1장 또는 목록) - 호출 시간만 INFERENCE_SECONDS로 기록"""
+        start = time.perf_counter()
+        results = self.model(source)
+        INFERENCE_SECONDS.observe(time.perf_counter() - start)
+        return results
+
+    def process_results(self, frame, results, tracker=None, now=None):
+        """모델 출력을 사람별 안전장비 착용 결과로 변환하고 프레임에 시각화하는 함수
+
+        tracker가 있으면 사람마다 프레임 간에 유지되는 track_id를 붙인다.
+        """
+        analysis = self.analyze(results)
+        track_ids = self.assign_tracks(analysis, tracker, now)
+        return self.annotate(frame, analysis, track_ids)
+
+    def analyze(self, results):
+        """모델 출력 -> 사람 박스와 사람별 안전장비 착용 여부 (NumPy 배열만 담은 작은 dict)
+
+        {'human': (N,4), 'conf': (N,), 'head_regions': (N,4), 'body_regions': (N,4),
+         'helmet': (N,) bool, 'vest': (N,) bool}
+        """
+        # 객체 검출 로직 (클래스 필터링/임계값 적용을 배열 단위로 처리)
+        with stage_timer.stage('postprocess'):
+            xyxy, cls, conf = extract_boxes(results)
+            detections = filter_detections(xyxy, cls, conf, self.CLASS_NAMES, self.CONF_THRESHOLDS)
+            # 머리/몸통 영역과 사람-안전장비 겹침 행렬 계산
+            head_regions, body_regions, helmet_flags, vest_flags = match_ppe(detections)
+        return {
+            'human': detections['human']['bbox'],
+            'conf': detections['human']['conf'],
+            'head_regions': head_regions,
+            'body_regions': body_regions,
+            'helmet': helmet_flags,
+            'vest': vest_flags
         }
-        
-        # 객체 검출 로직 
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                if cls >= len(self.CLASS_NAMES):
-                    continue
-                
-                class_name = self.CLASS_NAMES[cls]
-                if class_name == 'box':
-                    continue
-                
-                class_threshold = self.CONF_THRESHOLDS[class_name]
-                if conf >= class_threshold:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    detections[class_name].append({
-                        'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                        'conf': conf
-                    })
-        
+
+    @staticmethod
+    def assign_tracks(analysis, tracker=None, now=None):
+        """사람별 track_id 목록 (추적기가 없거나 추적되지 않은 사람은 None)"""
+        if tracker is None or len(analysis['human']) == 0:
+            return [None] * len(analysis['human'])
+        with stage_timer.stage('postprocess'):
+            return [track_id if track_id >= 0 else None for track_id in
+                    tracker.update(analysis['human'], analysis['conf'], now).tolist()]
+
+    def annotate(self, frame, analysis, track_ids):
+        """사람별 위험도 판정 후 프레임에 시각화하고 탐지 결과 목록을 반환"""
         detection_results = []
-        text_y_offset = 30 
-        
-        # 사람이 검출되지 않았을 경우 메시지 표시
-        if not detections['human']:
-            cv2.putText(frame, "No Person Detected", (10, text_y_offset), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 1)
-            return detection_results
-        
-        # 각 사람별 처리
-        for person in detections['human']:
-            # 영역 계산
-            px1, py1, px2, py2 = person['bbox']
-            person_height = py2 - py1
-            person_width = px2 - px1
-            
-            # 머리 영역 계산
-            head_height = int(person_height * 0.17)  
-            head_width = int(person_width * 0.4)    
-            
-            head_center_x = (px1 + px2) // 2
-            head_x1 = int(head_center_x - head_width // 2)
-            head_x2 = int(head_center_x + head_width // 2)
-            
-            head_region = (head_x1, py1, head_x2, py1 + head_height)
-            
-            # 몸통 영역 계산
-            gap = person_height // 15
-            body_width = int(person_width * 0.7)
-            body_center_x = (px1 + px2) // 2
-            body_x1 = int(body_center_x - body_width // 2)
-            body_x2 = int(body_center_x + body_width // 2)
-            body_start = py1 + head_height + gap
-            body_region = (body_x1, body_start, body_x2, py2)
-            
-            # 안전장비 감지
-            helmet_detected = False
-            for helmet in detections['hard_hat']:
-                hx1, hy1, hx2, hy2 = helmet['bbox']
-                if check_overlap(head_region, (hx1, hy1, hx2, hy2)):
-                    helmet_detected = True
-                    break
-            
-            vest_detected = False
-            for vest in detections['safety_vest']:
-                vx1, vy1, vx2, vy2 = vest['bbox']
-                if check_overlap(body_region, (vx1, vy1, vx2, vy2)):
-                    vest_detected = True
-                    break
+
+        # 각 사람별 위험도 판정
+        for i, person_bbox in enumerate(analysis['human'].tolist()):
+            px1, py1, px2, py2 = person_bbox
+            helmet_detected = bool(analysis['helmet'][i])
+            vest_detected = bool(analysis['vest'][i])
             
             # 미착용 항목 저장
             undetected_items = []
@@ -119,6 +125,8 @@ class SafetyDetector:
 
             person_info = {
                 'detection_time': datetime.now(),
+                'track_id': track_ids[i],
+                'bbox': (px1, py1, px2, py2),
                 'detection_object': ",".join(undetected_items) if undetected_items else "None",                
                 'risk_level': risk_level,
                 'content': content,
@@ -126,36 +134,35 @@ class SafetyDetector:
                 'vest_detected': vest_detected
             }
             
-            # DB 저장 로직
-            if save_to_db and risk_level != "SAFE" and undetected_items and self.db is not None:
-                current_time = datetime.now()
-                try:
-                    _, img_encoded = cv2.imencode('.jpg', frame)
-                    img_bytes = img_encoded.tobytes()
-                    
-                    detection_info = {
-                        "camera_id": "CAM_001",
-                        "detection_time": current_time,
-                        'detection_object' : {'hard_hat' : helmet_detected, 'safety_vest' : vest_detected},
-                        "risk_level": risk_level,
-                        "content": content
-                    }
-                    
-                    self.db.insert_detection(
-                        camera_id=detection_info["camera_id"],
-                        detection_time=detection_info["detection_time"],
-                        detection_object=detection_info["detection_object"],
-                        risk_level=detection_info["risk_level"],
-                        content=detection_info["content"],
-                        image_url=img_bytes
-                    )
-                    
-                    print(f"Detection saved to DB at {current_time} - Undetected items: {undetected_items}")
-                    
-                except Exception as e:
-                    print(f"Error saving to database: {e}")
-            
             detection_results.append(person_info)
+            DETECTIONS.labels(risk_level).inc()
+
+        self.draw(frame, detection_results)
+        return detection_results
+
+    def draw(self, frame, detection_results):
+        """탐지 결과(사람 박스/착용 여부)를 프레임에 시각화
+
+        키프레임 모드에서는 추론하지 않은 프레임에 추적기가 옮긴 박스로 호출된다
+        (머리/몸통 영역은 사람 박스에서 다시 계산).
+        """
+        text_y_offset = 30 
+        
+        # 사람이 검출되지 않았을 경우 메시지 표시
+        if not detection_results:
+            cv2.putText(frame, "No Person Detected", (10, text_y_offset), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 1)
+            return
+        
+        draw_start = time.perf_counter()
+        head_regions, body_regions = person_regions([person_info['bbox'] for person_info in detection_results])
+        for i, person_info in enumerate(detection_results):
+            px1, py1, px2, py2 = person_info['bbox']
+            head_region = tuple(head_regions[i].tolist())
+            body_region = tuple(body_regions[i].tolist())
+            helmet_detected = person_info['helmet_detected']
+            vest_detected = person_info['vest_detected']
+            track_id = person_info['track_id']
 
             # 시각화
             cv2.rectangle(frame, (px1, py1), (px2, py2), self.COLORS['human'], 2)
@@ -174,13 +181,66 @@ class SafetyDetector:
                             self.COLORS['safety_vest'], 2)
             
             # 좌측 상단에 상태 텍스트 표시
-            status_text = f"Person {len(detection_results)}: Safety Hat: {'OK' if helmet_detected else 'X'}"
+            person_label = f"#{track_id}" if track_id is not None else i + 1
+            status_text = f"Person {person_label}: Safety Hat: {'OK' if helmet_detected else 'X'}"
             status_text += f" | Vest: {'OK' if vest_detected else 'X'}"
             cv2.putText(frame, status_text, (10, text_y_offset), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, text_color, 2)
-            cv2.putText(frame, f"Risk Level: {risk_level}", (10, text_y_offset + 20), 
+            cv2.putText(frame, f"Risk Level: {person_info['risk_level']}", (10, text_y_offset + 20), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, text_color, 2)
             
             text_y_offset += 50  
 
-        return detection_results
\ No newline at end of file
+        stage_timer.add('draw', time.perf_counter() - draw_start)
+
+    def save_detections(self, frame, detection_results, camera_id="CAM_001", image_bytes=None):
+        """안전장비 미착용 인원의 탐지 결과를 DB에 저장하는 함수
+
+        image_bytes: 이미 인코딩된 프레임 (없으면 프레임당 한 번만 인코딩)
+        이미지는 증거 저장소에 저장하고 DB의 image_url에는 증거 ID만 기록
+        """
+        if self.db is None:
+            return
+
+        for person_info in detection_results:
+            if person_info['risk_level'] == "SAFE":
+                continue
+
+            current_time = datetime.now()
+            try:
+                if image_bytes is None:
+                    _, img_encoded = cv2.imencode('.jpg', frame)
+                    image_bytes = img_encoded.tobytes()
+                # 전체 프레임은 한 번만 저장되고, 사람별 crop/썸네일이 추가됨
+                evidence_id = self.evidence_store.save_evidence(frame, image_bytes,
+                                                                person_info.get('bbox'))
+
+                detection_info = {
+                    "camera_id": camera_id,
+                    "detection_time": current_time,
+                    'detection_object' : {'hard_hat' : person_info['helmet_detected'],
+                                          'safety_vest' : person_info['vest_detected'],
+                                          'track_id' : person_info.get('track_id'),
+                                          'event' : person_info.get('event')},
+                    "risk_level": person_info['risk_level'],
+                    "content": person_info['content']
+                }
+
+                saved = self.db.insert_detection(
+                    camera_id=detection_info["camera_id"],
+                    detection_time=detection_info["detection_time"],
+                    detection_object=detection_info["detection_object"],
+                    risk_level=detection_info["risk_level"],
+                    content=detection_info["content"],
+                    image_url=evidence_id
+                )
+                # spool은 기록하지 못하면 False를 반환 (DB_RECORDS 'rejected'는 spool이 기록)
+                if saved is False:
+                    print(f"Detection not saved at {current_time}: rejected by the detection spool")
+                    continue
+
+                print(f"Detection saved to DB at {current_time} - Undetected items: {person_info['detection_object']}")
+
+            except Exception as e:
+                DB_RECORDS.labels('failed').inc()
+                print(f"Error saving to database: {e}")
\ No newline at end of file
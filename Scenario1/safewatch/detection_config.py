@@ -1,3 +1,6 @@
+import os
+
+
 class DetectConfig:
     def __init__(self):
         self.config = {
@@ -11,6 +14,26 @@ class DetectConfig:
             'human': 0.8,
             'hard_hat': 0.85,
             'safety_vest': 0.8
+            },
+            'schedule' : {
+            'min_interval': 2.0,   # 장면 변화 시 최소 추론 간격(초)
+            'max_interval': 10.0   # 변화가 없을 때 heartbeat 추론 간격(초)
+            },
+            'tracking' : {
+            'iou_threshold': 0.3,        # 트랙 예측 위치와 박스의 최소 IoU
+            'max_age': 15.0,             # 갱신 없이 트랙을 유지하는 시간(초) - heartbeat 간격보다 길게
+            'realert_interval': 300.0    # 같은 위반이 계속될 때 다시 저장하는 간격(초)
+            },
+            'execution' : {
+            'mode': os.getenv('SAFEWATCH_EXECUTION', 'thread'),        # thread: 배치 추론 스레드, process: 작업 프로세스 풀
+            'workers': int(os.getenv('SAFEWATCH_WORKERS', '0')),       # process 모드 작업 프로세스 수 (0: CPU 코어 수)
+            'slots_per_worker': 2                                      # 작업 프로세스당 공유 메모리 프레임 슬롯 수
+            },
+            'keyframe' : {
+            'enabled': os.getenv('SAFEWATCH_KEYFRAME', '0') == '1',           # 시청 중 K 프레임마다만 추론하고 사이 프레임은 박스를 추적해 그림
+            'budget': float(os.getenv('SAFEWATCH_KEYFRAME_BUDGET', '0.5')),   # 추론에 쓰는 시간 비율 목표 (K 자동 조정 기준)
+            'max_k': 30,                                                       # K 상한(프레임)
+            'max_seconds': 1.0                                                 # 키프레임 사이 최대 시간(초)
             }
         }
         
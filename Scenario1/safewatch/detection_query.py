@@ -0,0 +1,144 @@
+import base64
+import json
+import threading
+from datetime import datetime
+from typing import Optional
+
+# 목록 조회 컬럼 - 이미지(IMAGE_URL, 증거 ID)는 목록에서 조회하지 않고 단건 이미지 조회로만 가져옴
+LIST_COLUMNS = "detection_id, camera_id, detection_time, detection_object, risk_level, content"
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(detection_time: datetime, detection_id: int) -> str:
+    """페이지 마지막 행의 (detection_time, detection_id) -> 다음 페이지 요청용 불투명 커서 문자열"""
+    data = json.dumps({'t': detection_time.isoformat(), 'id': detection_id})
+    return base64.urlsafe_b64encode(data.encode()).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """커서 문자열 -> (detection_time, detection_id) (형식이 잘못되면 ValueError)"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(data['t']), int(data['id'])
+    except Exception as e:
+        raise ValueError(f"잘못된 커서: {cursor}") from e
+
+
+def build_list_query(dialect: str, camera_id: Optional[str] = None, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, risk_levels: Optional[list] = None,
+                     content: Optional[str] = None, cursor: Optional[str] = None,
+                     limit: int = 50, to_db_time=None) -> tuple:
+    """탐지 이력 목록 조회 SQL과 바인드 변수 (최신순, (detection_time, detection_id) keyset pagination)
+
+    dialect: 'oracle' 또는 'sqlite' (행 수 제한 구문만 다름, 바인드는 양쪽 모두 :name)
+    to_db_time: datetime -> DB 시간 값 변환 (SQLite는 저장 형식인 문자열)
+    OFFSET 없이 이전 페이지 마지막 행보다 오래된 행부터 읽으므로 (detection_time, detection_id) 인덱스로
+    깊은 페이지도 같은 비용으로 조회된다. 다음 페이지 유무 확인을 위해 limit + 1행을 조회한다.
+    """
+    to_db_time = to_db_time or (lambda value: value)
+    conditions, params = [], {}
+    if camera_id:
+        conditions.append("camera_id = :camera_id")
+        params['camera_id'] = camera_id
+    if start is not None:
+        conditions.append("detection_time >= :start_time")
+        params['start_time'] = to_db_time(start)
+    if end is not None:
+        conditions.append("detection_time < :end_time")
+        params['end_time'] = to_db_time(end)
+    if risk_levels:
+        names = [f"risk_level_{i}" for i in range(len(risk_levels))]
+        conditions.append(f"risk_level IN ({', '.join(':' + name for name in names)})")
+        params.update(zip(names, risk_levels))
+    if content:
+        conditions.append("INSTR(content, :content) > 0")
+        params['content'] = content
+    if cursor:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        conditions.append("(detection_time < :cursor_time OR "
+                          "(detection_time = :cursor_time AND detection_id < :cursor_id))")
+        params['cursor_time'] = to_db_time(cursor_time)
+        params['cursor_id'] = cursor_id
+
+    sql = f"SELECT {LIST_COLUMNS} FROM detection"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY detection_time DESC, detection_id DESC"
+    sql += " FETCH FIRST :row_limit ROWS ONLY" if dialect == 'oracle' else " LIMIT :row_limit"
+    params['row_limit'] = limit + 1
+    return sql, params
+
+
+def _read(value):
+    """Oracle CLOB(LOB 객체)은 문자열로 읽음"""
+    return value.read() if hasattr(value, 'read') else value
+
+
+def to_page(rows: list, limit: int, from_db_time=None) -> dict:
+    """조회 행(limit + 1개까지) -> {'items': [...], 'next_cursor': 다음 페이지 커서 또는 None}"""
+    from_db_time = from_db_time or (lambda value: value)
+    items = []
+    for detection_id, camera_id, detection_time, detection_object, risk_level, content in rows[:limit]:
+        detection_object = _read(detection_object)
+        try:
+            detection_object = json.loads(detection_object) if detection_object else None
+        except ValueError:
+            # JSON으로 저장되기 전의 이력(str(dict), 클래스 이름)은 원문 그대로
+            pass
+        items.append({
+            'detection_id': detection_id,
+            'camera_id': camera_id,
+            'detection_time': from_db_time(detection_time),
+            'detection_object': detection_object,
+            'risk_level': risk_level,
+            'content': _read(content)
+        })
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last['detection_time'], last['detection_id'])
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def read_image_ref(value):
+    """IMAGE_URL 값 -> 증거 ID 문자열 (BLOB 이미지는 database/migrate_evidence.py로 증거 저장소에 옮김)"""
+    return _read(value)
+
+
+class DetectionReader:
+    """조회용 DB 연결 (OracleDB/SQLiteDB) - 첫 조회 시 연결하고, 조회에 실패하면 연결을 버려 다음 조회에서
+    다시 연결한다. 한 연결을 여러 요청 스레드가 쓰므로 조회는 잠금으로 직렬화한다.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.db = None
+        self.lock = threading.Lock()
+
+    def _call(self, method: str, *args, **kwargs):
+        with self.lock:
+            if self.db is None:
+                self.db = self.connect()
+            try:
+                return getattr(self.db, method)(*args, **kwargs)
+            except Exception:
+                self._close()
+                raise
+
+    def list_detections(self, **filters) -> dict:
+        return self._call('list_detections', **filters)
+
+    def get_image_ref(self, detection_id: int):
+        return self._call('get_image_ref', detection_id)
+
+    def _close(self):
+        if self.db is not None:
+            try:
+                self.db.close()
+            except Exception:
+                pass
+            self.db = None
+
+    def close(self):
+        with self.lock:
+            self._close()
@@ -0,0 +1,89 @@
+import threading
+from typing import Optional
+from safewatch.camera import Camera
+from safewatch.camera_config import CameraConfig
+from safewatch.detection import SafetyDetector
+from safewatch.detection_config import DetectConfig
+from safewatch.util.pipeline import DetectionScheduler
+from safewatch.util.tracker import PersonTracker
+from common.jpeg_cache import EncodedFrameCache
+from common.keyframe import KeyframeSchedule
+from common.metrics import KEYFRAME_INTERVAL
+from safewatch.util.stream import StreamHandler, BatchInferenceStage
+from safewatch.util.process_stage import ProcessInferenceStage
+
+
+class CameraRegistry:
+    """설정된 카메라별 StreamHandler와 공용 배치 추론 스테이지를 관리"""
+
+    def __init__(self, db_connection=None, camera_config: Optional[CameraConfig] = None,
+                 max_batch_size: int = 16):
+        camera_config = camera_config or CameraConfig()
+        detect_config = DetectConfig()
+        schedule = detect_config['schedule']
+        tracking = detect_config['tracking']
+        execution = detect_config['execution']
+        keyframe = detect_config['keyframe']
+        self.keyframe_enabled = keyframe['enabled']
+        self.execution_mode = execution['mode']
+        if self.execution_mode not in ('thread', 'process'):
+            raise ValueError(f"지원하지 않는 실행 모드: {self.execution_mode}")
+        # 모든 카메라가 하나의 모델을 공유 (process 모드에서는 작업 프로세스마다 모델을 로드)
+        self.detector = SafetyDetector(db_connection=db_connection,
+                                       load_model=self.execution_mode == 'thread')
+        self.frame_ready = threading.Event()
+        # 모든 카메라가 공유하는 인코딩 캐시
+        self.jpeg_cache = EncodedFrameCache(max_entries=8 * max(len(camera_config), 1))
+        self.handlers = {}
+        for camera in camera_config.get_cameras():
+            self.handlers[camera['camera_id']] = StreamHandler(
+                camera_id=camera['camera_id'],
+                camera=Camera(camera['source'], camera['width'], camera['height'], camera['fps']),
+                detector=self.detector,
+                scheduler=DetectionScheduler(schedule['min_interval'], schedule['max_interval']),
+                frame_ready=self.frame_ready,
+                jpeg_cache=self.jpeg_cache,
+                tracker=PersonTracker(iou_threshold=tracking['iou_threshold'],
+                                      high_threshold=detect_config['thresholds']['human'],
+                                      max_age=tracking['max_age']),
+                keyframes=KeyframeSchedule(budget=keyframe['budget'], max_k=keyframe['max_k'],
+                                           max_seconds=keyframe['max_seconds'],
+                                           gauge=KEYFRAME_INTERVAL.labels(camera['camera_id']))
+                if self.keyframe_enabled else None
+            )
+        if self.execution_mode == 'process':
+            # 추론/시각화/인코딩을 작업 프로세스에서 수행 (프레임은 공유 메모리 링으로 전달)
+            self.inference = ProcessInferenceStage(list(self.handlers.values()), self.frame_ready,
+                                                   workers=execution['workers'],
+                                                   slots_per_worker=execution['slots_per_worker'],
+                                                   jpeg_quality=self.jpeg_cache.default_quality)
+        else:
+            self.inference = BatchInferenceStage(self.detector, list(self.handlers.values()),
+                                                 self.frame_ready, max_batch_size=max_batch_size)
+        self.inference.start()
+
+    def get(self, camera_id: str) -> Optional[StreamHandler]:
+        return self.handlers.get(camera_id)
+
+    @property
+    def default(self) -> Optional[StreamHandler]:
+        """기존 단일 카메라 엔드포인트용 첫 번째 카메라"""
+        return next(iter(self.handlers.values()), None)
+
+    def camera_ids(self) -> list:
+        return list(self.handlers.keys())
+
+    def __iter__(self):
+        return iter(self.handlers.values())
+
+    def __len__(self):
+        return len(self.handlers)
+
+    def set_detection_enabled(self, enabled: bool):
+        for handler in self:
+            handler.detection_enabled = enabled
+
+    def cleanup(self):
+        self.inference.stop()
+        for handler in self:
+            handler.cleanup()
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def check_overlap(region1, region2):
     """두 영역(bbox)의 겹침 비율을 계산하여 임계값과 비교"""
     x1, y1, x2, y2 = region1
@@ -20,4 +23,25 @@ def check_overlap(region1, region2):
     head_area = (x2 - x1) * (y2 - y1)
     
     # 겹치는 비율이 50% 이상이면 True 반환
-    return (overlap_area / head_area) >= 0.5
\ No newline at end of file
+    return (overlap_area / head_area) >= 0.5
+
+def check_overlap_matrix(regions, boxes, threshold=0.5):
+    """check_overlap의 벡터화 버전: regions(N,4) x boxes(M,4) 겹침 여부 행렬(N,M) 반환"""
+    regions = np.asarray(regions, dtype=np.float64).reshape(-1, 4)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+    # 겹치는 영역 계산 (브로드캐스팅)
+    overlap_x1 = np.maximum(regions[:, None, 0], boxes[None, :, 0])
+    overlap_y1 = np.maximum(regions[:, None, 1], boxes[None, :, 1])
+    overlap_x2 = np.minimum(regions[:, None, 2], boxes[None, :, 2])
+    overlap_y2 = np.minimum(regions[:, None, 3], boxes[None, :, 3])
+
+    overlapped = (overlap_x2 >= overlap_x1) & (overlap_y2 >= overlap_y1)
+    overlap_area = (overlap_x2 - overlap_x1) * (overlap_y2 - overlap_y1)
+
+    # 기준 영역(머리/몸통)의 면적 - 면적이 0인 영역은 겹치지 않은 것으로 처리
+    region_area = ((regions[:, 2] - regions[:, 0]) * (regions[:, 3] - regions[:, 1]))[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(region_area > 0, overlap_area / region_area, 0.0)
+
+    return overlapped & (ratio >= threshold)
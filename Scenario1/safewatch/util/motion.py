@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """축소한 흑백 프레임과 배경(이동 평균)의 차이로 장면 변화를 감지하는 가벼운 검출기
+
+    캡처 속도로 매 프레임 실행해도 부담이 없도록 160x120 해상도에서 계산한다.
+    """
+
+    def __init__(self, size=(160, 120), pixel_threshold=25, area_threshold=0.01, alpha=0.05):
+        self.size = size
+        self.pixel_threshold = pixel_threshold   # 픽셀 밝기 변화 임계값
+        self.area_threshold = area_threshold     # 변화 픽셀 비율 임계값
+        self.alpha = alpha                       # 배경 갱신 비율
+        self.background = None
+        self.last_score = 0.0
+
+    def update(self, frame) -> bool:
+        """프레임을 배경에 반영하고 장면 변화 여부를 반환"""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            return False
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        self.last_score = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        cv2.accumulateWeighted(gray, self.background, self.alpha)
+        return self.last_score >= self.area_threshold
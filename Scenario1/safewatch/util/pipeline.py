@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+
+class ResultBuffer:
+    """프레임 시퀀스 번호가 붙은 탐지 결과를 최근 N개만 보관하는 링 버퍼"""
+
+    def __init__(self, maxlen: int = 16):
+        self._records = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+
+    def append(self, record: dict):
+        """record: {'seq', 'captured_at', 'results', 'frame'}"""
+        with self._cond:
+            self._records.append(record)
+            self._cond.notify_all()
+
+    def latest(self) -> Optional[dict]:
+        with self._cond:
+            return self._records[-1] if self._records else None
+
+    def since(self, seq: int) -> list:
+        """seq 이후에 추가된 결과 목록 (오래된 순)"""
+        with self._cond:
+            return [record for record in self._records if record['seq'] > seq]
+
+    def wait_for_newer(self, seq: int, timeout: Optional[float] = None) -> Optional[dict]:
+        """seq 보다 새로운 결과가 들어올 때까지 대기 후 최신 결과 반환"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._records and self._records[-1]['seq'] > seq, timeout)
+            if self._records and self._records[-1]['seq'] > seq:
+                return self._records[-1]
+            return None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._records)
+
+
+class PersistencePolicy:
+    """버퍼에 쌓인 탐지 결과 중 DB에 저장할 결과를 고르는 정책 (기본 10초 간격)"""
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.last_persisted_seq = -1
+        self.last_persisted_at = None
+
+    def select(self, buffer: ResultBuffer, now: Optional[float] = None) -> Optional[dict]:
+        """저장 주기가 지났고 아직 저장하지 않은 최신 결과가 있으면 반환"""
+        now = time.monotonic() if now is None else now
+        if self.last_persisted_at is not None and now - self.last_persisted_at < self.interval:
+            return None
+
+        record = buffer.latest()
+        if record is None or record['seq'] <= self.last_persisted_seq:
+            return None
+        return record
+
+    def mark_persisted(self, record: dict, now: Optional[float] = None):
+        self.last_persisted_seq = record['seq']
+        self.last_persisted_at = time.monotonic() if now is None else now
+
+
+class DetectionScheduler:
+    """장면 변화가 있으면 즉시(min_interval 간격), 없으면 max_interval 주기(heartbeat)로 추론"""
+
+    def __init__(self, min_interval: float = 2.0, max_interval: float = 10.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.last_run_at = None
+        self.last_reason = None
+        self.last_trigger_time = None
+
+    def due(self, motion: bool, now: Optional[float] = None) -> Optional[str]:
+        """추론이 필요하면 사유('startup', 'motion', 'heartbeat')를 반환"""
+        now = time.monotonic() if now is None else now
+        if self.last_run_at is None:
+            return 'startup'
+        elapsed = now - self.last_run_at
+        if motion and elapsed >= self.min_interval:
+            return 'motion'
+        if elapsed >= self.max_interval:
+            return 'heartbeat'
+        return None
+
+    def mark_run(self, reason: str, now: Optional[float] = None):
+        self.last_run_at = time.monotonic() if now is None else now
+        self.last_reason = reason
+        self.last_trigger_time = datetime.now()
+
+
+class ViolationEventPolicy:
+    """사람 트랙별로 위반이 시작/변경될 때와 재알림 주기마다만 저장 이벤트를 내보내는 정책
+
+    같은 작업자가 계속 미착용 상태로 서 있어도 DB 기록/증거 이미지는 트랙당 한 번만 남는다.
+    track_id가 없는 결과(추적기 미사용)는 기존과 같이 매번 내보낸다.
+    """
+
+    def __init__(self, realert_interval: float = 300.0, forget_after: float = 60.0):
+        self.realert_interval = realert_interval
+        self.forget_after = forget_after
+        # track_id -> {'content', 'alerted_at', 'seen_at'}
+        self.states = {}
+
+    def select(self, results: list, now: Optional[float] = None) -> list:
+        """저장할 위반 결과 목록 - 각 결과에 'event'('start', 'change', 'realert') 추가"""
+        now = time.monotonic() if now is None else now
+        events = []
+        for person_info in results:
+            track_id = person_info.get('track_id')
+            violation = person_info['risk_level'] != "SAFE"
+            if track_id is None:
+                if violation:
+                    events.append(dict(person_info, event='start'))
+                continue
+
+            state = self.states.get(track_id)
+            event = None
+            if violation:
+                if state is None or state['content'] is None:
+                    event = 'start'
+                elif state['content'] != person_info['content']:
+                    event = 'change'
+                elif now - state['alerted_at'] >= self.realert_interval:
+                    event = 'realert'
+
+            if state is None:
+                state = self.states[track_id] = {'content': None, 'alerted_at': None}
+            state['seen_at'] = now
+            state['content'] = person_info['content'] if violation else None
+            if event is not None:
+                state['alerted_at'] = now
+                events.append(dict(person_info, event=event))
+
+        # 오래 보이지 않은 트랙 상태 정리
+        self.states = {track_id: state for track_id, state in self.states.items()
+                       if now - state['seen_at'] <= self.forget_after}
+        return events
@@ -0,0 +1,68 @@
+import numpy as np
+from safewatch.util.check_overlap import check_overlap_matrix
+from common.inference import to_numpy
+
+
+def extract_boxes(results):
+    """추론 결과(엔진 Detections 또는 ultralytics Results) 전체의 xyxy/cls/conf를 numpy 배열로 변환"""
+    xyxy, cls, conf = [], [], []
+    for r in results:
+        boxes = getattr(r, 'boxes', r)
+        if boxes is None or len(boxes) == 0:
+            continue
+        xyxy.append(to_numpy(boxes.xyxy))
+        cls.append(to_numpy(boxes.cls))
+        conf.append(to_numpy(boxes.conf))
+
+    if not xyxy:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=int), np.zeros(0, dtype=np.float32)
+    return (np.concatenate(xyxy).reshape(-1, 4),
+            np.concatenate(cls).astype(int),
+            np.concatenate(conf))
+
+
+def filter_detections(xyxy, cls, conf, class_names, thresholds):
+    """클래스별 임계값 필터링 - {class_name: {'bbox': (N,4) int 배열, 'conf': (N,) 배열}}"""
+    detections = {}
+    for class_id, class_name in enumerate(class_names):
+        threshold = thresholds.get(class_name)
+        if threshold is None:
+            continue
+        mask = (cls == class_id) & (conf >= threshold)
+        detections[class_name] = {
+            # int() 변환과 동일하게 0 방향으로 절삭
+            'bbox': xyxy[mask].astype(int),
+            'conf': conf[mask].astype(float)
+        }
+    return detections
+
+
+def person_regions(person_boxes):
+    """사람 박스(N,4)에서 머리/몸통 영역(N,4)을 계산"""
+    person_boxes = np.asarray(person_boxes, dtype=int).reshape(-1, 4)
+    px1, py1, px2, py2 = person_boxes.T
+    person_height = py2 - py1
+    person_width = px2 - px1
+    center_x = (px1 + px2) // 2
+
+    # 머리 영역 계산
+    head_height = (person_height * 0.17).astype(int)
+    head_half_width = (person_width * 0.4).astype(int) // 2
+    head_regions = np.stack([center_x - head_half_width, py1,
+                             center_x + head_half_width, py1 + head_height], axis=1)
+
+    # 몸통 영역 계산
+    gap = person_height // 15
+    body_half_width = (person_width * 0.7).astype(int) // 2
+    body_regions = np.stack([center_x - body_half_width, py1 + head_height + gap,
+                             center_x + body_half_width, py2], axis=1)
+
+    return head_regions, body_regions
+
+
+def match_ppe(detections):
+    """사람별 안전모/안전조끼 착용 여부를 겹침 행렬로 한 번에 계산"""
+    head_regions, body_regions = person_regions(detections['human']['bbox'])
+    helmet_detected = check_overlap_matrix(head_regions, detections['hard_hat']['bbox']).any(axis=1)
+    vest_detected = check_overlap_matrix(body_regions, detections['safety_vest']['bbox']).any(axis=1)
+    return head_regions, body_regions, helmet_detected, vest_detected
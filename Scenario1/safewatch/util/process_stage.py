@@ -0,0 +1,224 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import cv2
+from safewatch.util.shm_ring import SharedFrameRing
+from common.metrics import DETECTIONS, FRAME_LATENCY_SECONDS, INFERENCE_SECONDS
+
+# 작업 프로세스 전역 상태 (프로세스마다 모델 1개와 연결한 링)
+_worker = {}
+
+
+def create_worker_detector():
+    """작업 프로세스의 탐지기 (DB 연결 없이 모델만 사용)"""
+    from safewatch.detection import SafetyDetector
+    return SafetyDetector(db_connection=None)
+
+
+def _init_worker(threads: int, detector_factory):
+    """작업 프로세스 초기화 - 코어를 나눠 쓰도록 추론 스레드 수를 제한하고 모델 로드"""
+    if threads:
+        os.environ.setdefault("INFERENCE_THREADS", str(threads))
+    _worker['detector'] = detector_factory()
+    _worker['rings'] = {}
+
+
+def _frame_view(ring_info: tuple, slot: int, shape: tuple):
+    name, slots, slot_bytes = ring_info
+    rings = _worker['rings']
+    ring = rings.get(name)
+    if ring is None:
+        ring = rings[name] = SharedFrameRing.attach(name, slots, slot_bytes)
+        # 링이 더 큰 링으로 교체되면 오래된 연결부터 해제
+        while len(rings) > 2:
+            rings.pop(next(iter(rings))).close()
+    return ring.view(slot, shape)
+
+
+def detect_job(ring_info: tuple, slot: int, shape: tuple) -> tuple:
+    """작업 프로세스: 슬롯의 프레임 추론 + 후처리 -> (사람/안전장비 분석 결과(작은 배열들), 모델 호출 시간(초))
+
+    작업 프로세스의 지표는 부모의 /metrics에 보이지 않으므로 모델 호출 시간을 돌려주고 부모가 기록한다.
+    """
+    detector = _worker['detector']
+    start = time.perf_counter()
+    results = detector.model(_frame_view(ring_info, slot, shape))
+    return detector.analyze(results), time.perf_counter() - start
+
+
+def annotate_job(ring_info: tuple, slot: int, shape: tuple, analysis: dict, track_ids: list,
+                 quality: int) -> tuple:
+    """작업 프로세스: 슬롯의 프레임에 결과를 그리고 JPEG 인코딩 -> (탐지 결과 목록, JPEG 바이트)"""
+    frame = _frame_view(ring_info, slot, shape)
+    results = _worker['detector'].annotate(frame, analysis, track_ids)
+    success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    return results, buffer.tobytes() if success else None
+
+
+class ProcessInferenceStage:
+    """추론/후처리/시각화/인코딩을 작업 프로세스 풀에서 수행하는 스테이지 (BatchInferenceStage 대체)
+
+    프레임은 공유 메모리 링 슬롯에 한 번 복사되고, 작업 프로세스와는 슬롯 번호와 작은 결과
+    (사람 박스 배열, 탐지 결과 목록, JPEG 바이트)만 주고받는다. 한 프레임은 두 단계로 처리된다.
+      1) detect_job: 모델 추론 + 안전장비 판정
+      2) (부모) 카메라별 추적기를 프레임 순서대로 갱신 -> annotate_job: 시각화 + JPEG 인코딩
+    카메라마다 여러 프레임이 동시에 처리될 수 있어 작업 프로세스 수(코어 수)만큼 처리량이 늘어나고,
+    결과는 카메라별로 프레임 순서대로 게시된다.
+    작업 상태는 디스패치 스레드 하나만 진행시키며, 프로세스 풀 콜백은 상태만 기록하고 깨운다.
+    """
+
+    def __init__(self, handlers: list, frame_ready: threading.Event, workers: int = 0,
+                 slots_per_worker: int = 2, jpeg_quality: int = 95, detector_factory=create_worker_detector):
+        self.handlers = handlers
+        self.frame_ready = frame_ready
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = self.workers * slots_per_worker
+        # 카메라당 동시 처리 프레임 수 (추적 순서 대기가 길어지지 않도록 작업 프로세스 수로 제한)
+        self.max_inflight = self.workers
+        self.jpeg_quality = jpeg_quality
+        # 작업 프로세스에서 호출되므로 모듈 수준 함수여야 함 (spawn 시 pickle)
+        self.detector_factory = detector_factory
+        self.ring = None
+        self.pool = None
+        self._pending = {handler.camera_id: deque() for handler in handlers}
+        self._lock = threading.Lock()
+        self.last_batch_size = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        threads = max((os.cpu_count() or 1) // self.workers, 1)
+        # 캡처/서버 스레드가 도는 프로세스를 fork하지 않도록 spawn 사용
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(threads, self.detector_factory))
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _ring_for(self, frame) -> SharedFrameRing:
+        """프레임이 들어가는 링 (처음이거나 더 큰 프레임이 오면 새 링을 만들고 이전 링은 폐기)"""
+        if self.ring is None or not self.ring.fits(frame):
+            if self.ring is not None:
+                self.ring.retire()
+            self.ring = SharedFrameRing(self.slots, frame.nbytes)
+        return self.ring
+
+    def run_once(self) -> int:
+        """완료된 작업을 진행시키고, 빈 슬롯이 있으면 새 프레임을 작업 프로세스로 보냄 (보낸 프레임 수 반환)"""
+        for handler in self.handlers:
+            self._advance(handler)
+
+        dispatched = 0
+        for handler in self.handlers:
+            if self.ring is not None and not self.ring.free_slots:
+                break
+            with self._lock:
+                if len(self._pending[handler.camera_id]) >= self.max_inflight:
+                    continue
+            job = handler.take_inference_frame(copy=False)
+            if job is None:
+                continue
+            frame, seq, captured_at = job
+            ring = self._ring_for(frame)
+            slot = ring.acquire()
+            shape = ring.write(slot, frame)
+            job = {'seq': seq, 'captured_at': captured_at, 'ring': ring, 'slot': slot, 'shape': shape,
+                   'state': 'detecting', 'started_at': time.perf_counter()}
+            with self._lock:
+                self._pending[handler.camera_id].append(job)
+            self._submit(job, 'detected', detect_job, ring.info, slot, shape)
+            dispatched += 1
+        if dispatched:
+            self.last_batch_size = dispatched
+        return dispatched
+
+    def _submit(self, job: dict, next_state: str, func, *args):
+        try:
+            future = self.pool.submit(func, *args)
+        except RuntimeError as e:
+            # 종료 중인 풀
+            print(f"Error during detection: {e}")
+            with self._lock:
+                job['state'] = 'failed'
+            return
+        future.add_done_callback(partial(self._job_done, job, next_state))
+
+    def _job_done(self, job: dict, next_state: str, future):
+        """프로세스 풀 콜백 - 결과만 기록하고 디스패치 스레드를 깨움"""
+        with self._lock:
+            try:
+                job['output'] = future.result()
+                job['state'] = next_state
+            except Exception as e:
+                print(f"Error during detection: {e}")
+                job['state'] = 'failed'
+        self.frame_ready.set()
+
+    def _advance(self, handler):
+        """추론이 끝난 프레임을 순서대로 추적 -> 시각화 작업 제출, 완료된 프레임을 순서대로 게시"""
+        queue = self._pending[handler.camera_id]
+        detected, finished = [], []
+        with self._lock:
+            for job in queue:
+                if job['state'] == 'detecting':
+                    break  # 앞선 프레임의 추론이 끝나야 추적기를 갱신할 수 있음
+                if job['state'] == 'detected':
+                    job['state'] = 'annotating'
+                    detected.append(job)
+            while queue and queue[0]['state'] in ('done', 'failed'):
+                finished.append(queue.popleft())
+
+        # 이미 끝난 future의 콜백은 즉시 호출되므로 제출은 잠금 밖에서
+        for job in detected:
+            analysis, model_seconds = job['output']
+            INFERENCE_SECONDS.observe(model_seconds)
+            track_ids = handler.detector.assign_tracks(analysis, handler.tracker, job['captured_at'].timestamp())
+            self._submit(job, 'done', annotate_job, job['ring'].info, job['slot'], job['shape'],
+                         analysis, track_ids, self.jpeg_quality)
+        for job in finished:
+            self._complete(handler, job)
+
+    def _complete(self, handler, job: dict):
+        results, image_bytes = job['output'] if job['state'] == 'done' else ([], None)
+        # 결과 버퍼/DB 증거용으로 그려진 프레임을 슬롯에서 복사한 뒤 슬롯 반납
+        frame = job['ring'].view(job['slot'], job['shape']).copy()
+        job['ring'].release(job['slot'])
+        FRAME_LATENCY_SECONDS.observe(time.perf_counter() - job['started_at'])
+        for person_info in results:
+            DETECTIONS.labels(person_info['risk_level']).inc()
+        if image_bytes is not None:
+            # 작업 프로세스가 인코딩한 JPEG를 캐시에 넣어 스트리밍/스냅샷/DB가 다시 인코딩하지 않게 함
+            handler.cache_encoded('annotated', job['seq'], image_bytes, self.jpeg_quality)
+        handler.complete_inference(frame, job['seq'], job['captured_at'], results)
+
+    def _run(self):
+        while self.running:
+            # 새 프레임이나 작업 완료가 없으면 대기 (백그라운드 주기 확인을 위해 타임아웃)
+            self.frame_ready.wait(timeout=0.1)
+            self.frame_ready.clear()
+            self.run_once()
+
+    def stats(self) -> dict:
+        with self._lock:
+            inflight = {camera_id: len(queue) for camera_id, queue in self._pending.items()}
+        return {
+            'workers': self.workers,
+            'slots': self.slots,
+            'free_slots': self.ring.free_slots if self.ring is not None else self.slots,
+            'inflight': inflight
+        }
+
+    def stop(self):
+        self.running = False
+        self.frame_ready.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.ring is not None:
+            self.ring.close()
@@ -0,0 +1,93 @@
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Optional
+import numpy as np
+
+
+class SharedFrameRing:
+    """multiprocessing.shared_memory 한 블록을 고정 크기 슬롯으로 나눈 프레임 링
+
+    링을 만든 프로세스가 빈 슬롯을 받아(acquire) 프레임을 복사해 넣고, 작업 프로세스는 이름으로
+    붙어(attach) 같은 슬롯을 NumPy 뷰로 읽고 그 위에 그린다. 프로세스 사이에는 슬롯 번호와 shape만
+    오가므로 프레임 자체는 pickle되지 않는다. 슬롯 할당/반납은 링을 만든 프로세스에서만 한다.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._free = deque(range(slots))
+        self._lock = threading.Lock()
+        self.retired = False
+        self.closed = False
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_bytes: int) -> 'SharedFrameRing':
+        """다른 프로세스가 만든 링에 연결 (작업 프로세스용)"""
+        return cls(slots, slot_bytes, name=name)
+
+    @property
+    def info(self) -> tuple:
+        """작업 프로세스가 attach에 쓰는 (이름, 슬롯 수, 슬롯 크기)"""
+        return self.name, self.slots, self.slot_bytes
+
+    @property
+    def free_slots(self) -> int:
+        with self._lock:
+            return len(self._free)
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.nbytes <= self.slot_bytes
+
+    def acquire(self) -> Optional[int]:
+        """빈 슬롯 번호 (없으면 None)"""
+        with self._lock:
+            if self.retired or not self._free:
+                return None
+            return self._free.popleft()
+
+    def release(self, slot: int):
+        """슬롯 반납 - 폐기된 링은 모든 슬롯이 돌아오면 닫음"""
+        with self._lock:
+            self._free.append(slot)
+            idle = self.retired and len(self._free) == self.slots
+        if idle:
+            self.close()
+
+    def retire(self):
+        """새 슬롯 할당을 멈추고 사용 중인 슬롯이 모두 반납되면 닫음 (더 큰 링으로 교체할 때)"""
+        with self._lock:
+            self.retired = True
+            idle = len(self._free) == self.slots
+        if idle:
+            self.close()
+
+    def view(self, slot: int, shape: tuple, dtype=np.uint8) -> np.ndarray:
+        """슬롯을 복사 없이 가리키는 배열"""
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, frame: np.ndarray) -> tuple:
+        """프레임을 슬롯에 복사하고 shape 반환"""
+        if not self.fits(frame):
+            raise ValueError(f"프레임({frame.nbytes} bytes)이 슬롯 크기({self.slot_bytes} bytes)보다 큽니다")
+        np.copyto(self.view(slot, frame.shape, frame.dtype), frame)
+        return frame.shape
+
+    def close(self):
+        """연결 해제 (링을 만든 프로세스는 공유 메모리도 삭제)"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.shm.close()
+        except BufferError:
+            # 아직 남아 있는 뷰가 있으면 프로세스 종료 시 해제됨
+            pass
+        if self.owner:
+            self.shm.unlink()
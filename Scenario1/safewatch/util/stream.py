@@ -1,46 +1,411 @@
-import cv2
-from typing import Iterator
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
 from safewatch.camera import Camera
 from safewatch.detection import SafetyDetector
+from safewatch.util.motion import MotionDetector
+from common.jpeg_cache import EncodedFrameCache
+from common.keyframe import BoxPropagator, KeyframeSchedule
+from common.metrics import (CAPTURE_FPS, FRAME_LATENCY_SECONDS, FRAMES_CAPTURED, FRAMES_DROPPED, FRAMES_TRACKED,
+                            STREAM_CLIENTS, RateMeter)
+from safewatch.util.pipeline import ResultBuffer, DetectionScheduler
+from safewatch.util.tracker import PersonTracker
+
+
+class FrameSubscriber:
+    """구독자별 최신 프레임 1장만 보관하는 슬롯 (느린 클라이언트는 프레임을 건너뜀)
+
+    loop를 지정하면 이벤트 루프 안에서 get_async()로 스레드 없이 대기할 수 있다.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, dropped_counter=None):
+        self._cond = threading.Condition()
+        self._frame_bytes = None
+        self._loop = loop
+        self._event = asyncio.Event() if loop is not None else None
+        self._dropped_counter = dropped_counter
+        self.dropped = 0
+        self.closed = False
+
+    def _wake_async(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # 이벤트 루프가 이미 종료된 경우
+            pass
+
+    def put(self, frame_bytes: bytes):
+        with self._cond:
+            if self._frame_bytes is not None:
+                # 아직 가져가지 않은 프레임은 버리고 최신 프레임으로 교체
+                self.dropped += 1
+                if self._dropped_counter is not None:
+                    self._dropped_counter.inc()
+            self._frame_bytes = frame_bytes
+            self._cond.notify()
+        self._wake_async()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """새 프레임이 올 때까지 대기 후 반환 (timeout 시 None)"""
+        with self._cond:
+            if self._frame_bytes is None and not self.closed:
+                self._cond.wait(timeout)
+            frame_bytes, self._frame_bytes = self._frame_bytes, None
+            return frame_bytes
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """이벤트 루프를 막지 않고 새 프레임을 기다림 (timeout 시 None)"""
+        while True:
+            with self._cond:
+                if self._frame_bytes is not None or self.closed:
+                    frame_bytes, self._frame_bytes = self._frame_bytes, None
+                    return frame_bytes
+                self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._wake_async()
+
+
+class FrameBroker:
+    """한 번 인코딩된 프레임을 여러 구독자에게 나눠주는 브로커
+
+    clients_gauge/dropped_counter: 접속 클라이언트 수, 건너뛴 프레임 수를 기록할 지표 (선택)
+    """
+
+    def __init__(self, clients_gauge=None, dropped_counter=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._clients_gauge = clients_gauge
+        self._dropped_counter = dropped_counter
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> FrameSubscriber:
+        subscriber = FrameSubscriber(loop, self._dropped_counter)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self._update_clients_gauge()
+        return subscriber
+
+    def unsubscribe(self, subscriber: FrameSubscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self._update_clients_gauge()
+        subscriber.close()
+
+    def _update_clients_gauge(self):
+        if self._clients_gauge is not None:
+            self._clients_gauge.set(len(self._subscribers))
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, frame_bytes: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(frame_bytes)
+
+    def close(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+            self._update_clients_gauge()
+        for subscriber in subscribers:
+            subscriber.close()
 
 
 class StreamHandler:
-    _instance = None
+    """카메라 1대의 캡처 스레드, 결과 버퍼, 원본/탐지 스트림 브로커를 관리
 
-    def __new__(cls, db_connection=None):
-        if cls._instance is None:
-            cls._instance = super(StreamHandler, cls).__new__(cls)
-            cls._instance.camera = Camera()
-            cls._instance.detector = SafetyDetector(db_connection=db_connection)
-            cls._instance.frame = None
-        return cls._instance
+    keyframes를 지정하면(키프레임 모드) 시청 중에도 K 프레임마다만 추론하고, 탐지 스트림은 캡처 스레드가
+    마지막 키프레임 결과의 박스를 광학 흐름으로 옮겨 그린 프레임으로 카메라 속도로 내보낸다.
+    """
 
-    def read_frame(self):
-        """카메라에서 프레임을 읽어오는 메서드"""
+    def __init__(self, camera_id: str, camera: Camera, detector: SafetyDetector,
+                 scheduler: Optional[DetectionScheduler] = None,
+                 frame_ready: Optional[threading.Event] = None,
+                 jpeg_cache: Optional[EncodedFrameCache] = None,
+                 tracker: Optional[PersonTracker] = None,
+                 keyframes: Optional[KeyframeSchedule] = None):
+        self.camera_id = camera_id
+        self.camera = camera
+        self.detector = detector
+        self.frame = None
+        self.frame_seq = 0
+        self.captured_at = None
+        self.frame_lock = threading.Lock()
+        # 시퀀스 번호가 붙은 탐지 결과 링 버퍼 (오버레이/최신 결과/DB 저장이 공유)
+        self.results = ResultBuffer()
+        # 시청자가 없을 때: 장면 변화 시 즉시, 변화가 없으면 heartbeat 주기로 추론
+        self.scheduler = scheduler or DetectionScheduler()
+        self.motion_detector = MotionDetector()
+        self.motion_pending = False
+        self.detection_enabled = True
+        self.last_inferred_seq = 0
+        self.pending_trigger = None
+        # 프레임 간 사람 추적 (위반 이벤트를 작업자별로 한 번만 저장하기 위함)
+        self.tracker = tracker or PersonTracker()
+        # 키프레임 모드: 추론 간격(K) 자동 조정 + 키프레임 사이 박스 이동
+        self.keyframes = keyframes
+        self.propagator = BoxPropagator() if keyframes is not None else None
+        self.frames_tracked = FRAMES_TRACKED.labels(camera_id)
+        # 새 프레임 도착을 추론 스테이지에 알리는 이벤트
+        self.frame_ready = frame_ready or threading.Event()
+        # (카메라, 원본/탐지, 시퀀스, 품질) 별 인코딩 결과 캐시 - 스트리밍/DB/스냅샷 공용
+        self.jpeg_cache = jpeg_cache or EncodedFrameCache()
+        # 원본/탐지 스트림별 브로커
+        self.raw_broker = self._create_broker('raw')
+        self.detection_broker = self._create_broker('annotated')
+        # 캡처 지표 (/metrics)
+        self.frames_captured = FRAMES_CAPTURED.labels(camera_id)
+        self.capture_rate = RateMeter(CAPTURE_FPS.labels(camera_id))
+        self.running = True
+        self.producer = threading.Thread(target=self._capture_frames, daemon=True)
+        self.producer.start()
+
+    def _create_broker(self, stream: str) -> FrameBroker:
+        return FrameBroker(clients_gauge=STREAM_CLIENTS.labels(self.camera_id, stream),
+                           dropped_counter=FRAMES_DROPPED.labels(self.camera_id, stream))
+
+    def _capture_frame(self):
+        """카메라에서 프레임을 직접 읽어오는 메서드 (캡처 스레드 전용)"""
         if self.camera is None:
             return None
         return self.camera.read_frame()
 
-    def generate_frames(self, draw_detection:bool = True) -> Iterator[bytes]:
-        """스트리밍용 프레임 생성기"""
-        while True:
-            frame = self.read_frame()
+    def read_frame(self):
+        """캡처 스레드가 마지막으로 읽은 프레임의 복사본을 반환"""
+        with self.frame_lock:
+            if self.frame is None:
+                return None
+            return self.frame.copy()
+
+    def _capture_frames(self):
+        """카메라 속도로 프레임을 읽고 원본 스트림을 한 번만 인코딩해 배포"""
+        while self.running:
+            frame = self._capture_frame()
             if frame is None:
+                time.sleep(0.01)
                 continue
-                
-            # 바운딩 박스 표시용 detection (save_to_db=False)
-            if draw_detection and self.detector is not None:
-                try:
-                    self.detector.process_detections(frame, save_to_db=False)
-                except Exception as e:
-                    print(f"Error during detection: {e}")
-                
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            self.frames_captured.inc()
+            self.capture_rate.tick()
+
+            # 캡처 속도로 장면 변화 감지 (다음 추론 전까지 유지)
+            motion = self.motion_detector.update(frame)
+
+            with self.frame_lock:
+                self.frame_seq += 1
+                self.frame = frame
+                self.captured_at = datetime.now()
+                self.motion_pending = self.motion_pending or motion
+                seq = self.frame_seq
+
+            # 원본 스트림: 구독자가 있을 때만 인코딩
+            if self.raw_broker.subscriber_count:
+                self._publish(self.raw_broker, self.encode_frame('raw', seq, frame))
+            if self.keyframes is not None:
+                self.keyframes.tick()
+                if self.detection_broker.subscriber_count:
+                    self._publish(self.detection_broker, self._render_tracked(seq, frame))
+
+            self.frame_ready.set()
+
+    def _render_tracked(self, seq: int, frame) -> Optional[bytes]:
+        """마지막 키프레임 결과의 박스를 이 프레임까지 옮겨 그린 JPEG (키프레임 모드의 탐지 스트림)"""
+        boxes, results = self.propagator.push(seq, frame)
+        frame = frame.copy()
+        self.detector.draw(frame, [dict(person_info, bbox=tuple(int(v) for v in box))
+                                   for person_info, box in zip(results or [], boxes.tolist())])
+        self.frames_tracked.inc()
+        return self.encode_frame('tracked', seq, frame)
+
+    def _inference_trigger(self) -> Optional[str]:
+        """추론 사유 - 시청자가 있으면 매 프레임('viewer', 키프레임 모드는 K 프레임마다 'keyframe'),
+        없으면 스케줄러 판단"""
+        if self.detection_broker.subscriber_count:
+            if self.keyframes is None:
+                return 'viewer'
+            return 'keyframe' if self.keyframes.due(self.frame_seq) else None
+        if not self.detection_enabled:
+            return None
+        return self.scheduler.due(self.motion_pending)
+
+    def take_inference_frame(self, copy: bool = True) -> Optional[tuple]:
+        """추론이 필요한 새 프레임이 있으면 (frame, seq, captured_at) 반환
+
+        copy=False면 캡처 슬롯의 프레임을 그대로 반환 (호출자가 수정하지 않고 바로 복사해 갈 때)
+        """
+        trigger = self._inference_trigger()
+        if trigger is None:
+            return None
+        with self.frame_lock:
+            if self.frame is None or self.frame_seq <= self.last_inferred_seq:
+                return None
+            self.last_inferred_seq = self.frame_seq
+            self.motion_pending = False
+            self.pending_trigger = trigger
+            self.scheduler.mark_run(trigger)
+            if trigger == 'keyframe':
+                self.keyframes.mark(self.frame_seq)
+            frame = self.frame.copy() if copy else self.frame
+            return frame, self.frame_seq, self.captured_at
+
+    def complete_inference(self, annotated, seq: int, captured_at: datetime, results: list) -> dict:
+        """추론 결과를 링 버퍼에 기록하고 탐지 스트림으로 배포 (저장은 정책이 담당)"""
+        record = {
+            'seq': seq,
+            'captured_at': captured_at,
+            'trigger': self.pending_trigger,
+            'results': results,
+            'frame': annotated
+        }
+        self.results.append(record)
+        if self.keyframes is not None:
+            # 캡처부터 결과까지의 지연으로 K를 조정하고, 이후 프레임은 이 결과의 박스를 옮겨 그림
+            self.keyframes.observe((datetime.now() - captured_at).total_seconds())
+            self.propagator.reseed(seq, [person_info['bbox'] for person_info in results], results)
+        elif self.detection_broker.subscriber_count:
+            self._publish(self.detection_broker, self.encode_record(record))
+        return record
+
+    def encode_frame(self, variant: str, seq: int, frame, quality: Optional[int] = None) -> Optional[bytes]:
+        """프레임/품질 조합당 한 번만 JPEG 인코딩 (variant: 'raw' 또는 'annotated')"""
+        return self.jpeg_cache.encode((self.camera_id, variant, seq), frame, quality)
+
+    def cache_encoded(self, variant: str, seq: int, frame_bytes: bytes, quality: Optional[int] = None):
+        """이미 인코딩된 JPEG를 인코딩 캐시에 등록 (작업 프로세스가 인코딩한 경우)"""
+        self.jpeg_cache.put((self.camera_id, variant, seq), frame_bytes, quality)
+
+    def encode_record(self, record: dict, quality: Optional[int] = None) -> Optional[bytes]:
+        """탐지 결과가 그려진 프레임의 JPEG 바이트 (스트리밍/DB 증거 이미지 공용)"""
+        return self.encode_frame('annotated', record['seq'], record['frame'], quality)
+
+    def snapshot(self, draw_detection: bool = True, quality: Optional[int] = None) -> Optional[bytes]:
+        """가장 최근 프레임의 JPEG 바이트 - 이미 인코딩된 경우 캐시에서 바로 반환"""
+        if draw_detection:
+            record = self.results.latest()
+            return self.encode_record(record, quality) if record is not None else None
+        with self.frame_lock:
+            frame, seq = self.frame, self.frame_seq
+        if frame is None:
+            return None
+        return self.encode_frame('raw', seq, frame, quality)
+
+    def _publish(self, broker: FrameBroker, frame_bytes: Optional[bytes]):
+        if frame_bytes is not None:
+            broker.publish(frame_bytes)
+
+    def generate_frames(self, draw_detection:bool = True) -> Iterator[bytes]:
+        """스트리밍용 프레임 생성기 (한 번 인코딩된 프레임을 구독)"""
+        broker = self.detection_broker if draw_detection else self.raw_broker
+        subscriber = broker.subscribe()
+        try:
+            while self.running:
+                frame_bytes = subscriber.get(timeout=1.0)
+                if frame_bytes is None:
+                    if subscriber.closed:
+                        break
+                    continue
+
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        finally:
+            broker.unsubscribe(subscriber)
+
+    async def stream_frames(self, draw_detection: bool = True) -> AsyncIterator[bytes]:
+        """비동기 스트리밍 생성기 - 새 프레임을 이벤트로 기다리므로 스레드를 점유하지 않음"""
+        broker = self.detection_broker if draw_detection else self.raw_broker
+        subscriber = broker.subscribe(loop=asyncio.get_running_loop())
+        try:
+            while self.running:
+                frame_bytes = await subscriber.get_async(timeout=1.0)
+                if frame_bytes is None:
+                    if subscriber.closed:
+                        break
+                    continue
+
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        finally:
+            broker.unsubscribe(subscriber)
 
     def cleanup(self):
+        self.running = False
+        self.raw_broker.close()
+        self.detection_broker.close()
+        if self.producer.is_alive():
+            self.producer.join(timeout=2.0)
         if self.camera is not None:
-            self.camera.release()
\ No newline at end of file
+            self.camera.release()
+
+
+class BatchInferenceStage:
+    """여러 카메라의 최신 프레임을 모아 한 번의 배치 forward pass로 추론하는 스테이지"""
+
+    def __init__(self, detector: SafetyDetector, handlers: list, frame_ready: threading.Event,
+                 max_batch_size: int = 16):
+        self.detector = detector
+        self.handlers = handlers
+        self.frame_ready = frame_ready
+        self.max_batch_size = max_batch_size
+        self.last_batch_size = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _collect_jobs(self) -> list:
+        jobs = []
+        for handler in self.handlers:
+            job = handler.take_inference_frame()
+            if job is not None:
+                jobs.append((handler,) + job)
+        return jobs
+
+    def run_once(self) -> int:
+        """추론이 필요한 카메라들의 프레임을 배치로 처리하고 처리한 프레임 수를 반환"""
+        jobs = self._collect_jobs()
+        for start in range(0, len(jobs), self.max_batch_size):
+            batch = jobs[start:start + self.max_batch_size]
+            frames = [frame for _, frame, _, _ in batch]
+            trackers = [handler.tracker for handler, _, _, _ in batch]
+            timestamps = [captured_at.timestamp() for _, _, _, captured_at in batch]
+            start_time = time.perf_counter()
+            try:
+                batch_results = self.detector.process_batch(frames, trackers, timestamps)
+            except Exception as e:
+                print(f"Error during detection: {e}")
+                batch_results = [[] for _ in batch]
+            for (handler, frame, seq, captured_at), results in zip(batch, batch_results):
+                handler.complete_inference(frame, seq, captured_at, results)
+                FRAME_LATENCY_SECONDS.observe(time.perf_counter() - start_time)
+            self.last_batch_size = len(batch)
+        return len(jobs)
+
+    def _run(self):
+        while self.running:
+            # 새 프레임이 없으면 대기 (백그라운드 주기 확인을 위해 타임아웃)
+            self.frame_ready.wait(timeout=0.1)
+            self.frame_ready.clear()
+            self.run_once()
+
+    def stop(self):
+        self.running = False
+        self.frame_ready.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
@@ -0,0 +1,156 @@
+import time
+from typing import Optional
+import numpy as np
+
+
+def iou_matrix(boxes1, boxes2):
+    """boxes1(N,4) x boxes2(M,4) IoU 행렬(N,M)"""
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+
+    inter_w = np.clip(np.minimum(boxes1[:, None, 2], boxes2[None, :, 2]) -
+                      np.maximum(boxes1[:, None, 0], boxes2[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(boxes1[:, None, 3], boxes2[None, :, 3]) -
+                      np.maximum(boxes1[:, None, 1], boxes2[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area1 = ((boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1]))[:, None]
+    area2 = ((boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1]))[None, :]
+    union = area1 + area2 - inter
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, inter / union, 0.0)
+
+
+def greedy_match(iou, threshold):
+    """IoU가 큰 쌍부터 1:1로 매칭 - [(행, 열)] 반환"""
+    if iou.size == 0:
+        return []
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows, used_cols, matches = set(), set(), []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+    return matches
+
+
+class KalmanBoxFilter:
+    """박스 중심/크기 (cx, cy, w, h)와 그 속도를 추정하는 등속 칼만 필터
+
+    추론 간격이 일정하지 않으므로(장면 변화/heartbeat) 예측은 경과 시간(초) 기준이며,
+    잡음은 박스 높이에 비례하도록 잡는다.
+    """
+
+    std_position = 1 / 20
+    std_velocity = 1 / 10
+
+    def __init__(self, box):
+        measurement = self._to_measurement(box)
+        self.mean = np.concatenate([measurement, np.zeros(4)])
+        height = measurement[3]
+        std = np.array([2 * self.std_position * height] * 4 + [10 * self.std_velocity * height] * 4)
+        self.covariance = np.diag(std ** 2)
+
+    @staticmethod
+    def _to_measurement(box):
+        x1, y1, x2, y2 = np.asarray(box, dtype=np.float64)
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, max(x2 - x1, 1.0), max(y2 - y1, 1.0)])
+
+    def predict(self, dt):
+        motion = np.eye(8)
+        motion[:4, 4:] = np.eye(4) * dt
+        height = self.mean[3]
+        std = np.array([self.std_position * height] * 4 + [self.std_velocity * height] * 4)
+        self.mean = motion @ self.mean
+        self.mean[2:4] = np.maximum(self.mean[2:4], 1.0)
+        self.covariance = motion @ self.covariance @ motion.T + np.diag(std ** 2) * max(dt, 1e-3)
+
+    def update(self, box):
+        measurement = self._to_measurement(box)
+        noise = np.diag((np.array([self.std_position * self.mean[3]] * 4)) ** 2)
+        projected_cov = self.covariance[:4, :4] + noise
+        gain = np.linalg.solve(projected_cov, self.covariance[:4, :]).T
+        self.mean = self.mean + gain @ (measurement - self.mean[:4])
+        self.covariance = self.covariance - gain @ self.covariance[:4, :]
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.mean[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    def __init__(self, track_id: int, box, now: float):
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(box)
+        self.hits = 1
+        self.updated_at = now
+        self.predicted_at = now
+
+    def predict(self, now: float):
+        self.filter.predict(now - self.predicted_at)
+        self.predicted_at = now
+
+    def update(self, box, now: float):
+        self.filter.update(box)
+        self.hits += 1
+        self.updated_at = now
+
+
+class PersonTracker:
+    """ByteTrack 방식의 가벼운 사람 추적기 (CPU, IoU + 칼만 필터)
+
+    1) 신뢰도 high_threshold 이상 박스를 모든 트랙의 예측 위치와 IoU로 매칭하고
+    2) 남은 트랙은 low_threshold~high_threshold 박스와 한 번 더 매칭한다.
+    매칭되지 않은 높은 신뢰도 박스는 새 트랙이 되고, max_age초 동안 갱신되지 않은 트랙은 삭제된다.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, high_threshold: float = 0.8,
+                 low_threshold: float = 0.5, max_age: float = 15.0):
+        self.iou_threshold = iou_threshold
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.max_age = max_age
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, boxes, scores, now: Optional[float] = None) -> np.ndarray:
+        """박스(N,4)/신뢰도(N,)를 반영하고 박스별 트랙 ID(N,)를 반환 (추적하지 않은 박스는 -1)"""
+        now = time.monotonic() if now is None else now
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        track_ids = np.full(len(boxes), -1, dtype=int)
+
+        for track in self.tracks:
+            track.predict(now)
+
+        high = np.flatnonzero(scores >= self.high_threshold)
+        low = np.flatnonzero((scores >= self.low_threshold) & (scores < self.high_threshold))
+        remaining = list(range(len(self.tracks)))
+
+        for candidates in (high, low):
+            if not len(candidates) or not remaining:
+                continue
+            predicted = np.array([self.tracks[i].filter.box for i in remaining])
+            matches = greedy_match(iou_matrix(predicted, boxes[candidates]), self.iou_threshold)
+            for row, col in matches:
+                track = self.tracks[remaining[row]]
+                track.update(boxes[candidates[col]], now)
+                track_ids[candidates[col]] = track.track_id
+            matched_rows = {row for row, _ in matches}
+            remaining = [index for row, index in enumerate(remaining) if row not in matched_rows]
+
+        # 매칭되지 않은 높은 신뢰도 박스는 새 트랙
+        for index in high[track_ids[high] < 0].tolist():
+            track = Track(self._next_id, boxes[index], now)
+            self._next_id += 1
+            self.tracks.append(track)
+            track_ids[index] = track.track_id
+
+        self.tracks = [track for track in self.tracks if now - track.updated_at <= self.max_age]
+        return track_ids
+
+    def __len__(self):
+        return len(self.tracks)
@@ -0,0 +1,33 @@
+import sys
+import types
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def fake_yolo(monkeypatch):
+    """ultralytics 대신 쓰는 가짜 YOLO - 모델 파일 없이 outputs([x1, y1, x2, y2, conf, cls] 목록)를 결과로 반환"""
+
+    class Boxes:
+        def __init__(self, data):
+            data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+            self.xyxy, self.conf, self.cls = data[:, :4], data[:, 4], data[:, 5]
+
+    class Results:
+        def __init__(self, data):
+            self.boxes = Boxes(data)
+
+    class YOLO:
+        outputs = []
+
+        def __init__(self, model_path):
+            self.model_path = model_path
+            self.names = {0: 'hard_hat', 1: 'person', 2: 'safety_vest'}
+
+        def __call__(self, frames, **kwargs):
+            return [Results(self.outputs) for _ in frames]
+
+    module = types.ModuleType('ultralytics')
+    module.YOLO = YOLO
+    monkeypatch.setitem(sys.modules, 'ultralytics', module)
+    return YOLO
@@ -1,8 +1,13 @@
+import os
 import pytest
 import numpy as np
 from safewatch.camera import Camera
 from safewatch.detection import SafetyDetector
 from safewatch.util.check_overlap import check_overlap 
+from common.inference import create_engine
+
+# 실제 학습 가중치 (저장소에 포함되지 않음 - 있을 때만 실제 모델 smoke test 실행)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'best_final.pt')
 
 @pytest.fixture
 def sample_frame():
@@ -47,7 +52,7 @@ def test_camera_initialization(mock_camera):
     assert len(frame.shape) == 3
     camera.release()
 
-def test_detector_initialization(mock_db):
+def test_detector_initialization(mock_db, fake_yolo):
     detector = SafetyDetector(db_connection=mock_db)
     assert detector is not None
     assert detector.model is not None
@@ -61,13 +66,24 @@ def test_overlap_check():
     assert check_overlap((0, 0, 10, 10), (20, 20, 30, 30)) == False
     assert check_overlap((0, 0, 10, 10), (0, 0, 8, 8)) == True  # 64% 겹침
 
-def test_process_detections(mock_db, sample_frame):
+def test_process_detections(mock_db, sample_frame, fake_yolo):
     detector = SafetyDetector(db_connection=mock_db)
     results = detector.process_detections(sample_frame, save_to_db=False)
     assert isinstance(results, list)
     assert len(results) == 0
 
-def test_detector_confidence_thresholds(mock_db):
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="models/best_final.pt 가중치 파일 없음")
+def test_real_model_smoke(mock_db, sample_frame):
+    """실제 가중치를 create_engine으로 로드해 한 프레임 추론 (fake_yolo 없이)"""
+    pytest.importorskip('ultralytics')
+    detector = SafetyDetector(db_connection=mock_db, load_model=False)
+    detector.model = create_engine(MODEL_PATH, conf=min(detector.CONF_THRESHOLDS.values()), iou=0.5)
+
+    assert len(detector.model.names) >= len(detector.CLASS_NAMES)
+    results = detector.process_detections(sample_frame, save_to_db=False)
+    assert isinstance(results, list)
+
+def test_detector_confidence_thresholds(mock_db, fake_yolo):
     detector = SafetyDetector(db_connection=mock_db)
     assert all(0 <= conf <= 1 for conf in detector.CONF_THRESHOLDS.values())
 
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from safewatch.db_sqlite import SQLiteDB
+from safewatch.detection_query import build_list_query, decode_cursor, encode_cursor
+
+START = datetime(2024, 1, 1, 9, 0, 0)
+
+
+def make_record(i):
+    return {
+        'camera_id': 'CAM_001' if i % 2 else 'CAM_002',
+        # 2건씩 같은 시각 - 시각이 같아도 detection_id로 순서가 정해져야 함
+        'detection_time': START + timedelta(seconds=i // 2),
+        'detection_object': {'hard_hat': False, 'safety_vest': i % 3 == 0, 'track_id': i},
+        'risk_level': 'MEDIUM' if i % 3 == 0 else 'LOW',
+        'content': '전부 미착용' if i % 3 == 0 else '안전모 미착용',
+        'image_url': f'evidence-{i}'
+    }
+
+def read_all(db, **filters):
+    pages, cursor = [], None
+    while True:
+        page = db.list_detections(cursor=cursor, limit=4, **filters)
+        pages.append(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_all_rows_newest_first():
+    db = SQLiteDB()
+    db.insert_detections([make_record(i) for i in range(10)])
+
+    pages = read_all(db)
+    rows = [item for page in pages for item in page]
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert [item['detection_object']['track_id'] for item in rows] == list(range(9, -1, -1))
+    assert rows[0]['detection_time'] == START + timedelta(seconds=4)
+    # 목록에는 이미지 컬럼이 없고, 이미지는 한 건씩 조회
+    assert 'image_url' not in rows[0]
+    assert db.get_image_ref(rows[0]['detection_id']) == 'evidence-9'
+    assert db.get_image_ref(999) is None
+
+def test_filters_combine_with_pagination():
+    db = SQLiteDB()
+    db.insert_detections([make_record(i) for i in range(12)])
+
+    rows = [item for page in read_all(db, camera_id='CAM_001', risk_levels=['LOW'],
+                                       start=START + timedelta(seconds=1), end=START + timedelta(seconds=5))
+            for item in page]
+    assert [item['detection_object']['track_id'] for item in rows] == [7, 5]
+    assert all(item['content'] == '안전모 미착용' for item in rows)
+    assert db.list_detections(content='전부', limit=50)['items'][0]['risk_level'] == 'MEDIUM'
+
+def test_oracle_query_uses_keyset_condition_without_image_column():
+    sql, params = build_list_query('oracle', risk_levels=['HIGH', 'MEDIUM'], limit=20,
+                                   cursor=encode_cursor(START, 7))
+    assert 'image_url' not in sql.lower() and 'OFFSET' not in sql
+    assert sql.endswith("ORDER BY detection_time DESC, detection_id DESC FETCH FIRST :row_limit ROWS ONLY")
+    assert params['cursor_time'] == START and params['cursor_id'] == 7 and params['row_limit'] == 21
+    assert params['risk_level_0'] == 'HIGH' and params['risk_level_1'] == 'MEDIUM'
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+import cv2
+import numpy as np
+import pytest
+import safewatch  # noqa: F401  (common 경로 추가)
+from common.evidence_store import EvidenceStore
+from database.migrate_evidence import migrate
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EvidenceStore(root_dir=str(tmp_path))
+
+
+@pytest.fixture
+def frame():
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    image[100:300, 200:300] = 255
+    return image
+
+
+def test_same_frame_is_stored_once(store, frame, tmp_path):
+    first = store.save_evidence(frame)
+    second = store.save_evidence(frame)
+
+    assert first == second
+    frame_files = [name for _, _, files in os.walk(tmp_path)
+                   for name in files if name.count('.') == 1]
+    assert len(frame_files) == 1
+
+
+def test_concurrent_saves_of_same_frame(store, frame, tmp_path):
+    results, errors = [], []
+
+    def save():
+        try:
+            results.append(store.save_evidence(frame, bbox=(200, 100, 300, 300)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors and len(set(results)) == 1
+    # 임시 파일이 남지 않음
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith('.tmp')]
+
+
+def test_crop_and_thumbnail_per_person(store, frame):
+    person_a = store.save_evidence(frame, bbox=(200, 100, 300, 300))
+    person_b = store.save_evidence(frame, bbox=(10, 10, 60, 60))
+
+    # 같은 프레임 해시를 공유하고 대상 영역만 다름
+    assert person_a.split('.')[0] == person_b.split('.')[0]
+    assert person_a != person_b
+
+    for evidence_id in (person_a, person_b):
+        assert store.path_for(evidence_id, 'frame') is not None
+        assert store.path_for(evidence_id, 'crop') is not None
+        assert store.path_for(evidence_id, 'thumb') is not None
+
+
+def test_padded_crop_is_clipped_to_frame(store, frame):
+    evidence_id = store.save_evidence(frame, bbox=(600, 440, 640, 480))
+    assert evidence_id.endswith('.594_434_640_480')
+
+
+def test_thumbnail_is_small(store, frame):
+    import cv2
+    evidence_id = store.save_evidence(frame)
+    thumb = cv2.imread(store.path_for(evidence_id, 'thumb'))
+    assert max(thumb.shape[:2]) == store.thumbnail_size
+
+
+def test_rejects_invalid_ids(store, frame):
+    store.save_evidence(frame)
+    assert store.path_for('../../etc/passwd') is None
+    assert store.path_for('a' * 64, 'frame') is None
+    assert store.path_for(store.save_evidence(frame), 'original') is None
+
+
+def test_blob_images_are_migrated_before_column_is_replaced(store, frame):
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE DETECTION (DETECTION_ID INTEGER PRIMARY KEY, IMAGE_URL BLOB)")
+    image_bytes = cv2.imencode('.jpg', frame)[1].tobytes()
+    connection.executemany("INSERT INTO DETECTION VALUES (?, ?)", [(1, image_bytes), (2, None), (3, image_bytes)])
+
+    assert migrate(connection, store, batch_size=1, dialect='sqlite') == 2
+
+    # BLOB 대신 증거 ID가 남고, 원본 JPEG 바이트가 그대로 증거 저장소에 저장됨
+    rows = dict(connection.execute("SELECT DETECTION_ID, IMAGE_URL FROM DETECTION").fetchall())
+    assert rows[2] is None and rows[1] == rows[3]
+    with open(store.path_for(rows[1]), 'rb') as f:
+        assert f.read() == image_bytes
+
+
+def test_blob_column_is_kept_when_an_image_cannot_be_migrated(store):
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE DETECTION (DETECTION_ID INTEGER PRIMARY KEY, IMAGE_URL BLOB)")
+    connection.execute("INSERT INTO DETECTION VALUES (1, ?)", (b'not a jpeg',))
+
+    with pytest.raises(RuntimeError):
+        migrate(connection, store, dialect='sqlite')
+    assert connection.execute("SELECT IMAGE_URL FROM DETECTION").fetchone()[0] == b'not a jpeg'
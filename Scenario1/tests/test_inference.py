@@ -0,0 +1,68 @@
+import sys
+import numpy as np
+import safewatch  # noqa: F401  (common 경로 추가)
+from common.inference import (Detections, ExportedGraphEngine, UltralyticsEngine,
+                              create_engine, select_device)
+
+
+class FakeGraphEngine(ExportedGraphEngine):
+    """export 그래프 출력(B, 4+nc, N)을 고정값으로 반환하는 엔진"""
+
+    def __init__(self, preds, **kwargs):
+        super().__init__(**kwargs)
+        self.preds = preds
+        self.batch_shapes = []
+
+    def _forward(self, batch):
+        self.batch_shapes.append(batch.shape)
+        return np.repeat(self.preds, len(batch), axis=0)
+
+
+def make_preds():
+    # (cx, cy, w, h, class0 점수, class1 점수) x 3개 후보
+    preds = np.zeros((1, 6, 3), dtype=np.float32)
+    preds[0, :, 0] = [32, 32, 10, 10, 0.1, 0.9]
+    preds[0, :, 1] = [33, 32, 10, 10, 0.1, 0.8]  # 첫 번째와 겹침 -> NMS로 제거
+    preds[0, :, 2] = [10, 20, 4, 4, 0.6, 0.0]
+    return preds
+
+
+def test_exported_graph_postprocess_maps_back_to_frame():
+    engine = FakeGraphEngine(make_preds(), conf=0.5, iou=0.5, imgsz=64)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    detections = engine(frame)[0]
+
+    # 640x480 -> 64x48 (scale 0.1, 위쪽 여백 8px)
+    np.testing.assert_allclose(detections.xyxy, [[270, 190, 370, 290], [80, 100, 120, 140]])
+    assert detections.cls.tolist() == [1, 0]
+    np.testing.assert_allclose(detections.conf, [0.9, 0.6], rtol=1e-6)
+
+
+def test_exported_graph_respects_conf_and_static_batch():
+    engine = FakeGraphEngine(make_preds(), conf=0.5, iou=0.5, imgsz=64)
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8)] * 3
+
+    results = engine(frames, conf=0.95)
+
+    assert [len(r) for r in results] == [0, 0, 0]
+    # 배치 크기 고정 그래프는 프레임별로 실행
+    assert engine.batch_shapes == [(1, 3, 64, 64)] * 3
+
+
+def test_ultralytics_engine_returns_arrays(fake_yolo):
+    fake_yolo.outputs = [[10, 20, 30, 40, 0.9, 2]]
+    engine = create_engine('model.pt', backend='ultralytics', device='cpu')
+    detections = engine(np.zeros((48, 64, 3), dtype=np.uint8))
+
+    assert isinstance(engine, UltralyticsEngine)
+    assert len(detections) == 1 and isinstance(detections[0], Detections)
+    assert detections[0].xyxy.tolist() == [[10, 20, 30, 40]]
+    assert detections[0].cls.tolist() == [2]
+
+
+def test_missing_runtime_falls_back_to_ultralytics(monkeypatch, fake_yolo):
+    monkeypatch.setitem(sys.modules, 'openvino', None)
+    engine = create_engine('model.pt', backend='openvino')
+    assert isinstance(engine, UltralyticsEngine)
+    assert engine.device == select_device()
@@ -0,0 +1,93 @@
+import threading
+import time
+import cv2
+import numpy as np
+from safewatch.detection import SafetyDetector
+from safewatch.util.stream import StreamHandler, BatchInferenceStage
+from common.inference import Detections
+from common.keyframe import BoxPropagator, KeyframeSchedule
+
+TEXTURE = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 255, (120, 60, 3), dtype=np.uint8), (3, 3), 0)
+
+
+def textured_frame(x):
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[60:180, x:x + 60] = TEXTURE
+    return frame
+
+class MovingCamera:
+    """프레임마다 2픽셀씩 오른쪽으로 움직이는 작업자"""
+
+    def __init__(self):
+        self.step = 0
+
+    def read_frame(self):
+        time.sleep(0.01)
+        self.step += 1
+        return textured_frame(40 + (self.step * 2) % 200)
+
+    def release(self):
+        pass
+
+class SlowModel:
+    """추론 1회에 50ms - 카메라(100fps)보다 느림"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, frames):
+        time.sleep(0.05)
+        self.calls += 1
+        return [Detections([[40, 60, 100, 180]], [0], [0.95]) for _ in frames]
+
+
+def test_box_propagator_follows_motion_after_late_reseed():
+    propagator = BoxPropagator()
+    for seq, x in enumerate(range(40, 100, 6), start=1):
+        propagator.push(seq, textured_frame(x))
+    # 1번 프레임 결과가 늦게 도착해도 기록해 둔 1번 영상에서 바로 현재 위치로 이동
+    propagator.reseed(1, [[40, 60, 100, 180]], ['person'])
+    boxes, payload = propagator.push(11, textured_frame(100))
+    assert payload == ['person']
+    assert np.allclose(boxes[0], [100, 60, 160, 180], atol=2)
+
+def test_keyframe_interval_adapts_to_latency():
+    schedule = KeyframeSchedule(budget=0.5, max_k=30, max_seconds=1.0, alpha=1.0)
+    for i in range(10):
+        schedule.tick(now=i / 30)
+    assert schedule.due(1, now=0.3)
+    schedule.mark(1, now=0.3)
+
+    schedule.observe(0.1)
+    # 100ms 추론을 30fps에서 시간의 절반만 쓰도록 -> 6프레임마다
+    assert schedule.k == 6
+    assert not schedule.due(6, now=0.4) and schedule.due(7, now=0.4)
+    schedule.observe(2.0)
+    # 키프레임 사이 최대 1초 (30프레임)
+    assert schedule.k == 30 and schedule.due(2, now=1.3)
+
+def test_keyframe_mode_streams_at_capture_rate():
+    detector = SafetyDetector(db_connection=None, load_model=False)
+    detector.model = SlowModel()
+    frame_ready = threading.Event()
+    handler = StreamHandler("CAM_001", MovingCamera(), detector, frame_ready=frame_ready,
+                            keyframes=KeyframeSchedule(budget=0.5))
+    stage = BatchInferenceStage(detector, [handler], frame_ready)
+    subscriber = handler.detection_broker.subscribe()
+    stage.start()
+    try:
+        published = 0
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            if subscriber.get(timeout=0.1) is not None:
+                published += 1
+        records = handler.results.since(0)
+    finally:
+        handler.detection_broker.unsubscribe(subscriber)
+        stage.stop()
+        handler.cleanup()
+
+    # 추론보다 훨씬 많은 프레임이 추적한 박스로 게시됨
+    assert detector.model.calls >= 2 and published > 2 * detector.model.calls
+    assert all(record['trigger'] == 'keyframe' for record in records)
+    assert handler.keyframes.k > 1
@@ -0,0 +1,70 @@
+import safewatch  # noqa: F401  (common 경로 추가)
+from common.metrics import MetricsRegistry, STAGE_SECONDS, enable_stage_metrics
+from common.profiling import stage_timer
+from safewatch.util.stream import FrameBroker
+
+
+def test_counter_and_gauge_render_prometheus_text():
+    registry = MetricsRegistry()
+    detections = registry.counter('test_detections', "Detections", ['risk_level'])
+    depth = registry.gauge('test_queue_depth', "Queue depth")
+    detections.labels('LOW').inc()
+    detections.labels(risk_level='LOW').inc(2)
+    detections.labels('HIGH').inc()
+    depth.set_function(lambda: 7)
+
+    text = registry.render()
+
+    assert "# TYPE test_detections counter" in text
+    assert 'test_detections_total{risk_level="LOW"} 3.0' in text
+    assert 'test_detections_total{risk_level="HIGH"} 1.0' in text
+    assert "# TYPE test_queue_depth gauge" in text
+    assert "test_queue_depth 7" in text
+    # 같은 이름은 같은 지표
+    assert registry.counter('test_detections', "Detections", ['risk_level']) is detections
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('test_latency_seconds', "Latency", buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3.0):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert 'test_latency_seconds_bucket{le="0.01"} 1' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 3' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count 4' in text
+    assert 'test_latency_seconds_sum 3.105' in text
+
+
+def test_stage_timer_feeds_stage_histogram():
+    enable_stage_metrics()
+    before = STAGE_SECONDS.labels('unit_test').counts[:]
+    with stage_timer.stage('unit_test'):
+        pass
+    assert sum(STAGE_SECONDS.labels('unit_test').counts) == sum(before) + 1
+    # 벤치마크용 누적은 enabled일 때만
+    assert stage_timer.collect() == {}
+
+
+def test_broker_reports_clients_and_dropped_frames():
+    registry = MetricsRegistry()
+    clients = registry.gauge('test_clients', "Clients").labels()
+    dropped = registry.counter('test_dropped', "Dropped").labels()
+    broker = FrameBroker(clients_gauge=clients, dropped_counter=dropped)
+
+    first = broker.subscribe()
+    second = broker.subscribe()
+    assert clients.value == 2
+
+    broker.publish(b'1')
+    broker.publish(b'2')
+    assert dropped.value == 2
+
+    broker.unsubscribe(first)
+    assert clients.value == 1
+    broker.close()
+    assert clients.value == 0
+    assert second.closed
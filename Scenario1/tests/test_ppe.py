@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from safewatch.detection import SafetyDetector
+from safewatch.detection_config import DetectConfig
+from safewatch.util.check_overlap import check_overlap, check_overlap_matrix
+from safewatch.util.ppe import filter_detections, match_ppe
+
+
+class _Array:
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+class _Boxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy, self.cls, self.conf = _Array(xyxy), _Array(cls), _Array(conf)
+
+    def __len__(self):
+        return len(self.xyxy.array)
+
+class _Result:
+    def __init__(self, xyxy, cls, conf):
+        self.boxes = _Boxes(xyxy, cls, conf)
+
+
+@pytest.fixture
+def mock_db():
+    class MockDB:
+        def insert_detection(self, *args, **kwargs):
+            pass
+        def close(self):
+            pass
+    return MockDB()
+
+
+def random_scene(rng, n_people):
+    """사람 주변에 안전모/조끼 후보 박스를 흩뿌린 장면"""
+    xyxy, cls, conf = [], [], []
+    for _ in range(n_people):
+        x1, y1 = rng.uniform(0, 500), rng.uniform(0, 200)
+        w, h = rng.uniform(40, 140), rng.uniform(120, 280)
+        xyxy.append((x1, y1, x1 + w, y1 + h)); cls.append(0)
+        for class_id, (cy, ch) in ((1, (0.0, 0.2)), (2, (0.3, 0.6))):
+            jitter = rng.uniform(-0.4, 0.4, size=2) * w
+            xyxy.append((x1 + jitter[0], y1 + cy * h, x1 + w + jitter[1], y1 + (cy + ch) * h))
+            cls.append(class_id)
+    conf = rng.uniform(0.6, 1.0, size=len(cls))
+    return np.array(xyxy).reshape(-1, 4), np.array(cls), conf
+
+
+def scalar_person_info(xyxy, cls, conf, class_names, thresholds):
+    """벡터화 이전의 박스 단위 처리 경로 (비교 기준)"""
+    detections = {name: [] for name in class_names}
+    for (x1, y1, x2, y2), c, p in zip(xyxy, cls, conf):
+        class_name = class_names[int(c)]
+        if float(p) >= thresholds[class_name]:
+            detections[class_name].append((int(x1), int(y1), int(x2), int(y2)))
+
+    records = []
+    for px1, py1, px2, py2 in detections['human']:
+        person_height, person_width = py2 - py1, px2 - px1
+        head_height = int(person_height * 0.17)
+        head_width = int(person_width * 0.4)
+        center_x = (px1 + px2) // 2
+        head_region = (center_x - head_width // 2, py1, center_x + head_width // 2, py1 + head_height)
+        gap = person_height // 15
+        body_width = int(person_width * 0.7)
+        body_region = (center_x - body_width // 2, py1 + head_height + gap, center_x + body_width // 2, py2)
+        helmet = any(check_overlap(head_region, box) for box in detections['hard_hat'])
+        vest = any(check_overlap(body_region, box) for box in detections['safety_vest'])
+        records.append((head_region, body_region, helmet, vest))
+    return records
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_vectorized_ppe_matches_scalar_path(seed):
+    rng = np.random.default_rng(seed)
+    config = DetectConfig()
+    xyxy, cls, conf = random_scene(rng, n_people=int(rng.integers(0, 12)))
+    xyxy = xyxy.astype(np.float32)
+
+    detections = filter_detections(xyxy, cls, conf, config['classes'], config['thresholds'])
+    heads, bodies, helmets, vests = match_ppe(detections)
+
+    actual = [(tuple(head), tuple(body), bool(helmet), bool(vest))
+              for head, body, helmet, vest in zip(heads.tolist(), bodies.tolist(), helmets, vests)]
+    assert actual == scalar_person_info(xyxy, cls, conf, config['classes'], config['thresholds'])
+
+def test_overlap_matrix_matches_check_overlap():
+    rng = np.random.default_rng(0)
+    corners = rng.integers(0, 100, size=(30, 2))
+    regions = np.column_stack([corners, corners + 20])
+    boxes = np.column_stack([corners[::-1] + (3, -2), corners[::-1] + (25, 20)])
+    matrix = check_overlap_matrix(regions, boxes)
+    for i, region in enumerate(regions.tolist()):
+        for j, box in enumerate(boxes.tolist()):
+            assert matrix[i, j] == check_overlap(region, box)
+
+def test_process_results_returns_same_person_info(mock_db, fake_yolo):
+    detector = SafetyDetector(db_connection=mock_db)
+    rng = np.random.default_rng(42)
+    xyxy, cls, conf = random_scene(rng, n_people=6)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    results = detector.process_results(frame, [_Result(xyxy, cls, conf)])
+    expected = scalar_person_info(xyxy.astype(np.float32), cls, conf.astype(np.float32),
+                                  detector.CLASS_NAMES, detector.CONF_THRESHOLDS)
+
+    assert [(r['helmet_detected'], r['vest_detected']) for r in results] == \
+        [(helmet, vest) for _, _, helmet, vest in expected]
+    assert all(isinstance(r['helmet_detected'], bool) for r in results)
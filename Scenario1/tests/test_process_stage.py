@@ -0,0 +1,92 @@
+import threading
+import time
+import numpy as np
+from safewatch.detection import SafetyDetector
+from safewatch.util.process_stage import ProcessInferenceStage
+from safewatch.util.shm_ring import SharedFrameRing
+from safewatch.util.stream import StreamHandler
+from safewatch.util.tracker import PersonTracker
+from common.inference import Detections
+from common.metrics import FRAME_LATENCY_SECONDS, INFERENCE_SECONDS
+
+
+class FakeCamera:
+    def __init__(self):
+        self.step = 0
+
+    def read_frame(self):
+        time.sleep(0.01)
+        self.step += 1
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[:, :, 0] = self.step % 256
+        return frame
+
+    def release(self):
+        pass
+
+class FakeModel:
+    """프레임마다 안전모만 쓴 작업자 1명"""
+
+    def __call__(self, frame):
+        return [Detections([[100, 40, 160, 220], [118, 40, 142, 68]], [0, 1], [0.95, 0.9])]
+
+def create_fake_detector():
+    detector = SafetyDetector(db_connection=None, load_model=False)
+    detector.model = FakeModel()
+    return detector
+
+
+def test_shared_frame_ring_round_trip():
+    ring = SharedFrameRing(slots=2, slot_bytes=48 * 64 * 3)
+    try:
+        frame = np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+        slot = ring.acquire()
+        shape = ring.write(slot, frame)
+
+        # 다른 프로세스처럼 이름으로 연결해 같은 메모리를 봄
+        attached = SharedFrameRing.attach(*ring.info)
+        view = attached.view(slot, shape)
+        assert np.array_equal(view, frame)
+        view[0, 0] = 7
+        assert (ring.view(slot, shape)[0, 0] == 7).all()
+        del view
+        attached.close()
+
+        assert ring.acquire() is not None and ring.acquire() is None
+        assert not ring.fits(np.zeros((480, 640, 3), dtype=np.uint8))
+    finally:
+        ring.close()
+
+def test_process_stage_publishes_results_in_frame_order():
+    frame_ready = threading.Event()
+    handler = StreamHandler("CAM_001", FakeCamera(), create_fake_detector(), frame_ready=frame_ready,
+                            tracker=PersonTracker())
+    stage = ProcessInferenceStage([handler], frame_ready, workers=2, detector_factory=create_fake_detector)
+    subscriber = handler.detection_broker.subscribe()
+    model_calls = sum(INFERENCE_SECONDS.labels().counts)
+    frames = sum(FRAME_LATENCY_SECONDS.labels().counts)
+    stage.start()
+    try:
+        deadline = time.monotonic() + 30
+        while len(handler.results) < 6 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        records = handler.results.since(0)
+        assert len(records) >= 6
+
+        seqs = [record['seq'] for record in records]
+        assert seqs == sorted(seqs)
+        # 추적기는 부모에서 프레임 순서대로 갱신되므로 같은 작업자는 같은 track_id
+        track_ids = {record['results'][0]['track_id'] for record in records}
+        assert len(track_ids) == 1 and None not in track_ids
+        assert records[-1]['results'][0]['content'] == "안전조끼 미착용"
+        # 작업 프로세스가 그린 프레임과 인코딩한 JPEG가 부모에 전달됨
+        assert records[-1]['frame'].any()
+        assert subscriber.get(timeout=1).startswith(b'\xff\xd8')
+        assert handler.jpeg_cache.get((handler.camera_id, 'annotated', seqs[-1])) is not None
+        # 작업 프로세스의 모델 호출 시간은 부모가 기록하고, 프레임 지연은 게시 시점에 따로 기록
+        assert sum(INFERENCE_SECONDS.labels().counts) - model_calls >= len(records)
+        assert sum(FRAME_LATENCY_SECONDS.labels().counts) - frames >= len(records)
+    finally:
+        handler.detection_broker.unsubscribe(subscriber)
+        stage.stop()
+        handler.cleanup()
@@ -0,0 +1,266 @@
+import sqlite3
+import time
+from datetime import datetime
+import numpy as np
+from safewatch.db_sqlite import SQLiteDB
+from safewatch.detection import SafetyDetector
+from common.evidence_store import EvidenceStore
+from common.metrics import DB_QUEUE_DEPTH, DB_RECORDS, DB_WRITE_SECONDS
+from common.spool import DetectionSpool, ReconnectingSink, classify_error, spool_path
+
+
+def make_record(i):
+    return {
+        'camera_id': 'CAM_001',
+        'detection_time': datetime(2024, 1, 1, 9, 0, i),
+        'detection_object': {'hard_hat': False, 'safety_vest': True, 'track_id': i},
+        'risk_level': 'LOW',
+        'content': '안전모 미착용',
+        'image_url': f'evidence-{i}'
+    }
+
+class FlakyDB:
+    """down 상태이거나 poison 이벤트가 있으면 실패하는 DB"""
+
+    def __init__(self, failures=0, poison=None, poison_error=ValueError):
+        self.failures = failures
+        self.poison = poison
+        self.poison_error = poison_error
+        self.attempts = 0
+        self.records = []
+
+    def __call__(self, records):
+        self.attempts += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("DB unavailable")
+        if any(record['image_url'] == self.poison for record in records):
+            raise self.poison_error("bad record")
+        self.records.extend(records)
+
+class RecordingDB(SQLiteDB):
+    """배치 크기를 기록하고 INSERT마다 delay만큼 느린 SQLite 대체 DB"""
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.batch_sizes = []
+
+    def insert_detections(self, records):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(records))
+        super().insert_detections(records)
+
+    def close(self):
+        pass
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_spool_replays_in_order_after_outage(tmp_path):
+    db = FlakyDB(failures=3)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db, batch_size=4, retry_delay=0.01)
+    for i in range(10):
+        assert spool.insert_detection(**make_record(i))
+
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    stats = spool.get_stats()
+    spool.close()
+
+    assert [record['image_url'] for record in db.records] == [f'evidence-{i}' for i in range(10)]
+    assert db.records[0]['detection_time'] == datetime(2024, 1, 1, 9, 0, 0)
+    assert stats['drained'] == 10 and stats['retries'] == 3 and not stats['failing']
+
+def test_spool_keeps_events_on_disk_across_restart(tmp_path):
+    path = str(tmp_path / "spool.db")
+    spool = DetectionSpool(path, FlakyDB(failures=1000), retry_delay=10)
+    for i in range(3):
+        spool.insert_detection(**make_record(i))
+    assert wait_until(lambda: spool.get_stats()['failing'])
+    pending, lag = spool.backlog()
+    spool.close(timeout=0.1)
+    assert pending == 3 and lag >= 0
+
+    # 재시작 후 DB가 살아 있으면 남은 이벤트를 저장 (SQLite 대체 DB로 실제 INSERT)
+    sqlite_db = SQLiteDB()
+    sqlite_db.close = lambda: None
+    inserted = DB_RECORDS.labels('inserted').value
+    writes = sum(DB_WRITE_SECONDS.labels().counts)
+    spool = DetectionSpool(path, ReconnectingSink(lambda: sqlite_db))
+    assert wait_until(lambda: sqlite_db.count() == 3)
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    # sink가 DB 쓰기 지표를 기록하고, 대기열 지표는 spool 잔량을 따라감
+    assert DB_RECORDS.labels('inserted').value - inserted == 3
+    assert sum(DB_WRITE_SECONDS.labels().counts) > writes
+    assert 'safewatch_db_queue_depth{spool="detections"} 0' in DB_QUEUE_DEPTH.render()
+    spool.close()
+
+def test_spool_moves_poison_event_aside_after_max_attempts(tmp_path):
+    db = FlakyDB(poison='evidence-2')
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db, batch_size=8, retry_delay=0.01, max_attempts=2)
+    for i in range(5):
+        spool.insert_detection(**make_record(i))
+
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    stats = spool.get_stats()
+    spool.close()
+
+    # 실패한 배치에서 문제 이벤트만 분리되고 나머지는 순서대로 저장됨
+    assert stats['dead'] == 1
+    assert [record['image_url'] for record in db.records] == ['evidence-0', 'evidence-1', 'evidence-3', 'evidence-4']
+
+def test_spool_moves_permanent_db_error_aside_without_retrying(tmp_path):
+    db = FlakyDB(poison='evidence-1', poison_error=sqlite3.IntegrityError)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db, batch_size=8, retry_delay=10, max_attempts=100)
+    for i in range(3):
+        spool.insert_detection(**make_record(i))
+
+    # 백오프(10초) 없이 배치 실패 -> 단독 시도에서 바로 dead
+    assert wait_until(lambda: spool.backlog()[0] == 0, timeout=3.0)
+    stats = spool.get_stats()
+    spool.close()
+
+    assert stats['dead'] == 1
+    assert [record['image_url'] for record in db.records] == ['evidence-0', 'evidence-2']
+
+def test_spool_retries_connection_errors_beyond_max_attempts(tmp_path):
+    db = FlakyDB(failures=5)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db, retry_delay=0.01, max_attempts=2)
+    spool.insert_detection(**make_record(0))
+
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    stats = spool.get_stats()
+    spool.close()
+
+    # DB 장애 중에는 이벤트를 dead로 보내지 않음
+    assert stats['dead'] == 0 and db.attempts == 6
+    assert [record['image_url'] for record in db.records] == ['evidence-0']
+
+def test_classify_error():
+    assert classify_error(ConnectionError("down")) == 'transient'
+    assert classify_error(sqlite3.OperationalError("database is locked")) == 'transient'
+    assert classify_error(sqlite3.IntegrityError("unique constraint")) == 'permanent'
+    assert classify_error(sqlite3.DatabaseError("bad value")) == 'permanent'
+    assert classify_error(ValueError("bad record")) == 'unknown'
+    # cx_Oracle은 연결 끊김(ORA-03113)도 DatabaseError로 올려 보냄 - 오류 코드로 구분
+    error = type('_Error', (), {'code': 3113, 'message': 'ORA-03113: end-of-file on communication channel'})()
+    assert classify_error(type('DatabaseError', (Exception,), {})(error)) == 'transient'
+
+def test_spool_moves_undecodable_row_aside_and_keeps_draining(tmp_path):
+    path = str(tmp_path / "spool.db")
+    spool = DetectionSpool(path, FlakyDB(failures=1000), retry_delay=10)
+    for i in range(3):
+        spool.insert_detection(**make_record(i))
+    spool.close(timeout=0.1)
+    # 손상된 행 (가운데 이벤트)
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE spool SET record = '{not json' WHERE id = 2")
+    connection.commit()
+    connection.close()
+
+    db = FlakyDB()
+    spool = DetectionSpool(path, db, retry_delay=0.01)
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    stats = spool.get_stats()
+    spool.close()
+
+    assert stats['dead'] == 1
+    assert [record['image_url'] for record in db.records] == ['evidence-0', 'evidence-2']
+
+def test_db_queue_depth_is_reported_per_spool(tmp_path):
+    first = DetectionSpool(str(tmp_path / "first.db"), FlakyDB(failures=1000), name="first", retry_delay=10)
+    second = DetectionSpool(str(tmp_path / "second.db"), FlakyDB(failures=1000), name="second", retry_delay=10)
+    for i in range(3):
+        first.insert_detection(**make_record(i))
+    second.insert_detection(**make_record(0))
+
+    # 나중에 만든 spool이 먼저 만든 spool의 값을 덮어쓰지 않음
+    text = DB_QUEUE_DEPTH.render()
+    assert 'safewatch_db_queue_depth{spool="first"} 3' in text
+    assert 'safewatch_db_queue_depth{spool="second"} 1' in text
+    first.close(timeout=0.1)
+    second.close(timeout=0.1)
+    assert 'spool="first"' not in DB_QUEUE_DEPTH.render()
+
+def test_spool_drains_in_batches_by_size(tmp_path):
+    db = RecordingDB(delay=0.05)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db.insert_detections, batch_size=4)
+    for i in range(10):
+        spool.insert_detection(**make_record(i))
+    assert wait_until(lambda: db.count() == 10)
+    stats = spool.get_stats()
+    spool.close()
+
+    assert sum(db.batch_sizes) == 10 and max(db.batch_sizes) <= 4
+    assert stats['drained'] == 10 and stats['batches'] == len(db.batch_sizes)
+    assert stats['max_flush_latency_ms'] >= stats['avg_flush_latency_ms'] >= 50
+
+def test_spool_drains_partial_batch_without_waiting(tmp_path):
+    db = RecordingDB()
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db.insert_detections, batch_size=100, poll_interval=5.0)
+    spool.insert_detection(**make_record(0))
+    assert wait_until(lambda: db.count() == 1, timeout=2.0)
+    spool.close()
+    assert db.batch_sizes == [1]
+
+def test_spool_applies_backpressure_when_full(tmp_path):
+    db = RecordingDB(delay=0.2)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db.insert_detections, batch_size=1,
+                           max_pending=2, put_timeout=0.01)
+    accepted = [spool.insert_detection(**make_record(i)) for i in range(10)]
+    assert wait_until(lambda: spool.backlog()[0] == 0)
+    stats = spool.get_stats()
+    spool.close()
+
+    assert not all(accepted)
+    assert stats['rejected'] == accepted.count(False)
+    assert db.count() == accepted.count(True)
+
+def test_spool_append_waits_for_space_up_to_put_timeout(tmp_path):
+    db = RecordingDB(delay=0.05)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), db.insert_detections, batch_size=1,
+                           max_pending=1, put_timeout=2.0)
+    # drainer가 자리를 만들 때까지 기다리므로 거부 없이 모두 저장
+    assert all(spool.insert_detection(**make_record(i)) for i in range(5))
+    assert wait_until(lambda: db.count() == 5)
+    spool.close()
+
+def test_save_detections_reports_rejected_and_failed_writes(tmp_path, capsys):
+    person = {'risk_level': 'LOW', 'helmet_detected': False, 'vest_detected': True, 'content': '안전모 미착용',
+              'detection_object': ['hard_hat'], 'bbox': (10, 10, 40, 60)}
+    frame = np.zeros((80, 80, 3), dtype=np.uint8)
+    spool = DetectionSpool(str(tmp_path / "spool.db"), FlakyDB(failures=1000), retry_delay=10,
+                           max_pending=0, put_timeout=0)
+    detector = SafetyDetector(spool, evidence_store=EvidenceStore(str(tmp_path / "evidence")), load_model=False)
+    rejected, failed = DB_RECORDS.labels('rejected').value, DB_RECORDS.labels('failed').value
+
+    # spool이 거부하면 성공으로 출력하지 않고, 거부 건수는 spool이 한 번만 기록
+    detector.save_detections(frame, [person])
+    assert 'saved to DB' not in capsys.readouterr().out
+    assert DB_RECORDS.labels('rejected').value - rejected == 1
+    spool.close(timeout=0.1)
+
+    # DB 오류(예외)는 failed로 기록
+    class BrokenDB:
+        def insert_detection(self, **kwargs):
+            raise ConnectionError("DB unavailable")
+
+    detector.db = BrokenDB()
+    detector.save_detections(frame, [person])
+    assert 'Error saving to database' in capsys.readouterr().out
+    assert DB_RECORDS.labels('failed').value - failed == 1
+
+def test_sqlite_stand_in_matches_oracle_interface():
+    db = SQLiteDB()
+    db.insert_detection(**make_record(0))
+    assert db.count() == 1
+    db.close()
+
+def test_spool_path_is_per_scenario(monkeypatch, tmp_path):
+    monkeypatch.setenv("SPOOL_DIR", str(tmp_path))
+    assert spool_path("scenario2") == str(tmp_path / "scenario2.db")
+    assert spool_path("scenario1") != spool_path("scenario3")
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+from safewatch.camera_config import CameraConfig
+from common.jpeg_cache import EncodedFrameCache
+from safewatch.util.stream import FrameBroker, StreamHandler, BatchInferenceStage
+from safewatch.util.motion import MotionDetector
+from safewatch.util.pipeline import ResultBuffer, PersistencePolicy, DetectionScheduler
+
+
+def test_broker_fans_out_to_all_subscribers():
+    broker = FrameBroker()
+    subscribers = [broker.subscribe() for _ in range(3)]
+    broker.publish(b'frame-1')
+    assert all(sub.get(timeout=0.1) == b'frame-1' for sub in subscribers)
+    assert broker.subscriber_count == 3
+
+def test_slow_subscriber_drops_stale_frames():
+    broker = FrameBroker()
+    subscriber = broker.subscribe()
+    for i in range(5):
+        broker.publish(f'frame-{i}'.encode())
+    assert subscriber.get(timeout=0.1) == b'frame-4'
+    assert subscriber.dropped == 4
+
+def test_get_times_out_without_frames():
+    broker = FrameBroker()
+    subscriber = broker.subscribe()
+    assert subscriber.get(timeout=0.01) is None
+
+def test_unsubscribe_wakes_waiting_consumer():
+    broker = FrameBroker()
+    subscriber = broker.subscribe()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(subscriber.get(timeout=5)))
+    waiter.start()
+    broker.unsubscribe(subscriber)
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+    assert result == [None]
+    assert broker.subscriber_count == 0
+
+def test_async_subscriber_waits_without_blocking_loop():
+    async def scenario():
+        broker = FrameBroker()
+        subscriber = broker.subscribe(loop=asyncio.get_running_loop())
+        threading.Timer(0.05, broker.publish, args=(b'frame-1',)).start()
+        ticks = 0
+        waiter = asyncio.create_task(subscriber.get_async(timeout=2))
+        while not waiter.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        assert await subscriber.get_async(timeout=0.01) is None
+        return waiter.result(), ticks
+
+    frame_bytes, ticks = asyncio.run(scenario())
+    assert frame_bytes == b'frame-1'
+    # 대기 중에도 이벤트 루프의 다른 작업이 계속 실행됨
+    assert ticks > 1
+
+def test_result_buffer_is_bounded_and_ordered():
+    buffer = ResultBuffer(maxlen=3)
+    for seq in range(1, 6):
+        buffer.append({'seq': seq, 'results': []})
+    assert len(buffer) == 3
+    assert buffer.latest()['seq'] == 5
+    assert [record['seq'] for record in buffer.since(3)] == [4, 5]
+    assert buffer.wait_for_newer(5, timeout=0.01) is None
+
+def test_persistence_policy_respects_interval():
+    buffer = ResultBuffer()
+    policy = PersistencePolicy(interval=10)
+    buffer.append({'seq': 1, 'results': []})
+
+    record = policy.select(buffer, now=0)
+    assert record['seq'] == 1
+    policy.mark_persisted(record, now=0)
+
+    # 같은 결과는 다시 저장하지 않고, 주기 안의 새 결과도 건너뜀
+    assert policy.select(buffer, now=20) is None
+    buffer.append({'seq': 2, 'results': []})
+    assert policy.select(buffer, now=5) is None
+    assert policy.select(buffer, now=10)['seq'] == 2
+
+
+class FakeCamera:
+    def read_frame(self):
+        time.sleep(0.005)
+        return np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+class FakeBatchDetector:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def process_batch(self, frames, trackers=None, timestamps=None):
+        self.batch_sizes.append(len(frames))
+        # 카메라별 추적기가 프레임 순서대로 전달됨
+        assert len(trackers) == len(timestamps) == len(frames)
+        return [[{'risk_level': 'SAFE'}] for _ in frames]
+
+def test_batch_stage_runs_all_cameras_in_one_forward_pass():
+    detector = FakeBatchDetector()
+    frame_ready = threading.Event()
+    handlers = [StreamHandler(f"CAM_{i:03d}", FakeCamera(), detector, frame_ready=frame_ready)
+                for i in range(4)]
+    try:
+        while any(handler.read_frame() is None for handler in handlers):
+            time.sleep(0.01)
+        stage = BatchInferenceStage(detector, handlers, frame_ready, max_batch_size=16)
+
+        assert stage.run_once() == 4
+        assert detector.batch_sizes == [4]
+        assert all(handler.results.latest()['results'] == [{'risk_level': 'SAFE'}] for handler in handlers)
+        # 백그라운드 주기 내에는 다시 추론하지 않음
+        assert stage.run_once() == 0
+    finally:
+        for handler in handlers:
+            handler.cleanup()
+
+def test_camera_config_from_file(tmp_path):
+    config_path = tmp_path / "cameras.json"
+    config_path.write_text(json.dumps([
+        {"camera_id": "CAM_001", "source": "0"},
+        {"camera_id": "CAM_002", "source": "rtsp://example/stream", "width": 1280, "height": 720}
+    ]))
+    config = CameraConfig(str(config_path))
+    assert len(config) == 2
+    assert config[0]['source'] == 0
+    assert config[1]['width'] == 1280
+
+def test_scheduler_triggers_on_motion_and_heartbeat():
+    scheduler = DetectionScheduler(min_interval=2, max_interval=10)
+    assert scheduler.due(motion=False, now=0) == 'startup'
+    scheduler.mark_run('startup', now=0)
+
+    assert scheduler.due(motion=True, now=1) is None
+    assert scheduler.due(motion=True, now=2) == 'motion'
+    assert scheduler.due(motion=False, now=9) is None
+    assert scheduler.due(motion=False, now=10) == 'heartbeat'
+
+def test_motion_detector_ignores_static_scene():
+    detector = MotionDetector()
+    frame = np.full((480, 640, 3), 80, dtype=np.uint8)
+    assert not any(detector.update(frame) for _ in range(5))
+
+    moved = frame.copy()
+    moved[100:300, 200:400] = 255
+    assert detector.update(moved)
+
+def test_jpeg_cache_encodes_each_frame_quality_once():
+    cache = EncodedFrameCache()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(cache.encode(('CAM_001', 'raw', 1), frame)))
+               for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(set(results)) == 1 and results[0].startswith(b'\xff\xd8')
+    assert cache.get_stats()['encodes'] == 1
+    assert cache.encode(('CAM_001', 'raw', 1), frame, quality=50) != results[0]
+
+def test_jpeg_cache_does_not_share_frames_without_a_key():
+    cache = EncodedFrameCache()
+    black = np.zeros((48, 64, 3), dtype=np.uint8)
+    white = np.full((48, 64, 3), 255, dtype=np.uint8)
+
+    assert cache.encode(None, black) != cache.encode(None, white)
+    assert cache.get_stats() == {'entries': 0, 'hits': 0, 'encodes': 2}
+    assert cache.get_stats()['encodes'] == 2
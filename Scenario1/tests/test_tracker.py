@@ -0,0 +1,62 @@
+import numpy as np
+from safewatch.util.pipeline import ViolationEventPolicy
+from safewatch.util.tracker import PersonTracker, greedy_match, iou_matrix
+
+
+def test_iou_matrix_and_greedy_match():
+    boxes = np.array([[0, 0, 10, 10], [20, 0, 30, 10]])
+    iou = iou_matrix(boxes, [[0, 0, 10, 10], [5, 0, 15, 10], [21, 0, 31, 10]])
+    assert iou[0, 0] == 1.0
+    assert np.isclose(iou[0, 1], 50 / 150)
+    assert iou[1, 0] == 0.0
+    assert greedy_match(iou, 0.3) == [(0, 0), (1, 2)]
+
+
+def test_tracker_keeps_ids_for_moving_people():
+    tracker = PersonTracker(iou_threshold=0.3, high_threshold=0.8, max_age=1.0)
+    ids = []
+    for step in range(20):
+        # 두 작업자가 서로 반대 방향으로 이동 (입력 순서도 바뀜)
+        left = [100 + 5 * step, 100, 160 + 5 * step, 300]
+        right = [400 - 5 * step, 120, 460 - 5 * step, 320]
+        boxes = [left, right] if step % 2 == 0 else [right, left]
+        track_ids = tracker.update(boxes, [0.9, 0.9], now=step * 0.1)
+        ids.append(track_ids if step % 2 == 0 else track_ids[::-1])
+
+    assert all(list(step_ids) == [1, 2] for step_ids in ids)
+
+
+def test_tracker_matches_low_confidence_boxes_and_expires_tracks():
+    tracker = PersonTracker(high_threshold=0.8, low_threshold=0.5, max_age=1.0)
+    assert tracker.update([[0, 0, 50, 100]], [0.9], now=0.0).tolist() == [1]
+    # 낮은 신뢰도 박스는 기존 트랙만 이어가고 새 트랙은 만들지 않음
+    assert tracker.update([[2, 0, 52, 100], [300, 0, 350, 100]], [0.6, 0.6], now=0.1).tolist() == [1, -1]
+    assert len(tracker) == 1
+
+    # max_age 동안 보이지 않으면 삭제되고 같은 자리에 나타나도 새 ID
+    assert tracker.update([], [], now=2.0).tolist() == []
+    assert len(tracker) == 0
+    assert tracker.update([[2, 0, 52, 100]], [0.9], now=2.1).tolist() == [2]
+
+
+def test_violation_events_once_per_track():
+    policy = ViolationEventPolicy(realert_interval=60.0)
+
+    def person(track_id, risk_level, content):
+        return {'track_id': track_id, 'risk_level': risk_level, 'content': content}
+
+    no_hat = person(1, "LOW", "안전모 미착용")
+    assert [e['event'] for e in policy.select([no_hat, person(2, "SAFE", "전부 착용")], now=0.0)] == ['start']
+    # 같은 위반이 계속되면 저장하지 않음
+    assert policy.select([no_hat], now=10.0) == []
+    # 상태가 바뀌면 다시 저장
+    events = policy.select([person(1, "MEDIUM", "전부 미착용")], now=20.0)
+    assert [(e['track_id'], e['event']) for e in events] == [(1, 'change')]
+    # 재알림 간격이 지나면 한 번 더 저장
+    assert policy.select([person(1, "MEDIUM", "전부 미착용")], now=50.0) == []
+    assert [e['event'] for e in policy.select([person(1, "MEDIUM", "전부 미착용")], now=80.0)] == ['realert']
+    # 착용 후 다시 미착용이면 새 위반
+    assert policy.select([person(1, "SAFE", "전부 착용")], now=81.0) == []
+    assert [e['event'] for e in policy.select([no_hat], now=82.0)] == ['start']
+    # 추적 ID가 없으면 매번 저장
+    assert len(policy.select([person(None, "LOW", "안전모 미착용")] * 2, now=83.0)) == 2
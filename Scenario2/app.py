@@ -1,13 +1,23 @@
 # app.py
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, Response, FileResponse, PlainTextResponse
 from utils.camera import Camera
 from utils.detector import SafetyDetector
+import os
 import uvicorn
-from utils.helpers import generate_frames_feed
+import asyncio
+from utils.helpers import DetectionCoalescer, generate_frames_feed, inference_executor
+from utils.pipeline import StreamPipeline
+from utils.database import close_spool, get_db_metrics, start_spool
+from common.evidence_store import EVIDENCE_CACHE_HEADERS
+from common.keyframe import KeyframeSchedule
+from common.metrics import registry as metrics_registry, enable_stage_metrics, KEYFRAME_INTERVAL
 
 app = FastAPI()
 
+# 단계별 처리 시간을 /metrics 히스토그램으로 기록
+enable_stage_metrics()
+
 try:
     camera = Camera()  # 멀티스레드 카메라 초기화
 except Exception as e:
@@ -16,21 +26,96 @@ except Exception as e:
 
 detector = SafetyDetector()
 
+# /scenario2 동시 폴링을 하나의 추론으로 합침 - 기본적으로 이 시간(초) 이내의 결과는 캐시에서 제공
+RESULT_MAX_AGE = float(os.getenv("SCENARIO2_MAX_AGE", "0.5"))
+coalescer = DetectionCoalescer(camera, detector, max_age=RESULT_MAX_AGE)
+
+# /video_feed 키프레임 모드 (PIPELINE_KEYFRAME=1) - K 프레임마다만 추론하고 사이 프레임은 박스를 추적해 그림
+# K는 추론이 시간의 PIPELINE_KEYFRAME_BUDGET 비율만 쓰도록 측정한 추론 지연에 맞춰 자동 조정
+pipeline_keyframes = KeyframeSchedule(budget=float(os.getenv("PIPELINE_KEYFRAME_BUDGET", "0.5")),
+                                      gauge=KEYFRAME_INTERVAL.labels("CAM_002")) \
+    if os.getenv("PIPELINE_KEYFRAME", "0") == "1" else None
+
+# /video_feed 스트리밍 파이프라인 (캡처 -> 추론 -> 표시 -> 인코딩) - 단계별 작업 스레드 수와 단계 사이 큐 크기
+# (추론 단계는 탐지기 잠금으로 직렬화되므로 항상 1개)
+stream_pipeline = StreamPipeline(camera, detector, workers={
+    'draw': int(os.getenv("PIPELINE_DRAW_WORKERS", "1")),
+    'encode': int(os.getenv("PIPELINE_ENCODE_WORKERS", "2"))
+}, queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "2")), keyframes=pipeline_keyframes)
+
+@app.on_event("startup")
+async def startup_event():
+    # 이전 실행에서 DB에 저장하지 못한 이벤트도 새 탐지를 기다리지 않고 바로 저장 시작
+    start_spool()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stream_pipeline.stop()
+    # DB에 아직 저장하지 못한 이벤트는 spool 파일에 남아 다음 시작 시 저장됨
+    close_spool()
+
 @app.get("/scenario2")
-async def process_detection():
+async def process_detection(max_age: float = None, wait_for_new: bool = False):
+    """최신 탐지 결과 조회
+
+    max_age: 허용하는 결과의 최대 경과 시간(초, 기본 SCENARIO2_MAX_AGE) - 0이면 캐시 사용 안 함
+    wait_for_new: True면 캐시를 건너뛰고 새 프레임의 추론 결과를 기다림 (진행 중인 추론이 있으면 합류)
+    """
     if camera is None:
         return {"status": "error", "message": "카메라가 초기화되지 않았습니다."}
-    
-    frame = camera.read_frame()
-    if frame is not None:
-        detection_results = detector.process_detections(frame)
-        if detection_results:
-            return {"status": "success", "data": detection_results}
+    if max_age is not None and max_age < 0:
+        raise HTTPException(status_code=422, detail="max_age는 0 이상이어야 합니다.")
+
+    # 프레임 대기와 추론은 executor에서 수행 (다른 요청이 멈추지 않도록)
+    result, served = await coalescer.get(max_age=max_age, wait_for_new=wait_for_new)
+    if result is not None and result['data']:
+        return {
+            "status": "success",
+            "data": result['data'],
+            "frame_seq": result['frame_seq'],
+            "age": round(coalescer.age(result), 3),
+            "served": served
+        }
     return {"status": "error", "message": "탐지 결과가 없습니다."}
 
+@app.get("/snapshot.jpg")
+async def snapshot(quality: int = None):
+    """마지막으로 탐지한 프레임 JPEG (인코딩 캐시에서 제공)"""
+    loop = asyncio.get_running_loop()
+    image_bytes = await loop.run_in_executor(inference_executor, detector.encode_frame, None, quality)
+    if image_bytes is None:
+        raise HTTPException(status_code=404, detail="아직 탐지한 프레임이 없습니다.")
+    return Response(content=image_bytes, media_type="image/jpeg",
+                    headers={"Cache-Control": "no-store"})
+
+@app.get("/evidence/{evidence_id}")
+async def get_evidence(evidence_id: str, variant: str = "frame"):
+    """DB의 IMAGE_URL(증거 ID)로 증거 이미지 조회 - variant: frame/crop/thumb"""
+    path = detector.evidence_store.path_for(evidence_id, variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="증거 이미지가 없습니다.")
+    # 내용 주소 기반 파일이라 내용이 바뀌지 않으므로 장기 캐시 허용
+    return FileResponse(path, media_type="image/jpeg",
+                        headers={**EVIDENCE_CACHE_HEADERS, "ETag": f'"{evidence_id}.{variant}"'})
+
+@app.get("/db_metrics")
+async def db_metrics():
+    """세션 풀 사용률, INSERT 지연 시간, spool 크기/drain 지연 조회"""
+    return get_db_metrics()
+
+@app.get("/pipeline")
+async def pipeline_stats():
+    """스트리밍 파이프라인 단계별 작업 스레드 수, 큐 길이, 점유율(최근 1초), 처리 수 조회"""
+    return stream_pipeline.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (캡처 FPS, 단계별 지연 시간, DB 큐, 스트림 클라이언트 등)"""
+    return PlainTextResponse(metrics_registry.render(), media_type=metrics_registry.content_type)
+
 @app.get("/video_feed")
 async def video_feed():
-    return StreamingResponse(generate_frames_feed(camera, detector),
+    return StreamingResponse(generate_frames_feed(stream_pipeline),
                              media_type='multipart/x-mixed-replace; boundary=frame')
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Scenario2의 utils 패키지를 불러오도록 시나리오 경로 추가 (utils가 common 경로를 추가)
+SCENARIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCENARIO_DIR not in sys.path:
+    sys.path.insert(0, SCENARIO_DIR)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import utils  # noqa: F401  (common 경로 추가)
+from common.keyframe import KeyframeSchedule
+from utils.helpers import generate_frames_feed
+from utils.pipeline import StreamPipeline
+
+
+class FakeCamera:
+    """frames장의 프레임을 차례로 내주는 카메라"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.seq = 0
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        if self.seq >= self.frames:
+            time.sleep(0.01)
+            return None
+        time.sleep(0.005)
+        self.seq += 1
+        frame = np.full((120, 160, 3), self.seq % 255, dtype=np.uint8)
+        return frame, self.seq, time.time()
+
+
+class FakeDetector:
+    """항상 HIGH 위험을 반환하고 저장 요청을 기록하는 탐지기"""
+    CLASS_NAMES = ['human', 'hard_hat', 'safety_vest', 'box']
+
+    def __init__(self):
+        self.detected = 0
+        self.saved = []
+        self.lock = threading.Lock()
+
+    def detect(self, frame):
+        with self.lock:
+            self.detected += 1
+            time.sleep(0.02)
+            detections = {cls_name: [] for cls_name in self.CLASS_NAMES}
+            detections['box'].append({'bbox': (10, 10, 50, 50), 'conf': 0.9})
+            info = {'camera_id': 'CAM_002', 'risk_level': 'HIGH', 'detection_object': {}, 'content': 'stack'}
+            return info, detections, ['HIGH']
+
+    def draw(self, frame, detections, status_texts):
+        pass
+
+    def publish_frame(self, frame):
+        return None
+
+    def encode_frame(self, frame, frame_key=None):
+        return b'jpeg'
+
+    @staticmethod
+    def focus_bbox(detections):
+        return None
+
+    def save_risk_data(self, frame, risk_level, detection_info, focus_bbox=None, frame_key=None, image_bytes=None):
+        self.saved.append(detection_info)
+
+
+def run(pipeline, camera):
+    pipeline.subscribe()
+    deadline = time.monotonic() + 5
+    while pipeline.seq < camera.frames and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+
+
+def test_every_frame_is_persisted_without_keyframes():
+    camera, detector = FakeCamera(20), FakeDetector()
+    run(StreamPipeline(camera, detector), camera)
+    assert detector.detected == len(detector.saved) >= 1
+
+
+def test_tracked_frames_are_not_persisted():
+    camera, detector = FakeCamera(40), FakeDetector()
+    pipeline = StreamPipeline(camera, detector, keyframes=KeyframeSchedule(budget=0.2, min_k=4))
+    run(pipeline, camera)
+    time.sleep(0.1)
+
+    # 저장은 키프레임 추론 결과마다 한 번 - 추적 프레임에서 같은 결과를 다시 저장하지 않음
+    assert pipeline.seq == camera.frames
+    assert 1 <= len(detector.saved) == detector.detected < camera.frames
+
+
+def test_stream_clients_wait_without_executor_threads():
+    camera, detector = FakeCamera(200), FakeDetector()
+    pipeline = StreamPipeline(camera, detector)
+
+    async def client():
+        frames = []
+        feed = generate_frames_feed(pipeline)
+        async for chunk in feed:
+            frames.append(chunk)
+            if len(frames) == 3:
+                break
+        await feed.aclose()
+        return frames
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        # 게시 대기에 executor 스레드를 쓰면 실패 (클라이언트 수만큼 기본 executor를 점유하던 문제)
+        loop.run_in_executor = None
+        return await asyncio.wait_for(asyncio.gather(*(client() for _ in range(50))), 5)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        pipeline.stop()
+    assert all(len(frames) == 3 and frames[0].startswith(b'--frame') for frames in results)
@@ -0,0 +1,55 @@
+import numpy as np
+from utils import stack_analysis
+
+
+def column(x, levels, shifts=None, width=50, height=40, floor=1000):
+    """x에서 시작해 levels층 쌓인 박스 (shifts: 층별 수평 어긋남)"""
+    shifts = shifts or [0] * levels
+    return [(x + shift, floor - (level + 1) * height, x + shift + width, floor - level * height)
+            for level, shift in enumerate(shifts)]
+
+
+def test_columns_group_by_x_and_count_levels():
+    # 옆으로 나란한 박스(같은 높이)는 같은 열의 같은 층
+    boxes = column(0, 3) + [(30, 960, 80, 1000)] + column(300, 2)
+    stacks, status = stack_analysis.analyze_stacks(np.array(boxes))
+
+    assert stacks.column_count == 2
+    assert stacks.heights.tolist() == [3, 2]
+    assert [(c['count'], c['height']) for c in stacks.columns()] == [(4, 3), (2, 2)]
+    assert stacks.columns()[1]['bbox'] == (300, 920, 350, 1000)
+    assert status == "SAFE"
+
+def test_high_status_at_threshold():
+    boxes = np.array(column(0, 6) + column(200, 2))
+    assert stack_analysis.analyze_stacks(boxes)[1] == "HIGH"
+    assert stack_analysis.analyze_stacks(boxes, threshold=7)[1] == "SAFE"
+    assert stack_analysis.analyze_stacks(np.array(column(0, 5)))[1] == "SAFE"
+
+def test_irregular_status_at_min_boxes_and_ratio():
+    # 층마다 너비의 26%씩 어긋남 (기준 25% 초과)
+    boxes = np.array(column(0, 3, shifts=[0, 13, 0]))
+    stacks, status = stack_analysis.analyze_stacks(boxes)
+    assert status == "IRREGULAR" and stacks.columns()[0]['irregularity'] == 0.26
+    assert stack_analysis.analyze_stacks(boxes, min_boxes=4)[1] == "SAFE"
+    # 정확히 25%는 불규칙이 아님, 2층짜리 열은 min_boxes 미만
+    assert stack_analysis.analyze_stacks(np.array(column(0, 3, shifts=[0, 12.5, 0])))[1] == "SAFE"
+    assert stack_analysis.analyze_stacks(np.array(column(0, 2, shifts=[0, 20])))[1] == "SAFE"
+
+def test_ground_row_of_columns_is_not_irregular():
+    # 기존 check_irregular_stack은 y 정렬 후 다른 열끼리 x 간격을 비교해 IRREGULAR로 판정하던 장면
+    boxes = column(0, 1) + column(80, 1) + column(170, 2, shifts=[0, 8]) + column(250, 1)
+    assert stack_analysis.analyze_stacks(np.array(boxes))[1] == "SAFE"
+
+def test_empty_and_single_box():
+    stacks, status = stack_analysis.analyze_stacks(np.zeros((0, 4)))
+    near, nearest = stacks.near([(0, 0, 10, 10)])
+    assert status == "SAFE" and stacks.column_count == 0 and stacks.columns() == []
+    assert near.tolist() == [False] and nearest.tolist() == [-1]
+
+    stacks, status = stack_analysis.analyze_stacks([(100, 100, 150, 140)])
+    assert status == "SAFE" and stacks.heights.tolist() == [1]
+    # 겹치면 근접, 경계만 닿으면 근접 아님 (check_overlap과 같은 기준)
+    near, nearest = stacks.near([(120, 120, 200, 300), (150, 0, 200, 100)])
+    assert near.tolist() == [True, False] and nearest.tolist() == [0, -1]
+    assert stacks.near(np.zeros((0, 4)))[0].tolist() == []
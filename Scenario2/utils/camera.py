@@ -1,13 +1,31 @@
 # camera.py
 import cv2
 import threading
-from queue import Queue
+import time
+from datetime import datetime
+from common.metrics import CAPTURE_FPS, FRAMES_CAPTURED, FRAMES_DROPPED, RateMeter
 
 class Camera:
-    def __init__(self, camera_id=1):
+    """캡처 스레드가 최신 프레임 1장을 슬롯에 게시하고, 여러 소비자가 함께 읽는 카메라
+
+    프레임마다 단조 증가하는 시퀀스 번호와 캡처 시각이 붙는다.
+    소비자는 마지막으로 본 시퀀스 번호를 넘겨 더 새로운 프레임이 올 때까지 대기하므로
+    서로 프레임을 빼앗지 않는다. 슬롯의 프레임은 복사 없이 공유되므로 읽기 전용이다.
+    """
+
+    def __init__(self, camera_id=1, name="CAM_002"):
         self.camera = cv2.VideoCapture(camera_id)
-        self.frame_queue = Queue(maxsize=5)
         self.running = True
+        # 최신 프레임 슬롯
+        self._cond = threading.Condition()
+        self.frame = None
+        self.frame_seq = 0
+        self.captured_at = None
+        self._consumed_seq = 0
+        # 캡처 지표 (/metrics)
+        self.frames_captured = FRAMES_CAPTURED.labels(name)
+        self.frames_dropped = FRAMES_DROPPED.labels(name, 'capture')
+        self.capture_rate = RateMeter(CAPTURE_FPS.labels(name))
         self.setup_camera()
         self.thread = threading.Thread(target=self._read_frames, daemon=True)
         self.thread.start()
@@ -20,15 +38,49 @@ class Camera:
     def _read_frames(self):
         while self.running:
             success, frame = self.camera.read()
-            if success and not self.frame_queue.full():
-                self.frame_queue.put(cv2.resize(frame, (640, 480)))
+            if not success:
+                time.sleep(0.01)
+                continue
+            self.frames_captured.inc()
+            self.capture_rate.tick()
+
+            frame = cv2.resize(frame, (640, 480))
+            # 여러 소비자가 같은 배열을 공유하므로 실수로 그리지 않도록 읽기 전용으로 게시
+            frame.flags.writeable = False
+            with self._cond:
+                if self.frame_seq > self._consumed_seq:
+                    # 아무 소비자도 읽지 않은 프레임이 새 프레임으로 교체됨
+                    self.frames_dropped.inc()
+                self.frame = frame
+                self.frame_seq += 1
+                self.captured_at = datetime.now()
+                self._cond.notify_all()
+
+    def wait_for_frame(self, last_seq=0, timeout=None):
+        """last_seq 보다 새로운 프레임이 올 때까지 대기 후 (frame, seq, captured_at) 반환
+
+        frame은 복사하지 않은 읽기 전용 배열이다. timeout 안에 새 프레임이 없으면 None.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.frame_seq > last_seq or not self.running, timeout)
+            if self.frame_seq <= last_seq:
+                return None
+            self._consumed_seq = self.frame_seq
+            return self.frame, self.frame_seq, self.captured_at
+
+    def read_frame(self, timeout=None):
+        """최신 프레임의 쓰기 가능한 복사본 반환 (탐지 결과를 그릴 소비자용)
 
-    def read_frame(self):
-        if not self.frame_queue.empty():
-            return self.frame_queue.get()
-        return None
+        아직 프레임이 없으면 timeout초까지 첫 프레임을 기다린다 (None이면 기다리지 않음).
+        """
+        latest = self.wait_for_frame(0, timeout or 0)
+        if latest is None:
+            return None
+        return latest[0].copy()
 
     def release(self):
         self.running = False
+        with self._cond:
+            self._cond.notify_all()
         self.thread.join()
-        self.camera.release()
\ No newline at end of file
+        self.camera.release()
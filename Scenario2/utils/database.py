@@ -1,8 +1,12 @@
 # database.py
 import os
+import json
+import threading
 import cx_Oracle
 from dotenv import load_dotenv
-import threading
+
+from common.db_pool import OracleInsertPool
+from common.spool import DetectionSpool, spool_path
 
 # .env 파일 로드
 load_dotenv()
@@ -26,61 +30,68 @@ def set_db_insert_enabled(enabled):
     DB_INSERT_ENABLED = enabled
     print(f"DB Insert Enabled: {DB_INSERT_ENABLED}")
 
-def get_connection():
-    """데이터베이스 연결을 반환합니다."""
-    try:
-        connection = cx_Oracle.connect(user=username, password=password, dsn=dsn)
-        print("DB 연결 성공")
-        return connection
-    except cx_Oracle.DatabaseError as e:
-        print(f"DB 연결 실패: {e}")
-        raise
+# SQL 삽입 쿼리
+INSERT_QUERY = """
+INSERT INTO DETECTION (DETECTION_ID, CAMERA_ID, DETECTION_TIME,
+DETECTION_OBJECT, IMAGE_URL, RISK_LEVEL, CONTENT)
+VALUES (detection_id_seq.NEXTVAL, :camera_id, TO_DATE(:detection_time, 'YYYY-MM-DD HH24:MI:SS'),
+:detection_object, :image_url, :risk_level, :content)
+"""
+
+# 세션 풀 (INSERT마다 연결을 새로 만들지 않음)
+insert_pool = OracleInsertPool(username, password, dsn, INSERT_QUERY, max_sessions=4)
+
+# 탐지 이벤트는 먼저 로컬 spool(SQLite)에 기록하고 drainer가 순서대로 배치 INSERT (DB 장애 시 재시도)
+# import만으로 파일/스레드를 만들지 않도록 시작 경로(start_spool) 또는 첫 기록 시 생성
+_spool = None
+_spool_lock = threading.Lock()
+
+def start_spool():
+    """spool 생성 및 drainer 시작 - 이전 실행에서 저장하지 못한 이벤트도 이어서 저장"""
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = DetectionSpool(spool_path("scenario2"), insert_pool.insert_many, name="scenario2",
+                                    max_attempts=int(os.getenv("SPOOL_MAX_ATTEMPTS", "10")),
+                                    max_pending=int(os.getenv("SPOOL_MAX_PENDING", "100000")))
+        return _spool
+
+def close_spool():
+    """drainer 종료 (DB에 아직 저장하지 못한 이벤트는 spool 파일에 남아 다음 시작 시 저장됨)"""
+    global _spool
+    with _spool_lock:
+        spool, _spool = _spool, None
+    if spool is not None:
+        spool.close()
+
+def _to_params(camera_id, detection_time, detection_object,
+               image_url, risk_level, content):
+    return {
+        "camera_id": camera_id,
+        "detection_time": detection_time,
+        # 필터 조회가 가능하도록 JSON 문자열로 저장 (Scenario1과 같은 형식)
+        "detection_object": json.dumps(detection_object, ensure_ascii=False),
+        "image_url": image_url,
+        "risk_level": risk_level,
+        "content": content
+    }
 
 def insert_detection_data(camera_id, detection_time, detection_object,
                           image_url, risk_level, content):
     """위험 탐지 데이터를 테이블에 삽입합니다."""
-    connection = None
-    cursor = None
     try:
-        # 데이터베이스 연결
-        connection = get_connection()
-        cursor = connection.cursor()
-        
-        # SQL 삽입 쿼리
-        insert_query = """
-        INSERT INTO DETECTION (DETECTION_ID, CAMERA_ID, DETECTION_TIME,
-        DETECTION_OBJECT, IMAGE_URL, RISK_LEVEL, CONTENT)
-        VALUES (detection_id_seq.NEXTVAL, :camera_id, TO_DATE(:detection_time, 'YYYY-MM-DD HH24:MI:SS'),
-        :detection_object, :image_url, :risk_level, :content)
-        """
-        
-        # 데이터 삽입
-        cursor.execute(insert_query, {
-            "camera_id": camera_id,
-            "detection_time": detection_time,
-            "detection_object": detection_object,
-            "image_url": image_url,
-            "risk_level": risk_level,
-            "content": content
-        })
-        
-        # 변경 사항 커밋
-        connection.commit()
+        insert_pool.insert(_to_params(camera_id, detection_time, detection_object,
+                                      image_url, risk_level, content))
         print("데이터 입력 성공.")
-    
     except cx_Oracle.DatabaseError as e:
         print(f"DB 에러 발생: {e}")
-        if connection:
-            connection.rollback()
         raise
-    
-    finally:
-        # 리소스 해제
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
 
-#async 스레딩 사용하여 병렬로 처리
-def async_insert_detection_data(*args):
-    threading.Thread(target=insert_detection_data, args=args).start()
\ No newline at end of file
+# 로컬 spool에 기록만 하고 반환 (DB 저장은 drainer 스레드가 담당, 디스크 오류 시 False)
+def async_insert_detection_data(*args, **kwargs):
+    return start_spool().append(_to_params(*args, **kwargs))
+
+def get_db_metrics():
+    """세션 풀 사용률, INSERT 지연 시간, spool 크기/drain 지연"""
+    spool = _spool
+    return {**insert_pool.get_metrics(), "spool": spool.get_stats() if spool is not None else None}
@@ -1,14 +1,15 @@
 # detoctor.py
-from ultralytics import YOLO
-import cv2
+import threading
+import time
 from datetime import datetime, timedelta
 from utils.database import async_insert_detection_data
-from utils.detection_utils import (
-    check_overlap,
-    check_vertical_stack,
-    check_irregular_stack
-)
+from utils.stack_analysis import analyze_stacks, overlap_matrix
 from utils.boundingbox_utils import draw_bounding_boxes, draw_status
+from common.jpeg_cache import EncodedFrameCache
+from common.evidence_store import EvidenceStore
+from common.inference import create_engine
+from common.profiling import stage_timer
+from common.metrics import DETECTIONS, FRAME_LATENCY_SECONDS, INFERENCE_SECONDS
 
 class SafetyDetector:
     def __init__(self):
@@ -25,9 +26,9 @@ class SafetyDetector:
             'safety_vest': 0.7,
             'box': 0.9
         }
-        self.model = YOLO('models/best.pt')
-        self.model.to('cuda') # GPU 사용 설정
-        self.model.iou = 0.5
+        # 장치 자동 선택(GPU 없으면 CPU) - INFERENCE_BACKEND/INFERENCE_DEVICE/INFERENCE_THREADS 로 설정
+        self.model = create_engine('models/best.pt',
+                                   conf=min(self.CLASS_CONF_THRESHOLDS.values()), iou=0.5)
         self.warning_delay = timedelta(seconds=30)  # 경고 알림 딜레이 시간
         self.last_warning_time = datetime.now() - self.warning_delay
 
@@ -35,19 +36,52 @@ class SafetyDetector:
         self.last_box_stack_status = "SAFE"  # 마지막 박스 상태 저장
         self.box_status_timeout = timedelta(seconds=10)  # 박스 상태 유지 시간
         self.last_box_detected_time = datetime.now()
+
+        # 프레임별 JPEG 인코딩 캐시 (스트리밍/DB 증거/스냅샷 공용)
+        self.jpeg_cache = EncodedFrameCache(max_entries=8)
+        self.frame_seq = 0
+        self.last_frame = None  # (인코딩 캐시 키, 표시 완료 프레임)
+        self._frame_lock = threading.Lock()
+
+        # 증거 이미지는 DB BLOB 대신 로컬 내용 주소 저장소에 저장
+        self.evidence_store = EvidenceStore()
+
+        # 추론/위험도 판정 직렬화 (스트리밍 파이프라인과 /scenario2 가 같은 탐지기를 공유)
+        self.lock = threading.Lock()
             
     def process_detections(self, frame):        
-        results = self.model(frame, verbose=False)
+        """한 프레임 탐지 -> 결과 표시 -> 위험 상황 저장을 차례로 수행"""
+        started_at = time.perf_counter()
+        detection_info, detections, status_texts = self.detect(frame)
+        self.draw(frame, detections, status_texts)
+        frame_key = self.publish_frame(frame)
+        FRAME_LATENCY_SECONDS.observe(time.perf_counter() - started_at)
+
+        # 위험 상황을 데이터베이스에 저장 (스트리밍과 같은 표시 완료 프레임을 한 번만 인코딩)
+        with stage_timer.stage('persist'):
+            self.save_risk_data(frame, detection_info['risk_level'], detection_info, self.focus_bbox(detections),
+                                frame_key=frame_key)
+
+        return detection_info
+
+    def detect(self, frame):
+        """모델 추론과 위험도 판정 (프레임에는 그리지 않음) -> (detection_info, detections, status_texts)
+
+        박스 상태 유지 등 탐지기 상태를 갱신하므로 호출은 잠금으로 직렬화된다.
+        """
+        with self.lock:
+            return self._detect(frame)
+
+    def _detect(self, frame):
+        model_start = time.perf_counter()
+        results = self.model(frame)
+        postprocess_start = time.perf_counter()
+        INFERENCE_SECONDS.observe(postprocess_start - model_start)
         detections = {cls_name: [] for cls_name in self.CLASS_NAMES}
 
         # 탐지 결과를 딕셔너리에 추가
         for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-
+            for (x1, y1, x2, y2), cls, conf in zip(r.xyxy.tolist(), r.cls.tolist(), r.conf.tolist()):
                 if cls >= len(self.CLASS_NAMES):
                     continue
                 class_name = self.CLASS_NAMES[cls]
@@ -62,11 +96,10 @@ class SafetyDetector:
         # 박스 상태 확인
         current_time = datetime.now()
         box_stack_status = "SAFE"
+        stacks = None
         if detections['box']:
-            if check_vertical_stack(detections):  # 수직 스택 상태
-                box_stack_status = "HIGH"
-            elif check_irregular_stack(detections):  # 불규칙 스택 확인
-                box_stack_status = "IRREGULAR"
+            # 박스를 열 단위로 묶어 수직 적재(HIGH)/불규칙 적재(IRREGULAR) 판정
+            stacks, box_stack_status = analyze_stacks([box['bbox'] for box in detections['box']])
             self.last_box_stack_status = box_stack_status
             self.last_box_detected_time = current_time
         else:
@@ -92,20 +125,15 @@ class SafetyDetector:
 
         # 사람이 감지되었을 때 추가 위험 평가 수행
         if detections['human']:
-            for person in detections['human']:
-                px1, py1, px2, py2 = person['bbox']
-                helmet_detected = any(
-                    check_overlap((px1, py1, px2, py2), helmet['bbox'])
-                    for helmet in detections['hard_hat']
-                )
-                vest_detected = any(
-                    check_overlap((px1, py1, px2, py2), vest['bbox'])
-                    for vest in detections['safety_vest']
-                )
-                near_box = any(
-                    check_overlap(person['bbox'], box_det['bbox'])
-                    for box_det in detections['box']
-                )
+            # 사람 x 안전장비 겹침은 행렬로, 사람-적재 근접은 적재 인덱스로 한 번에 계산
+            person_boxes = [person['bbox'] for person in detections['human']]
+            helmet_flags = overlap_matrix(person_boxes, [helmet['bbox'] for helmet in detections['hard_hat']]).any(axis=1)
+            vest_flags = overlap_matrix(person_boxes, [vest['bbox'] for vest in detections['safety_vest']]).any(axis=1)
+            near_flags = stacks.near(person_boxes)[0] if stacks is not None else [False] * len(person_boxes)
+            for i in range(len(person_boxes)):
+                helmet_detected = bool(helmet_flags[i])
+                vest_detected = bool(vest_flags[i])
+                near_box = bool(near_flags[i])
 
                 if box_stack_status == "HIGH":
                     if near_box:
@@ -154,14 +182,14 @@ class SafetyDetector:
                 "hard_hat": helmet_detected,
                 "safety_vest": vest_detected,
                 "near_box": near_box,
-                "box_stack": box_stack_status
+                "box_stack": box_stack_status,
+                "stack_height": int(stacks.heights.max()) if stacks is not None else 0
             },
             "risk_level": risk_level,
             "content": content_text
         }
 
-        # 위험 상황을 데이터베이스에 저장
-        self.save_risk_data(frame, risk_level, detection_info)
+        stage_timer.add('postprocess', time.perf_counter() - postprocess_start)
 
         # 상태 정보 표시
         status_texts = [
@@ -171,14 +199,47 @@ class SafetyDetector:
             (f"Helmet: {'ON' if helmet_detected else 'OFF'}", (0, 255, 0) if helmet_detected else (0, 0, 255)),
             (f"Vest: {'ON' if vest_detected else 'OFF'}", (0, 255, 0) if vest_detected else (0, 0, 255))
         ]
-        draw_status(frame, status_texts)
+        DETECTIONS.labels(risk_level).inc()
+        return detection_info, detections, status_texts
 
-        draw_bounding_boxes(frame, detections, self.COLORS)
+    def draw(self, frame, detections, status_texts):
+        """상태 정보와 바운딩 박스를 프레임에 표시"""
+        with stage_timer.stage('draw'):
+            draw_status(frame, status_texts)
+            draw_bounding_boxes(frame, detections, self.COLORS)
 
-        return detection_info
+    def publish_frame(self, frame):
+        """표시 완료 프레임을 마지막 프레임(/snapshot.jpg)으로 등록하고 인코딩 캐시 키 반환"""
+        with self._frame_lock:
+            self.frame_seq += 1
+            self.last_frame = (self.frame_seq, frame)
+            return self.frame_seq
+
+    def encode_frame(self, frame=None, quality=None, frame_key=None):
+        """프레임(기본: 마지막으로 등록한 프레임)의 JPEG 바이트 - 프레임/품질 조합당 한 번만 인코딩
+
+        frame_key 없이 넘긴 프레임(키프레임 증거 이미지 등)은 캐시를 거치지 않고 바로 인코딩한다.
+        """
+        if frame is None:
+            if self.last_frame is None:
+                return None
+            frame_key, frame = self.last_frame
+        return self.jpeg_cache.encode(frame_key, frame, quality)
+
+    @staticmethod
+    def focus_bbox(detections):
+        """증거 crop 영역 - 사람이 있으면 사람들, 없으면 박스들을 감싸는 영역"""
+        targets = detections['human'] or detections['box']
+        if not targets:
+            return None
+        x1s, y1s, x2s, y2s = zip(*(target['bbox'] for target in targets))
+        return min(x1s), min(y1s), max(x2s), max(y2s)
+
+    def save_risk_data(self, frame, risk_level, detection_info, focus_bbox=None, frame_key=None, image_bytes=None):
+        """위험 상황을 데이터베이스에 저장합니다. (이미지는 증거 저장소, DB에는 증거 ID)
 
-    def save_risk_data(self, frame, risk_level, detection_info):
-        """위험 상황을 데이터베이스에 저장합니다."""
+        image_bytes: 이미 인코딩된 표시 프레임 (없으면 frame_key로 인코딩 캐시 사용)
+        """
         current_time = datetime.now()
         
         # 데이터 삽입 제어 확인
@@ -194,13 +255,13 @@ class SafetyDetector:
         if risk_level in ["HIGH", "MEDIUM"] and \
            (current_time - self.last_warning_time >= self.warning_delay):
             try:
-                _, img_encoded = cv2.imencode('.jpg', frame)
-                image_blob = img_encoded.tobytes()
+                evidence_id = self.evidence_store.save_evidence(
+                    frame, image_bytes or self.encode_frame(frame, frame_key=frame_key), focus_bbox)
                 async_insert_detection_data(
                     camera_id=detection_info["camera_id"],
                     detection_time=current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    detection_object=str(detection_info["detection_object"]),
-                    image_url=image_blob,
+                    detection_object=detection_info["detection_object"],
+                    image_url=evidence_id,
                     risk_level=risk_level,
                     content=detection_info["content"]
                 )
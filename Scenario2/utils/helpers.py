@@ -1,25 +1,95 @@
 # helpers.py
-import cv2
+import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
+from common.metrics import DETECTION_REQUESTS, STREAM_CLIENTS
 
-def generate_frames_feed(camera, detector):
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        while True:
-            frame = camera.read_frame()
-            if frame is None:
-                continue  # 프레임이 없으면 다음 루프로 이동
+# 모델 추론/인코딩 전용 executor (이벤트 루프를 막지 않도록 CPU 작업을 위임)
+# 탐지기 상태(박스 상태 유지 등)를 공유하므로 추론은 한 번에 하나씩 수행
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
 
-            # 탐지 작업을 멀티스레드로 수행
-            future = executor.submit(detector.process_detections, frame)
-            future.result()
+# 접속 중인 /video_feed 클라이언트 수
+stream_clients = STREAM_CLIENTS.labels("CAM_002", "annotated")
 
-            # 프레임을 JPEG로 인코딩
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if not ret:
-                continue  # 인코딩 실패 시 다음 루프로 이동
+async def generate_frames_feed(pipeline, timeout=1.0):
+    """스트리밍 파이프라인(utils.pipeline.StreamPipeline)이 게시하는 최신 JPEG를 multipart 청크로 전송"""
+    stream_clients.inc()
+    pipeline.subscribe()
+    last_seq = 0
+    try:
+        while True:
+            # 게시 알림을 이벤트 루프에서 기다림 (클라이언트마다 executor 스레드를 점유하지 않음)
+            output = await pipeline.wait_for_output_async(last_seq, timeout)
+            if output is None:
+                if not pipeline.running.is_set():
+                    break  # 파이프라인 종료
+                continue  # timeout 동안 새 결과가 없으면 다시 대기
+            frame_bytes, last_seq = output
 
             # 스트리밍용 데이터 생성
-            frame_bytes = buffer.tobytes()
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    finally:
+        pipeline.unsubscribe()
+        stream_clients.dec()
+
+
+class DetectionCoalescer:
+    """여러 클라이언트의 /scenario2 폴링을 하나의 추론으로 합치는 결과 캐시
+
+    - 마지막 결과가 max_age초 이내면 추론 없이 그대로 반환 ('cached')
+    - 진행 중인 추론이 있으면 새로 추론하지 않고 그 결과를 함께 기다림 ('joined')
+    - 둘 다 아니면 마지막으로 추론한 프레임보다 새 프레임으로 추론 ('inferred')
+    wait_for_new=True 이면 캐시를 건너뛰고 진행 중이거나 새로 시작한 추론 결과를 기다린다.
+    캐시 상태는 이벤트 루프 스레드에서만 바뀌므로 별도 잠금이 필요 없다.
+    """
+
+    def __init__(self, camera, detector, max_age=0.5, frame_timeout=1.0, camera_id="CAM_002"):
+        self.camera = camera
+        self.detector = detector
+        self.max_age = max_age
+        self.frame_timeout = frame_timeout
+        self.camera_id = camera_id
+        self.latest = None      # {'data', 'frame_seq', 'captured_at', 'completed_at'}
+        self._inflight = None
+
+    async def get(self, max_age=None, wait_for_new=False):
+        """(결과, 제공 방식) 반환 - 새 프레임을 얻지 못하면 결과는 None"""
+        max_age = self.max_age if max_age is None else max_age
+        if not wait_for_new and self.latest is not None and self.age(self.latest) <= max_age:
+            served = 'cached'
+            result = self.latest
+        else:
+            served = 'joined' if self._inflight is not None else 'inferred'
+            if self._inflight is None:
+                self._inflight = asyncio.get_running_loop().run_in_executor(
+                    inference_executor, self._infer, self.latest['frame_seq'] if self.latest else 0)
+                self._inflight.add_done_callback(self._complete)
+            # 한 클라이언트가 연결을 끊어도 같은 추론을 기다리는 다른 요청은 계속 진행
+            result = await asyncio.shield(self._inflight)
+        DETECTION_REQUESTS.labels(self.camera_id, served).inc()
+        return result, served
+
+    @staticmethod
+    def age(result):
+        return time.monotonic() - result['completed_at']
+
+    def _infer(self, last_seq):
+        """last_seq 보다 새 프레임으로 탐지 (executor에서 실행)"""
+        latest = self.camera.wait_for_frame(last_seq, timeout=self.frame_timeout)
+        if latest is None:
+            return None
+        frame, seq, captured_at = latest
+        # 슬롯의 프레임은 다른 소비자와 공유하므로 그리기용 복사본 사용
+        detection_info = self.detector.process_detections(frame.copy())
+        return {
+            'data': detection_info,
+            'frame_seq': seq,
+            'captured_at': captured_at,
+            'completed_at': time.monotonic()
+        }
 
+    def _complete(self, future):
+        self._inflight = None
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.latest = future.result()
@@ -0,0 +1,307 @@
+# pipeline.py
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common.keyframe import BoxPropagator
+from common.metrics import FRAME_LATENCY_SECONDS, FRAMES_TRACKED, PIPELINE_OCCUPANCY, PIPELINE_QUEUE_DEPTH
+from common.profiling import stage_timer
+
+
+class PipelineStage:
+    """크기가 제한된 입력 큐 + 작업 스레드 N개로 구성된 처리 단계
+
+    func(job)의 결과를 다음 단계 큐에 넣는다 (None이면 버림). 다음 단계 큐가 가득 차면 기다리므로
+    느린 단계가 앞 단계를 늦춘다 (backpressure).
+    occupancy: 최근 구간(window초) 동안 작업 스레드가 일한 시간 비율 (0~1, 스레드 평균)
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=2, window=1.0):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.window = window
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.processed = 0
+        self.occupancy = 0.0
+        self._busy = 0.0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self._occupancy_gauge = PIPELINE_OCCUPANCY.labels(name)
+        self._queue_gauge = PIPELINE_QUEUE_DEPTH.labels(name)
+        self.threads = []
+
+    def start(self, running):
+        self.threads = [threading.Thread(target=self._run, args=(running,), daemon=True,
+                                         name=f"pipeline-{self.name}-{i}")
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, job, running):
+        """큐에 빈자리가 날 때까지 기다렸다가 추가 (파이프라인이 멈추면 False)"""
+        while running.is_set():
+            try:
+                self.queue.put(job, timeout=0.1)
+                self._queue_gauge.set(self.queue.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, running):
+        while running.is_set():
+            try:
+                job = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                self._record(0.0)
+                continue
+            self._queue_gauge.set(self.queue.qsize())
+
+            start = time.perf_counter()
+            try:
+                result = self.func(job)
+            except Exception as e:
+                print(f"파이프라인 {self.name} 단계 오류: {e}")
+                result = None
+            self._record(time.perf_counter() - start)
+
+            if result is not None and self.next_stage is not None:
+                self.next_stage.put(result, running)
+
+    def _record(self, busy_seconds):
+        with self._lock:
+            self._busy += busy_seconds
+            if busy_seconds:
+                self.processed += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                self.occupancy = min(self._busy / (elapsed * self.workers), 1.0)
+                self._busy = 0.0
+                self._window_start = now
+                self._occupancy_gauge.set(self.occupancy)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'occupancy': round(self.occupancy, 3),
+            'processed': self.processed
+        }
+
+
+class StreamPipeline:
+    """카메라 -> 추론 -> 표시 -> 인코딩 단계로 나눈 /video_feed 스트리밍 파이프라인
+
+    단계 사이를 크기가 제한된 큐로 연결해 프레임 N을 인코딩하는 동안 프레임 N+1을 추론한다.
+    결과는 최신 JPEG 1장 슬롯에 게시되고 모든 스트림 클라이언트가 함께 읽는다.
+    시청자가 없으면 카메라 프레임을 가져오지 않는다.
+
+    workers: 단계별 작업 스레드 수 {'draw', 'encode'}
+             - 추론 단계는 항상 1개 - detect()가 탐지기 잠금으로 직렬화되므로 늘려도 잠금 경합만 생긴다
+             - 그리기/인코딩은 OpenCV가 GIL을 놓으므로 스레드를 늘리면 병렬로 처리된다
+    keyframes(common.keyframe.KeyframeSchedule)를 지정하면 K 프레임마다만 백그라운드에서 전체 추론하고,
+    추론 단계는 모든 프레임에 마지막 키프레임 결과의 박스를 광학 흐름으로 옮겨 넘긴다 (카메라 속도로 스트리밍).
+    이때 위험 상황 저장은 키프레임 결과로만 한다 (추적 프레임은 키프레임의 탐지 정보를 재사용할 뿐이므로).
+    """
+
+    def __init__(self, camera, detector, workers=None, queue_size=2, frame_timeout=1.0,
+                 keyframes=None, camera_id="CAM_002"):
+        self.camera = camera
+        self.detector = detector
+        self.frame_timeout = frame_timeout
+        self.keyframes = keyframes
+        if keyframes is not None:
+            self.propagator = BoxPropagator()
+            self.frames_tracked = FRAMES_TRACKED.labels(camera_id)
+            # 키프레임 추론은 한 번에 하나씩 별도 스레드에서 (추론 단계는 기다리지 않음)
+            self._keyframe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-keyframe")
+            self._keyframe_busy = False
+            self._track_lock = threading.Lock()
+        workers = {'draw': 1, 'encode': 1, **(workers or {})}
+        if workers.get('infer', 1) != 1:
+            print(f"추론 단계는 탐지기 잠금으로 직렬화되므로 작업 스레드 1개로 실행합니다 (요청: {workers['infer']})")
+        workers['infer'] = 1
+        self.stages = [
+            PipelineStage('infer', self._infer, workers['infer'], queue_size),
+            PipelineStage('draw', self._draw, workers['draw'], queue_size),
+            PipelineStage('encode', self._encode, workers['encode'], queue_size)
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+
+        self.running = threading.Event()
+        self.feeder = None
+        self._subscribers = 0
+        # 최신 결과 슬롯 (seq가 더 큰 결과만 게시 - 단계별 작업 스레드가 여럿이면 순서가 바뀔 수 있음)
+        self._cond = threading.Condition()
+        self.jpeg = None
+        self.seq = 0
+        self.detection_info = None
+        # 이벤트 루프에서 기다리는 스트림 클라이언트 (loop, asyncio.Event) - 게시할 때 call_soon_threadsafe로 깨움
+        self._waiters = set()
+
+    def subscribe(self):
+        """스트림 클라이언트 등록 - 첫 클라이언트에서 파이프라인 시작"""
+        with self._cond:
+            self._subscribers += 1
+            if not self.running.is_set():
+                self.running.set()
+                for stage in self.stages:
+                    stage.start(self.running)
+                self.feeder = threading.Thread(target=self._feed, daemon=True, name="pipeline-capture")
+                self.feeder.start()
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers = max(self._subscribers - 1, 0)
+
+    def _feed(self):
+        """캡처 단계 - 마지막으로 넣은 프레임보다 새 프레임을 추론 큐에 넣음 (큐가 차면 대기)"""
+        last_seq = 0
+        while self.running.is_set():
+            if not self._subscribers:
+                time.sleep(0.05)
+                continue
+            latest = self.camera.wait_for_frame(last_seq, timeout=self.frame_timeout)
+            if latest is None:
+                continue
+            frame, last_seq, captured_at = latest
+            self.stages[0].put({'frame': frame, 'seq': last_seq, 'captured_at': captured_at,
+                                'started_at': time.perf_counter()}, self.running)
+
+    def _infer(self, job):
+        if self.keyframes is not None:
+            return self._track(job)
+        job['detection_info'], job['detections'], job['status_texts'] = self.detector.detect(job['frame'])
+        return job
+
+    def _track(self, job):
+        """키프레임 모드 추론 단계 - 박스를 이 프레임까지 옮기고, 키프레임 차례면 전체 추론을 백그라운드로 시작"""
+        with self._track_lock:
+            self.keyframes.tick()
+            boxes, state = self.propagator.push(job['seq'], job['frame'])
+            if not self._keyframe_busy and self.keyframes.due(job['seq']):
+                self._keyframe_busy = True
+                self.keyframes.mark(job['seq'])
+                self._keyframe_executor.submit(self._detect_keyframe, job['frame'], job['seq'], time.perf_counter())
+
+        detections = {cls_name: [] for cls_name in self.detector.CLASS_NAMES}
+        if state is None:
+            # 첫 키프레임 결과 전 - 그릴 결과 없음
+            job['detection_info'], job['detections'], job['status_texts'] = None, detections, []
+            return job
+        detection_info, status_texts, items = state
+        for (cls_name, detection), box in zip(items, boxes.tolist()):
+            detections[cls_name].append({'bbox': tuple(int(v) for v in box), 'conf': detection['conf']})
+        job['detection_info'], job['detections'], job['status_texts'] = detection_info, detections, status_texts
+        self.frames_tracked.inc()
+        return job
+
+    def _detect_keyframe(self, frame, seq, started_at):
+        """키프레임 전체 추론 -> 추론 지연으로 K 조정, 이후 프레임은 이 결과의 박스를 옮김"""
+        try:
+            detection_info, detections, status_texts = self.detector.detect(frame)
+            self.keyframes.observe(time.perf_counter() - started_at)
+            items = [(cls_name, detection) for cls_name, objects in detections.items() for detection in objects]
+            self.propagator.reseed(seq, [detection['bbox'] for _, detection in items],
+                                   (detection_info, status_texts, items))
+            self._persist_keyframe(frame, detection_info, detections, status_texts)
+        except Exception as e:
+            print(f"파이프라인 키프레임 추론 오류: {e}")
+        finally:
+            self._keyframe_busy = False
+
+    def _persist_keyframe(self, frame, detection_info, detections, status_texts):
+        """키프레임 프레임과 그 탐지 결과로 위험 상황 저장 (증거 이미지는 결과를 그린 키프레임)"""
+        if detection_info is None or detection_info['risk_level'] not in ("HIGH", "MEDIUM"):
+            return
+        evidence = frame.copy()
+        self.detector.draw(evidence, detections, status_texts)
+        with stage_timer.stage('persist'):
+            self.detector.save_risk_data(evidence, detection_info['risk_level'], detection_info,
+                                         self.detector.focus_bbox(detections))
+
+    def _draw(self, job):
+        # 카메라 슬롯의 프레임은 공유(읽기 전용)이므로 복사본에 그림
+        frame = job['frame'].copy()
+        self.detector.draw(frame, job['detections'], job['status_texts'])
+        job['frame'] = frame
+        return job
+
+    def _encode(self, job):
+        # 마지막 프레임(/snapshot.jpg)으로 등록한 뒤 같은 캐시 키로 인코딩 (스냅샷/증거 이미지가 재사용)
+        frame_key = self.detector.publish_frame(job['frame'])
+        job['jpeg'] = self.detector.encode_frame(job['frame'], frame_key=frame_key)
+        FRAME_LATENCY_SECONDS.observe(time.perf_counter() - job['started_at'])
+        with self._cond:
+            if job['seq'] > self.seq:
+                self.jpeg, self.seq, self.detection_info = job['jpeg'], job['seq'], job['detection_info']
+                self._cond.notify_all()
+                self._wake_waiters()
+        # 위험 상황 저장 (같은 인코딩 결과를 증거 이미지로 사용) - 키프레임 모드는 _persist_keyframe에서 저장
+        info = job['detection_info']
+        if info is None or self.keyframes is not None:
+            return None
+        with stage_timer.stage('persist'):
+            self.detector.save_risk_data(job['frame'], info['risk_level'], info,
+                                         self.detector.focus_bbox(job['detections']), image_bytes=job['jpeg'])
+        return None
+
+    def wait_for_output(self, last_seq=0, timeout=None):
+        """last_seq 보다 새 결과가 게시될 때까지 대기 후 (JPEG 바이트, seq) 반환 (없으면 None)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > last_seq or not self.running.is_set(), timeout)
+            if self.seq <= last_seq:
+                return None
+            return self.jpeg, self.seq
+
+    async def wait_for_output_async(self, last_seq=0, timeout=None):
+        """wait_for_output의 이벤트 루프용 - 스레드(executor)를 점유하지 않고 게시 알림을 기다림"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    if self.seq > last_seq:
+                        return self.jpeg, self.seq
+                    if not self.running.is_set():
+                        return None
+                    waiter[1].clear()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+
+    def _wake_waiters(self):
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 이벤트 루프가 이미 종료된 경우
+                pass
+
+    def stats(self):
+        """단계별 작업 스레드 수, 큐 길이, 점유율, 처리 수"""
+        return {
+            'subscribers': self._subscribers,
+            'published_seq': self.seq,
+            'stages': {stage.name: stage.stats() for stage in self.stages},
+            'keyframes': self.keyframes.stats() if self.keyframes is not None else None
+        }
+
+    def stop(self):
+        self.running.clear()
+        with self._cond:
+            self._cond.notify_all()
+            self._wake_waiters()
+        if self.keyframes is not None:
+            self._keyframe_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+# utils/stack_analysis.py
+import numpy as np
+
+
+def overlap_matrix(regions, boxes):
+    """check_overlap의 벡터화 버전: regions(N,4) x boxes(M,4) 겹침 여부 행렬(N,M) (경계만 닿으면 겹치지 않음)"""
+    regions = np.asarray(regions, dtype=np.float64).reshape(-1, 4)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return ((regions[:, None, 0] < boxes[None, :, 2]) & (regions[:, None, 2] > boxes[None, :, 0]) &
+            (regions[:, None, 1] < boxes[None, :, 3]) & (regions[:, None, 3] > boxes[None, :, 1]))
+
+
+class StackIndex:
+    """박스들을 열(column) 단위로 묶은 적재 인덱스
+
+    - 열: 중심 x를 정렬해 이웃 간격이 박스 너비 x column_gap 이하로 이어지는 박스들 (구간 인덱스)
+    - 높이: 열 안에서 중심 y 순으로 간격이 박스 높이 x stack_gap 이하로 이어진 묶음의 층 수
+      (박스 높이 x level_ratio 이상 올라가야 새 층 - 옆으로 나란한 박스는 같은 층)
+    - 불규칙도: 층이 바뀌는 위아래 박스의 중심 x 어긋남 / 박스 너비의 최댓값
+    사람-적재 근접 질의는 열 외곽 영역으로 후보 열을 고른 뒤 그 열의 박스만 확인한다.
+    정렬 + NumPy 배열 연산이라 박스 수 N에 대해 O(N log N)이다.
+    """
+
+    def __init__(self, boxes, column_gap=0.75, stack_gap=1.5, level_ratio=0.5, irregular_ratio=0.25):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.column_gap = column_gap
+        self.stack_gap = stack_gap
+        self.level_ratio = level_ratio
+        self.irregular_ratio = irregular_ratio
+        self._build()
+
+    def _build(self):
+        boxes = self.boxes
+        count = len(boxes)
+        centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+        centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+        widths = np.maximum(boxes[:, 2] - boxes[:, 0], 1.0)
+        heights = np.maximum(boxes[:, 3] - boxes[:, 1], 1.0)
+
+        # 1) 중심 x 정렬 후 이웃 간격이 (작은 쪽 너비 x column_gap)을 넘는 곳에서 열을 나눔
+        by_x = np.argsort(centers_x, kind='stable')
+        split = np.diff(centers_x[by_x]) > np.minimum(widths[by_x][1:], widths[by_x][:-1]) * self.column_gap
+        self.column_of = np.empty(count, dtype=np.intp)
+        self.column_of[by_x] = np.concatenate([[0], np.cumsum(split)]).astype(np.intp)[:count]
+        self.column_count = int(self.column_of.max()) + 1 if count else 0
+
+        # 2) 열 -> 중심 y 순 정렬 (열별 박스가 연속 구간인 CSR 배치)
+        self.order = np.lexsort((centers_y, self.column_of))
+        sorted_columns = self.column_of[self.order]
+        self.offsets = np.searchsorted(sorted_columns, np.arange(self.column_count + 1))
+
+        # 3) 같은 열에서 y 간격이 이어지는 구간 = 적재 묶음, 묶음 높이 = 1 + 층이 바뀐 횟수
+        sorted_y, sorted_x = centers_y[self.order], centers_x[self.order]
+        sorted_h, sorted_w = heights[self.order], widths[self.order]
+        step_y = np.diff(sorted_y)
+        step_h = np.minimum(sorted_h[1:], sorted_h[:-1])
+        linked = (sorted_columns[1:] == sorted_columns[:-1]) & (step_y <= step_h * self.stack_gap)
+        level_up = linked & (step_y >= step_h * self.level_ratio)
+        run_id = np.concatenate([[0], np.cumsum(~linked)]).astype(np.intp)[:count]
+        run_count = int(run_id[-1]) + 1 if count else 0
+        run_levels = 1 + np.bincount(run_id[1:][level_up], minlength=run_count)
+        run_columns = sorted_columns[np.searchsorted(run_id, np.arange(run_count))]
+        self.heights = np.zeros(self.column_count, dtype=np.intp)
+        np.maximum.at(self.heights, run_columns, run_levels)
+
+        # 4) 불규칙도 - 층이 바뀌는 위아래 박스의 수평 어긋남 (작은 쪽 너비 대비)
+        shift_x = np.abs(np.diff(sorted_x)) / np.minimum(sorted_w[1:], sorted_w[:-1])
+        self.irregularity = np.zeros(self.column_count)
+        np.maximum.at(self.irregularity, sorted_columns[1:][level_up], shift_x[level_up])
+
+        # 5) 열 외곽 영역 (근접 질의 후보 선택용)
+        self.column_boxes = np.zeros((self.column_count, 4))
+        if count:
+            sorted_boxes = boxes[self.order]
+            starts = self.offsets[:-1]
+            self.column_boxes[:, :2] = np.minimum.reduceat(sorted_boxes[:, :2], starts, axis=0)
+            self.column_boxes[:, 2:] = np.maximum.reduceat(sorted_boxes[:, 2:], starts, axis=0)
+
+    def columns(self):
+        """열별 요약 [{'bbox', 'count', 'height', 'irregularity'}] (x 순서)"""
+        counts = np.diff(self.offsets)
+        return [{
+            'bbox': tuple(int(v) for v in self.column_boxes[i]),
+            'count': int(counts[i]),
+            'height': int(self.heights[i]),
+            'irregularity': round(float(self.irregularity[i]), 3)
+        } for i in range(self.column_count)]
+
+    def irregular_columns(self, min_boxes=3):
+        """min_boxes층 이상 쌓인 열 중 불규칙도가 irregular_ratio를 넘는 열 (bool 배열)"""
+        return (self.heights >= min_boxes) & (self.irregularity > self.irregular_ratio)
+
+    def near(self, person_boxes):
+        """사람별 (근접 여부, 겹친 열 중 가장 높은 열 인덱스 또는 -1)
+
+        근접 = 사람 박스가 적재 박스 하나 이상과 겹침 (기존 check_overlap 기준)
+        """
+        person_boxes = np.asarray(person_boxes, dtype=np.float64).reshape(-1, 4)
+        near = np.zeros(len(person_boxes), dtype=bool)
+        nearest_column = np.full(len(person_boxes), -1, dtype=np.intp)
+        if not self.column_count or not len(person_boxes):
+            return near, nearest_column
+
+        # 사람과 겹치는 열의 박스만 후보로 모아 한 번에 확인
+        candidates = overlap_matrix(person_boxes, self.column_boxes)
+        columns = np.flatnonzero(candidates.any(axis=0))
+        if not len(columns):
+            return near, nearest_column
+        members = self.order[np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in columns.tolist()])]
+        hits = overlap_matrix(person_boxes, self.boxes[members])
+        near = hits.any(axis=1)
+        # 겹친 박스가 속한 열 중 가장 높은 열
+        member_columns = self.column_of[members]
+        score = np.where(hits, self.heights[member_columns], -1)
+        nearest_column = np.where(near, member_columns[score.argmax(axis=1)], -1)
+        return near, nearest_column
+
+
+def analyze_stacks(boxes, threshold=6, min_boxes=3, **index_options):
+    """박스 적재 상태 분석
+
+    반환: (StackIndex, 상태) - 'HIGH'(threshold층 이상 수직 적재), 'IRREGULAR'(min_boxes층 이상 불규칙 적재), 'SAFE'
+
+    기존 check_vertical_stack/check_irregular_stack과 판정 기준이 다르다: 층 수와 어긋남을 열 안에서만 센다.
+    기존 방식은 이웃한 다른 열의 박스까지 한 적재로 이어 세거나(HIGH), 다른 열끼리의 x 간격을 어긋남으로 보아
+    (IRREGULAR) 바닥에 한 줄로 놓인 박스도 위험으로 판정했고, 열 안의 박스 x가 조금만 흔들려도 높은 적재를 놓쳤다.
+    """
+    index = StackIndex(boxes, **index_options)
+    if index.column_count and index.heights.max() >= threshold:
+        return index, "HIGH"
+    if index.irregular_columns(min_boxes).any():
+        return index, "IRREGULAR"
+    return index, "SAFE"
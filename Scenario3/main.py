@@ -2,27 +2,33 @@ import cv2
 from utils.camera import get_camera
 from utils import detect
 from utils import zone
+from utils import config
+from utils import database
 
 cap = get_camera()
 if cap is None:
     exit()
+
+#이전 실행에서 DB에 저장하지 못한 이벤트부터 이어서 저장
+database.start_spool()
     
+frame_seq = 0
 while cap.isOpened():
     ret, frame = cap.read()
     if not ret:
         print("캠에서 이미지를 가져올 수 없습니다.")
         break
     
-    #프레임 크기를 조정 (예: 1280x720으로 조정하여 노트북 화면에 맞춤)
-    frame = cv2.resize(frame, (1535,820))  # 원하는 너비와 높이로 조절 
-    display_frame = frame.copy()
+    #표시용 프레임만 화면 크기로 조정 (추론은 원본 프레임에서 모델 입력 크기로 한 번만 변환)
+    frame_seq += 1
+    display_frame = cv2.resize(frame, config.DISPLAY_SIZE)
     
     #구역표시
     displayed_frame = zone.annotate_zones(display_frame)
     
-    #프레임에서 손 감지
+    #프레임에서 손 감지 (결과 좌표는 원본 기준 -> 비율 좌표로 구역 판정 후 표시 프레임에 그림)
     results= detect.detect_objects(frame)
-    detect.hand_detections(results, display_frame)
+    detect.hand_detections(results, display_frame, frame_seq, (frame.shape[1], frame.shape[0]))
     
     cv2.imshow('SAFEWATCH - Hand Detection', display_frame)
     if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -30,3 +36,5 @@ while cap.isOpened():
 
 cap.release()
 cv2.destroyAllWindows()
+#DB에 아직 저장하지 못한 이벤트는 spool 파일에 남아 다음 실행 시 저장됨
+database.close_spool()
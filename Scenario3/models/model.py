@@ -1,7 +1,5 @@
-from ultralytics import YOLO
+from common.inference import create_engine
 
 def get_model():
-    model = YOLO('models/best.pt')
-    model.conf = 0.75
-    model.iou = 0.45
-    return model
\ No newline at end of file
+    # 장치 자동 선택(GPU 없으면 CPU) - INFERENCE_BACKEND/INFERENCE_DEVICE/INFERENCE_THREADS 로 설정
+    return create_engine('models/best.pt', conf=0.75, iou=0.45)
@@ -0,0 +1,16 @@
+from datetime import datetime
+import numpy as np
+import utils  # noqa: F401  (common 경로 추가)
+from common.evidence_store import EvidenceStore
+from utils import encode
+
+
+def test_evidence_timestamp_binds_as_datetime(tmp_path, monkeypatch):
+    monkeypatch.setattr(encode, 'evidence_store', EvidenceStore(root_dir=str(tmp_path)))
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+
+    timestamp, evidence_id = encode.evidence_encode(frame, (10, 10, 60, 60), frame_seq=1)
+
+    # DETECTION_TIME(DATE)에 TO_DATE 없이 바인딩되므로 문자열이 아닌 datetime
+    assert isinstance(timestamp, datetime)
+    assert encode.evidence_store.path_for(evidence_id) is not None
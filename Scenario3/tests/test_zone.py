@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from utils import zone
+
+FRAME_SIZE = (1535, 820)
+DANGER, WARNING = ((80, 150), (350, 600)), ((215, 90), (500, 660))
+
+
+def is_inside(box, zone_start, zone_end):
+    """기존 is_inside_danger_zone (사각형 구역, 경계에 닿기만 하면 밖)"""
+    x_min, y_min, x_max, y_max = box
+    return x_min < zone_end[0] and x_max > zone_start[0] and y_min < zone_end[1] and y_max > zone_start[1]
+
+def rect(x1, y1, x2, y2):
+    return [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+
+
+def test_default_rectangles_match_legacy_check():
+    engine = zone.ZoneEngine(zone.config.DEFAULT_ZONES)
+    rng = np.random.default_rng(0)
+    corners = rng.integers(0, 1400, size=(2000, 2)) * (1, 820 / 1535)
+    boxes = np.column_stack([corners, corners + rng.integers(1, 150, size=(2000, 2))]).astype(int)
+    # 구역 경계에 딱 맞닿거나 1픽셀 걸친 박스
+    edges = [(350, 300, 420, 360), (349, 300, 420, 360), (10, 300, 80, 360), (10, 300, 81, 360),
+             (400, 660, 450, 700), (400, 659, 450, 700), (100, 50, 150, 150), (500, 100, 560, 200)]
+    boxes = np.concatenate([boxes, edges])
+
+    zone_ids, _ = engine.classify(zone.normalize_boxes(boxes, FRAME_SIZE))
+    # 기존 판정: 위험구역 우선, 아니면 경고구역
+    expected = [0 if is_inside(box, *DANGER) else 1 if is_inside(box, *WARNING) else -1 for box in boxes.tolist()]
+    assert zone_ids.tolist() == expected
+    assert zone_ids[len(boxes) - len(edges):].tolist() == [1, 0, -1, 0, -1, 1, -1, -1]
+
+def test_overlap_fraction_uses_true_box_extent():
+    engine = zone.ZoneEngine([{'name': 'a', 'polygon': rect(0.2, 0.2, 0.6, 0.6)},
+                              {'name': 'tri', 'polygon': [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)], 'risk_level': 'LOW'}])
+    fractions = engine.overlaps([(0.5, 0.5, 0.7, 0.7), (0.6, 0.2, 0.7, 0.3), (0.4, 0.4, 0.6, 0.6)])
+    np.testing.assert_allclose(fractions[:, 0], [0.25, 0.0, 1.0], atol=1e-6)
+    # 기울어진 경계는 칸 안 보간 오차(한 칸 넓이) 이내
+    np.testing.assert_allclose(fractions[:, 1], [0.0, 1.0, 0.5], atol=1e-3)
+
+def test_priority_wins_then_larger_overlap():
+    engine = zone.ZoneEngine([
+        {'name': 'left', 'polygon': rect(0.0, 0.0, 0.5, 1.0), 'risk_level': 'MEDIUM'},
+        {'name': 'right', 'polygon': rect(0.5, 0.0, 1.0, 1.0), 'risk_level': 'MEDIUM'},
+        {'name': 'edge', 'polygon': rect(0.45, 0.0, 0.46, 1.0), 'risk_level': 'HIGH', 'min_overlap': 0.2}
+    ])
+    zone_ids, overlap = engine.classify([(0.40, 0.1, 0.60, 0.2),   # 같은 위험도 - 절반씩이면 앞 구역
+                                         (0.48, 0.1, 0.60, 0.2),   # 더 많이 겹친 구역
+                                         (0.44, 0.1, 0.47, 0.2),   # 위험도가 높은 구역 (겹침 33%)
+                                         (0.40, 0.1, 0.50, 0.2)])  # min_overlap(20%) 이하는 무시
+    assert zone_ids.tolist() == [0, 1, 2, 0]
+    np.testing.assert_allclose(overlap, [0.5, 10 / 12, 1 / 3, 1.0], atol=1e-5)
+
+def test_empty_boxes_and_zones():
+    engine = zone.ZoneEngine(zone.config.DEFAULT_ZONES)
+    zone_ids, overlap = engine.classify(np.zeros((0, 4)))
+    assert zone_ids.shape == (0,) and overlap.shape == (0,)
+
+    empty = zone.ZoneEngine([])
+    zone_ids, overlap = empty.classify([(0.1, 0.1, 0.2, 0.2)])
+    assert zone_ids.tolist() == [-1] and overlap.tolist() == [0.0]
+    assert empty.roi_rects(FRAME_SIZE, mode='union') is None
+
+def test_roi_rects_union_tiles_and_coverage_fallback():
+    engine = zone.ZoneEngine([{'name': 'a', 'polygon': rect(0.1, 0.1, 0.2, 0.2)},
+                              {'name': 'b', 'polygon': rect(0.15, 0.15, 0.3, 0.25)},
+                              {'name': 'c', 'polygon': rect(0.7, 0.6, 0.8, 0.9)}])
+    size = (1000, 500)
+
+    assert engine.roi_rects(size, mode='union', padding=0.0) == [(100, 50, 800, 450)]
+    # 겹치는 a, b는 하나로 합치고 c는 따로
+    tiles = engine.roi_rects(size, mode='tiles', padding=0.0)
+    assert sorted(tiles) == [(100, 50, 300, 125), (700, 300, 800, 450)]
+    # padding으로 넓힌 사각형끼리 겹치면 합쳐짐
+    assert engine.roi_rects(size, mode='tiles', padding=0.21, max_coverage=1.01) == [(0, 0, 1000, 500)]
+    # 프레임 면적 대비 max_coverage 이상이면 전체 프레임 추론
+    assert engine.roi_rects(size, mode='union', padding=0.0, max_coverage=0.5) is None
+    assert engine.roi_rects(size, mode='off') is None
+    assert engine.roi_rects(size, mode='tiles', padding=0.0) is tiles
+    with pytest.raises(ValueError):
+        engine.roi_rects(size, mode='grid')
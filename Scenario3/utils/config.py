@@ -1,5 +1,35 @@
 ### config.py ###
+import os
 
-# 위험구역 범위 설정 
-warning_zone_start, warning_zone_end = (215, 90), (500, 660)
-danger_zone_start, danger_zone_end = (80,150), (350, 600)
+# 화면 표시 크기 (추론 해상도와 무관 - 추론은 원본 프레임을 모델 입력 크기로 한 번만 변환)
+DISPLAY_SIZE = (1535, 820)
+
+# 카메라 ID (DB 저장, 구역 설정 파일 이름)
+CAMERA_ID = os.getenv("CAMERA_ID", "CAM_003")
+
+# 카메라별 구역 설정 파일 (없으면 DEFAULT_ZONES 사용)
+ZONE_CONFIG = os.getenv("ZONE_CONFIG", os.path.join("zones", f"{CAMERA_ID}.json"))
+
+# 구역 ROI 추론 - off: 전체 프레임, union: 모든 구역을 감싸는 영역 1장, tiles: 구역별 영역(겹치면 합침)을 배치로 추론
+ROI_MODE = os.getenv("ROI_MODE", "off")
+# ROI 여백 (프레임 크기 대비 비율) - 구역 경계에 걸친 손이 잘리지 않도록 구역 바깥까지 포함
+ROI_PADDING = float(os.getenv("ROI_PADDING", "0.05"))
+# ROI 면적이 프레임의 이 비율 이상이면 잘라도 이득이 없으므로 전체 프레임 추론
+ROI_MAX_COVERAGE = float(os.getenv("ROI_MAX_COVERAGE", "0.8"))
+
+# 구역 판정용 격자 해상도 (비율 좌표 0~1을 ZONE_GRID_SIZE 칸으로 나눔)
+ZONE_GRID_SIZE = (512, 512)
+
+# 기본 구역 - 프레임 크기에 대한 비율(0~1) 좌표 다각형 (기존 1535x820 화면 픽셀 좌표를 환산)
+DEFAULT_ZONES = [
+    {
+        'name': 'danger_zone',
+        'risk_level': 'HIGH',
+        'polygon': [(80 / 1535, 150 / 820), (350 / 1535, 150 / 820), (350 / 1535, 600 / 820), (80 / 1535, 600 / 820)]
+    },
+    {
+        'name': 'warning_zone',
+        'risk_level': 'MEDIUM',
+        'polygon': [(215 / 1535, 90 / 820), (500 / 1535, 90 / 820), (500 / 1535, 660 / 820), (215 / 1535, 660 / 820)]
+    }
+]
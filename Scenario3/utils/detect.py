@@ -2,69 +2,82 @@ import time
 import os
 from datetime import datetime
 import cv2
+import numpy as np
+from common.inference import Detections
 from utils.database import async_insert_detection_data
 from models.model import get_model
 import threading
 from utils import zone
-from utils.encode import image_encode
+from utils.encode import evidence_encode
 from utils import config
 
 model = get_model()
 
-captured_warning_zone = False
-captured_danger_zone = False
-last_capture_time_warning = 0
-last_capture_time_danger = 0
+# 구역 이름별 캡처 상태 / 마지막 캡처 시각
+captured_zones = {}
+last_capture_times = {}
 capture_cooldown = 2  # 1초 대기
 
-#모델 예측
+# 위험도별 경고 문구 색상 (BGR)
+ALERT_COLORS = {'LOW': (0, 255, 0), 'MEDIUM': (0, 255, 255), 'HIGH': (0, 128, 255)}
+
+#모델 예측 (원본 프레임을 추론 엔진이 모델 입력 크기로 한 번만 변환, 결과는 원본 좌표)
+#ROI_MODE가 켜져 있으면 구역 주변 영역만 잘라(tiles: 여러 장을 한 번에 배치로) 추론하고 박스를 원본 좌표로 되돌림
 def detect_objects(frame):
-    results = model(frame,conf=0.75)
-    return results
+    rects = zone.zone_engine.roi_rects((frame.shape[1], frame.shape[0]))
+    if rects is None:
+        return model(frame,conf=0.75)
+
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+    results = model(crops, conf=0.75)
+    offsets = np.array([(x1, y1, x1, y1) for x1, y1, _, _ in rects], dtype=np.float32)
+    # 영역별 결과를 한 프레임의 결과로 합침 (겹치는 영역은 미리 합쳐져 있어 중복 박스 없음)
+    return [Detections(np.concatenate([result.xyxy + offset for result, offset in zip(results, offsets)]),
+                       np.concatenate([result.cls for result in results]),
+                       np.concatenate([result.conf for result in results]))]
 
 #감지 시 캡처, DB삽입
-def hand_detections(results, display_frame):
-    global captured_warning_zone, captured_danger_zone, last_capture_time_warning, last_capture_time_danger
-    hand_in_warning_zone = False
-    hand_in_danger_zone = False
+#frame_size: 추론한 프레임의 (너비, 높이) - 구역 판정은 비율 좌표, 그리기는 표시 프레임 좌표
+def hand_detections(results, display_frame, frame_seq=None, frame_size=None):
+    hands_in_zones = set()
 
-    # 위험도가 더 높은 Danger Zone을 우선 처리하기 위해 플래그 추가
-    danger_zone_detected = False
+    # 위험도가 더 높은 구역을 우선 처리하기 위해 이번 프레임에서 처리한 최고 위험도 기록
+    alert_rank = 0
+    if frame_size is None:
+        frame_size = (display_frame.shape[1], display_frame.shape[0])
     
     for result in results:
-        for box in result.boxes:
-            x_min, y_min, x_max, y_max = map(int, box.xyxy[0])
-            conf = box.conf[0].item()
-            label = int(box.cls[0].item())
+        # 모든 박스 x 모든 구역을 한 번에 판정
+        normalized_boxes = zone.normalize_boxes(result.xyxy, frame_size)
+        zone_ids, overlaps = zone.zone_engine.classify(normalized_boxes)
+        for normalized_box, label, conf, zone_id, overlap in zip(normalized_boxes, result.cls.tolist(), result.conf.tolist(), zone_ids.tolist(), overlaps.tolist()):
+            x_min, y_min, x_max, y_max = zone.to_display_box(normalized_box, display_frame)
             class_name = model.names[label]
             
             cv2.rectangle(display_frame, (x_min, y_min), (x_max, y_max), (255, 255, 255), 2)
             label_text = f"{class_name}: {conf:.2f}"
             cv2.putText(display_frame, label_text, (x_min, y_min - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
-            if zone.is_inside_danger_zone((x_min, y_min, x_max, y_max), config.danger_zone_start, config.danger_zone_end):
-                danger_zone_detected = True  # Danger Zone 감지
-                hand_in_danger_zone = True
-                cv2.putText(display_frame, 'WARNING : Danger_Zone', (550, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 128, 255), 2)
-                cv2.putText(display_frame, 'RISK-LEVEL : HIGH', (550, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 128, 255), 2)
-                if not captured_danger_zone and time.time() - last_capture_time_danger >= capture_cooldown:
-                    timestamp, image_binary = image_encode(display_frame)
-                    async_insert_detection_data("CAM_003", timestamp, class_name, image_binary, 'HIGH', "손이 위험구역에 감지됨.") # DB삽입
-                    captured_danger_zone = True
-                    last_capture_time_danger = time.time()
-                    
-            elif not danger_zone_detected and zone.is_inside_danger_zone((x_min, y_min, x_max, y_max), config.warning_zone_start, config.warning_zone_end):
-                hand_in_warning_zone = True
-                cv2.putText(display_frame, 'WARNING : Warning_Zone', (550, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 255), 2)
-                cv2.putText(display_frame, 'RISK-LEVEL : MEDIUM', (550, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 255), 2)
-                if not captured_warning_zone and time.time() - last_capture_time_warning >= capture_cooldown:
-                    timestamp, image_binary = image_encode(display_frame)
-                    async_insert_detection_data("CAM_003", timestamp, class_name, image_binary, 'MEDIUM', "손이 경고구역에 감지됨.") # DB삽입
-                    captured_warning_zone = True
-                    last_capture_time_warning = time.time()
+            if zone_id < 0:
+                continue
+            area = zone.zone_engine.zones[zone_id]
+            hands_in_zones.add(area['name'])
+            rank = zone.RISK_ORDER[area['risk_level']]
+            if rank < alert_rank:
+                continue
+            alert_rank = rank
+
+            color = ALERT_COLORS[area['risk_level']]
+            cv2.putText(display_frame, f"WARNING : {area['name']} ({overlap:.0%})", (550, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 2)
+            cv2.putText(display_frame, f"RISK-LEVEL : {area['risk_level']}", (550, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 2)
+            if not captured_zones.get(area['name']) and time.time() - last_capture_times.get(area['name'], 0) >= capture_cooldown:
+                timestamp, evidence_id = evidence_encode(display_frame, (x_min, y_min, x_max, y_max), frame_seq)
+                detection_object = {'class': class_name, 'conf': round(conf, 3), 'zone': area['name'], 'overlap': round(overlap, 3)}
+                async_insert_detection_data(config.CAMERA_ID, timestamp, detection_object, evidence_id, area['risk_level'], area['message']) # DB삽입
+                captured_zones[area['name']] = True
+                last_capture_times[area['name']] = time.time()
                         
     # 손이 구역을 완전히 벗어난 경우 일정 시간 동안 캡처 방지
-    if not hand_in_danger_zone and time.time() - last_capture_time_danger >= capture_cooldown:
-        captured_danger_zone = False  # 일정 시간이 지난 후 캡처 상태 초기화
-    if not hand_in_warning_zone and time.time() - last_capture_time_warning >= capture_cooldown:
-        captured_warning_zone = False  # 일정 시간이 지난 후 캡처 상태 초기화                 
\ No newline at end of file
+    for name in list(captured_zones):
+        if name not in hands_in_zones and time.time() - last_capture_times.get(name, 0) >= capture_cooldown:
+            captured_zones[name] = False  # 일정 시간이 지난 후 캡처 상태 초기화
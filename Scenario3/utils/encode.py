@@ -1,14 +1,30 @@
 import cv2
 from datetime import datetime
+from common.jpeg_cache import EncodedFrameCache
+from common.evidence_store import EvidenceStore
 
-def image_encode(display_frame):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    # 이미지를 메모리에서 바로 jpg 형식으로 인코딩
-    success, encoded_image = cv2.imencode('.jpg', display_frame)
-    if success:
-        # 인코딩된 이미지를 바이너리 데이터로 변환
-        image_binary = encoded_image.tobytes()
+# 프레임 번호별 인코딩 캐시 - 같은 프레임은 구역별 DB 삽입에서 한 번만 인코딩
+jpeg_cache = EncodedFrameCache(max_entries=4)
+
+# 증거 이미지 저장소 - DB의 IMAGE_URL에는 증거 ID만 저장
+evidence_store = EvidenceStore()
+
+def image_encode(display_frame, frame_seq=None):
+    # DETECTION_TIME(DATE)에 그대로 바인딩하는 탐지 시각 (문자열로 바꾸지 않음)
+    timestamp = datetime.now()
+    # 이미지를 메모리에서 바로 jpg 형식으로 인코딩 (frame_seq가 있으면 캐시 재사용)
+    if frame_seq is None:
+        success, encoded_image = cv2.imencode('.jpg', display_frame)
+        image_binary = encoded_image.tobytes() if success else None
+    else:
+        image_binary = jpeg_cache.encode(frame_seq, display_frame)
+    if image_binary is not None:
         print('이미지 인코딩 완료')
         return timestamp, image_binary
     else :
-        print('이미지 인코딩 실패')
\ No newline at end of file
+        print('이미지 인코딩 실패')
+
+def evidence_encode(display_frame, bbox=None, frame_seq=None):
+    # 프레임과 손 영역 crop/썸네일을 증거 저장소에 저장하고 (timestamp, 증거 ID) 반환
+    timestamp, image_binary = image_encode(display_frame, frame_seq)
+    return timestamp, evidence_store.save_evidence(display_frame, image_binary, bbox)
@@ -1,20 +1,248 @@
 #zone.py
+import json
+import os
 import cv2
+import numpy as np
 from utils import config
-import threading
 
-# 구역 표시
+# 위험도 우선순위 (높을수록 먼저 처리)
+RISK_ORDER = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3}
+# 위험도별 기본 구역 선 색상 (BGR) / 경고 문구
+RISK_COLORS = {'LOW': (0, 255, 0), 'MEDIUM': (0, 0, 0), 'HIGH': (0, 0, 255)}
+RISK_MESSAGES = {'LOW': "손이 주의구역에 감지됨.", 'MEDIUM': "손이 경고구역에 감지됨.", 'HIGH': "손이 위험구역에 감지됨."}
+
+# 비율 좌표(0~1) -> 프레임 픽셀 좌표
+def to_pixels(point, frame):
+    height, width = frame.shape[:2]
+    return int(round(point[0] * width)), int(round(point[1] * height))
+
+# 프레임 픽셀 박스(N, 4) -> 비율 좌표(0~1) 박스 (frame_size: (너비, 높이))
+def normalize_boxes(boxes, frame_size):
+    width, height = frame_size
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4) / np.array([width, height, width, height], dtype=np.float32)
+
+# 비율 좌표(0~1) 박스 -> 표시 프레임 픽셀 박스
+def to_display_box(normalized_box, displayed_frame):
+    x_min, y_min, x_max, y_max = normalized_box
+    return to_pixels((x_min, y_min), displayed_frame) + to_pixels((x_max, y_max), displayed_frame)
+
+
+# 다각형이 (-inf, X] x (-inf, Y] 에서 차지하는 넓이 (X, Y는 브로드캐스트 가능한 배열)
+# 그린 정리로 경계를 따라 min(x, X) * [y < Y] dy 를 적분 - 변마다 닫힌 식이라 격자 없이 정확함
+def quadrant_area(polygon, X, Y):
+    polygon = np.asarray(polygon, dtype=np.float64)
+    area = 0.0
+    for (xa, ya), (xb, yb) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        if ya == yb:
+            continue
+        slope = (xb - xa) / (yb - ya)
+        s, t = np.minimum(ya, Y), np.minimum(yb, Y)
+        xs, xt = xa + (s - ya) * slope, xa + (t - ya) * slope
+        # min(x, X) = x - max(x - X, 0), 변 위에서 x - X는 선형이므로 양수 부분의 평균도 닫힌 식
+        us, ut = np.maximum(xs - X, 0.0), np.maximum(xt - X, 0.0)
+        same = xt == xs
+        excess = np.where(same, us, (ut ** 2 - us ** 2) / (2 * (xt - xs) + same))
+        area = area + (t - s) * ((xs + xt) / 2 - excess)
+    # 꼭짓점 순서(시계/반시계)와 관계없이 양수
+    signed = np.sum(polygon[:, 0] * np.roll(polygon[:, 1], -1) - np.roll(polygon[:, 0], -1) * polygon[:, 1])
+    return area if signed >= 0 else -area
+
+
+class ZoneEngine:
+    """카메라별 다각형 구역 판정
+
+    격자점마다 구역이 [0, x] x [0, y]에서 차지하는 넓이(누적 면적, integral) 테이블을 한 번 만들어 두면,
+    박스 N개 x 구역 Z개의 겹침 비율을 모서리 4점 조회만으로 한 번에 계산할 수 있다.
+    격자선은 grid_size 등간격 선에 구역 꼭짓점 좌표를 더한 것이라 축에 나란한 구역 경계는 항상 격자선 위에 놓이고,
+    격자 사이 모서리는 칸 안에서 쌍선형 보간한다 - 사각형 구역은 박스의 실제 범위로 정확히 판정되고
+    (경계에 닿기만 한 박스는 겹침 0), 기울어진 경계가 지나는 칸에서만 한 칸 넓이 이내의 오차가 생긴다.
+    화면 표시용 구역 선/이름도 표시 크기별로 한 번만 그려 두고 매 프레임 해당 픽셀만 복사한다.
+    """
+
+    def __init__(self, zones, grid_size=config.ZONE_GRID_SIZE):
+        self.zones = [self._normalize(zone) for zone in zones]
+        self.grid_size = grid_size
+        self.priority = np.array([RISK_ORDER[zone['risk_level']] for zone in self.zones], dtype=np.float32)
+        self.min_overlap = np.array([zone['min_overlap'] for zone in self.zones], dtype=np.float32)
+        self._xs, self._ys, self._integral = self._build_integral()
+        self._overlays = {}
+        self._rois = {}
+
+    @classmethod
+    def from_file(cls, config_path=None):
+        """구역 설정 JSON 로드 ({"zones": [...]} 또는 구역 목록). 파일이 없으면 기본 구역 사용"""
+        config_path = config_path or config.ZONE_CONFIG
+        if config_path and os.path.exists(config_path):
+            with open(config_path, encoding='utf-8') as f:
+                zones = json.load(f)
+            if isinstance(zones, dict):
+                zones = zones['zones']
+        else:
+            print(f"구역 설정 파일이 없어 기본 구역을 사용합니다: {config_path}")
+            zones = config.DEFAULT_ZONES
+        return cls(zones)
+
+    @staticmethod
+    def _normalize(zone):
+        risk_level = zone.get('risk_level', 'HIGH').upper()
+        if risk_level not in RISK_ORDER:
+            raise ValueError(f"알 수 없는 위험도: {risk_level} ({zone['name']})")
+        polygon = np.asarray(zone['polygon'], dtype=np.float32)
+        if polygon.ndim != 2 or polygon.shape[0] < 3 or polygon.shape[1] != 2:
+            raise ValueError(f"구역 다각형은 3개 이상의 (x, y) 비율 좌표여야 합니다: {zone['name']}")
+        return {
+            'name': zone['name'],
+            'risk_level': risk_level,
+            'polygon': polygon,
+            'color': tuple(zone.get('color', RISK_COLORS[risk_level])),
+            'message': zone.get('message', RISK_MESSAGES[risk_level]),
+            # 박스 면적 중 이 비율을 넘게 겹쳐야 구역 안으로 판정 (기본: 조금이라도 겹치면)
+            'min_overlap': float(zone.get('min_overlap', 0.0))
+        }
+
+    def _build_integral(self):
+        """격자선 좌표 (xs, ys)와 구역별 누적 면적 테이블 (Z, len(ys), len(xs))"""
+        width, height = self.grid_size
+        vertices = np.concatenate([zone['polygon'] for zone in self.zones]) if self.zones else np.zeros((0, 2))
+        xs = np.union1d(np.linspace(0.0, 1.0, width + 1), np.clip(vertices[:, 0].astype(np.float64), 0.0, 1.0))
+        ys = np.union1d(np.linspace(0.0, 1.0, height + 1), np.clip(vertices[:, 1].astype(np.float64), 0.0, 1.0))
+        integral = np.zeros((len(self.zones), len(ys), len(xs)))
+        for i, zone in enumerate(self.zones):
+            integral[i] = quadrant_area(zone['polygon'], xs[None, :], ys[:, None])
+        return xs, ys, integral
+
+    def _integral_at(self, x, y):
+        """점 (x[n], y[n])의 구역별 누적 면적 (Z, N) - 격자 칸 안에서 쌍선형 보간"""
+        xs, ys, table = self._xs, self._ys, self._integral
+        i = np.clip(np.searchsorted(xs, x, side='right') - 1, 0, len(xs) - 2)
+        j = np.clip(np.searchsorted(ys, y, side='right') - 1, 0, len(ys) - 2)
+        fx = (x - xs[i]) / (xs[i + 1] - xs[i])
+        fy = (y - ys[j]) / (ys[j + 1] - ys[j])
+        # a + (b - a) * f 형태 - 양쪽 값이 같으면(구역 밖으로 벗어난 구간) 보간해도 값이 그대로 유지됨
+        top = table[:, j, i] + (table[:, j, i + 1] - table[:, j, i]) * fx
+        bottom = table[:, j + 1, i] + (table[:, j + 1, i + 1] - table[:, j + 1, i]) * fx
+        return top + (bottom - top) * fy
+
+    def overlaps(self, boxes):
+        """비율 좌표 박스(N, 4)와 모든 구역의 겹침 비율 (N, Z) - 박스 면적(프레임 안 부분) 대비 구역에 포함된 비율"""
+        boxes = np.clip(np.asarray(boxes, dtype=np.float64).reshape(-1, 4), 0.0, 1.0)
+        x1, y1, x2, y2 = boxes.T
+        # 네 모서리를 한 번에 조회
+        corners = self._integral_at(np.concatenate([x2, x1, x2, x1]), np.concatenate([y2, y2, y1, y1]))
+        right_bottom, left_bottom, right_top, left_top = np.split(corners, 4, axis=1)
+        inside = right_bottom - left_bottom - right_top + left_top
+        area = (x2 - x1) * (y2 - y1)
+        fractions = np.divide(inside, area, out=np.zeros_like(inside), where=area > 0)
+        return np.clip(fractions, 0.0, 1.0).T.astype(np.float32)
+
+    def classify(self, boxes):
+        """박스마다 (구역 인덱스, 겹침 비율) 판정 - 겹친 구역 중 위험도가 가장 높은(같으면 더 많이 겹친) 구역
+
+        구역 밖이면 인덱스 -1, 겹침 비율 0.
+        """
+        fractions = self.overlaps(boxes)
+        if not self.zones or fractions.size == 0:
+            return np.full(len(fractions), -1, dtype=np.intp), np.zeros(len(fractions), dtype=np.float32)
+
+        hit = fractions > self.min_overlap
+        # 겹침 비율은 1 이하이므로 위험도 차이(2 이상)를 넘지 않음
+        score = np.where(hit, self.priority * 2 + fractions, -1)
+        zone_ids = score.argmax(axis=1)
+        inside = hit[np.arange(len(zone_ids)), zone_ids]
+        overlap = np.where(inside, fractions[np.arange(len(zone_ids)), zone_ids], 0.0).astype(np.float32)
+        return np.where(inside, zone_ids, -1), overlap
+
+    def roi_rects(self, frame_size, mode=config.ROI_MODE, padding=config.ROI_PADDING,
+                  max_coverage=config.ROI_MAX_COVERAGE):
+        """추론할 프레임 영역 목록 [(x1, y1, x2, y2), ...] (픽셀, frame_size: (너비, 높이))
+
+        union: 모든 구역을 감싸는 사각형 1개, tiles: 구역별 사각형 (겹치면 하나로 합쳐 같은 손이 두 번 잡히지 않게 함).
+        사각형은 프레임 대비 padding 비율만큼 넓혀 구역 경계에 걸친 손도 포함한다.
+        off이거나 구역이 없거나 영역 합이 프레임의 max_coverage 이상이면 None (전체 프레임 추론).
+        """
+        key = (tuple(frame_size), mode, padding, max_coverage)
+        if key not in self._rois:
+            self._rois[key] = self._compute_rois(frame_size, mode, padding, max_coverage)
+        return self._rois[key]
+
+    def _compute_rois(self, frame_size, mode, padding, max_coverage):
+        if mode not in ('off', 'union', 'tiles'):
+            raise ValueError(f"알 수 없는 ROI_MODE: {mode} (off, union, tiles)")
+        if mode == 'off' or not self.zones:
+            return None
+
+        # 구역별 비율 좌표 사각형 (padding 포함)
+        rects = [np.concatenate([zone['polygon'].min(axis=0) - padding, zone['polygon'].max(axis=0) + padding])
+                 for zone in self.zones]
+        if mode == 'union':
+            rects = [np.concatenate([np.min(rects, axis=0)[:2], np.max(rects, axis=0)[2:]])]
+        else:
+            rects = self._merge_overlapping(rects)
+
+        width, height = frame_size
+        pixel_rects = []
+        for x1, y1, x2, y2 in np.clip(rects, 0.0, 1.0):
+            rect = (int(np.floor(x1 * width)), int(np.floor(y1 * height)),
+                    int(np.ceil(x2 * width)), int(np.ceil(y2 * height)))
+            if rect[2] > rect[0] and rect[3] > rect[1]:
+                pixel_rects.append(rect)
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in pixel_rects)
+        if not pixel_rects or area >= max_coverage * width * height:
+            return None
+        return pixel_rects
+
+    @staticmethod
+    def _merge_overlapping(rects):
+        """겹치는 사각형을 더 이상 겹치지 않을 때까지 감싸는 사각형으로 합침"""
+        rects = [np.asarray(rect, dtype=np.float32) for rect in rects]
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(rects)):
+                for j in range(i + 1, len(rects)):
+                    a, b = rects[i], rects[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        rects[i] = np.concatenate([np.minimum(a[:2], b[:2]), np.maximum(a[2:], b[2:])])
+                        del rects[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return rects
+
+    def _render(self, width, height):
+        """표시 크기용 구역 선/이름을 그려 두고 복사용 마스크와 가장자리 투명도를 계산"""
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for zone in self.zones:
+            points = np.round(zone['polygon'] * (width, height)).astype(np.int32)
+            name_size = cv2.getTextSize(zone['name'], cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+            x_max, y_max = points.max(axis=0)
+            text_org = (int(x_max) - name_size[0], int(y_max) + 30)
+            # 검은색 구역도 구분할 수 있도록 마스크에 같은 모양을 따로 그림
+            for target, color in ((canvas, zone['color']), (mask, 255)):
+                cv2.polylines(target, [points], True, color, 3)
+                cv2.putText(target, zone['name'], text_org, cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+        # 완전히 덮이는 픽셀은 마스크 복사, 안티에일리어싱 가장자리만 마스크 값을 투명도로 합성
+        opaque = (mask == 255).astype(np.uint8)
+        edge_ys, edge_xs = np.nonzero((mask > 0) & (mask < 255))
+        edge_keep = (1.0 - mask[edge_ys, edge_xs] / 255.0)[:, None].astype(np.float32)
+        return canvas, opaque, edge_ys, edge_xs, canvas[edge_ys, edge_xs].astype(np.float32), edge_keep
+
+    def annotate(self, displayed_frame):
+        height, width = displayed_frame.shape[:2]
+        overlay = self._overlays.get((width, height))
+        if overlay is None:
+            overlay = self._overlays[(width, height)] = self._render(width, height)
+        canvas, opaque, edge_ys, edge_xs, edge_colors, edge_keep = overlay
+        cv2.copyTo(canvas, opaque, displayed_frame)
+        displayed_frame[edge_ys, edge_xs] = displayed_frame[edge_ys, edge_xs] * edge_keep + edge_colors
+        return displayed_frame
+
+
+# 현재 카메라의 구역 (ZONE_CONFIG)
+zone_engine = ZoneEngine.from_file()
+
+# 구역 표시 (표시 크기별로 미리 그려 둔 구역 선/이름을 복사)
 def annotate_zones(displayed_frame):
-    cv2.rectangle(displayed_frame, config.warning_zone_start, config.warning_zone_end, (0, 0, 0), 3)
-    cv2.putText(displayed_frame, "warning_zone", (config.warning_zone_end[0] - 60, config.warning_zone_end[1] + 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2, cv2.LINE_AA)
-    cv2.rectangle(displayed_frame, config.danger_zone_start, config.danger_zone_end, (0, 0, 255), 3)
-    cv2.putText(displayed_frame, "danger_zone", (config.danger_zone_end[0] - 100, config.danger_zone_end[1] + 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2, cv2.LINE_AA)
-    return displayed_frame
-
-#구역 내 손 검출
-def is_inside_danger_zone(box, zone_start, zone_end):
-    x_min, y_min, x_max, y_max = box
-    return (x_min < zone_end[0] and x_max > zone_start[0] and
-            y_min < zone_end[1] and y_max > zone_start[1])
+    return zone_engine.annotate(displayed_frame)
@@ -0,0 +1,252 @@
+"""녹화 영상/합성 프레임 재생 벤치마크
+
+세 시나리오의 탐지 경로(Scenario1/2 SafetyDetector.process_detections,
+Scenario3 detect_objects + hand_detections)에 같은 프레임 시퀀스를 흘려 보내고
+fps, 프레임당 지연 시간(p50/p95/p99), 단계별(preprocess/model/postprocess/draw/encode)
+소요 시간을 JSON으로 출력한다. DB 저장은 측정에서 제외한다.
+
+예)
+    python benchmarks/replay.py --scenario all --frames 300 --output bench.json
+    python benchmarks/replay.py --scenario 1 --source clip.mp4 --backend onnxruntime --threads 4
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from common.profiling import stage_timer
+
+SCENARIOS = {'1': 'Scenario1', '2': 'Scenario2', '3': 'Scenario3'}
+STAGES = ('preprocess', 'model', 'postprocess', 'draw', 'encode')
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """움직이는 사각형이 있는 합성 프레임 시퀀스 (재현 가능하도록 seed 고정)"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        for k in range(3):
+            x = int((i * (4 + k) + k * width // 3) % (width - 80))
+            y = int(height // 4 + k * height // 6)
+            cv2.rectangle(frame, (x, y), (x + 60, y + 140), (180, 120 + 40 * k, 90), -1)
+        frames.append(frame)
+    return frames
+
+
+def load_frames(source, count, width, height):
+    """영상 파일을 미리 메모리에 읽어 디코딩 시간을 측정에서 제외"""
+    if source is None:
+        return synthetic_frames(min(count, 120), width, height)
+
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"영상을 읽을 수 없습니다: {source}")
+    return frames
+
+
+def build_runner(scenario, evidence_dir):
+    """시나리오별 프레임 처리 함수(frame -> 표시 프레임)와 추론 엔진 반환"""
+    scenario_dir = os.path.join(ROOT_DIR, SCENARIOS[scenario])
+    # 모델 경로(models/...)가 시나리오 디렉터리 기준 상대 경로
+    os.chdir(scenario_dir)
+    sys.path.insert(0, scenario_dir)
+
+    if scenario == '1':
+        from safewatch.detection import SafetyDetector
+        detector = SafetyDetector(db_connection=None)
+
+        def run(frame):
+            detector.process_detections(frame, save_to_db=False)
+            return frame
+        return run, detector.model
+
+    if scenario == '2':
+        from utils import database
+        database.DB_INSERT_ENABLED = False
+        from utils.detector import SafetyDetector
+        detector = SafetyDetector()
+
+        def run(frame):
+            detector.process_detections(frame)
+            return frame
+        return run, detector.model
+
+    from utils import config, detect, encode, zone
+    detect.async_insert_detection_data = lambda *args, **kwargs: True
+    encode.evidence_store.root_dir = evidence_dir
+    frame_seq = [0]
+
+    def run(frame):
+        # Scenario3/main.py 루프와 같은 처리 순서
+        frame_seq[0] += 1
+        with stage_timer.stage('preprocess'):
+            display_frame = cv2.resize(frame, config.DISPLAY_SIZE)
+        with stage_timer.stage('draw'):
+            zone.annotate_zones(display_frame)
+        results = detect.detect_objects(frame)
+        with stage_timer.stage('draw'):
+            detect.hand_detections(results, display_frame, frame_seq[0], (frame.shape[1], frame.shape[0]))
+        return display_frame
+    return run, detect.model
+
+
+def summarize(values):
+    """초 단위 측정값 -> ms 단위 통계"""
+    values = np.asarray(values) * 1000
+    return {
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+def run_benchmark(run, frames, total, warmup):
+    for i in range(warmup):
+        run(frames[i % len(frames)].copy())
+
+    stage_timer.enabled = True
+    stage_timer.collect()
+    latencies, stage_samples = [], []
+    start = time.perf_counter()
+    for i in range(total):
+        frame = frames[i % len(frames)].copy()
+        frame_start = time.perf_counter()
+        display_frame = run(frame)
+        # 스트리밍/증거 이미지와 같은 JPEG 인코딩 비용
+        with stage_timer.stage('encode'):
+            cv2.imencode('.jpg', display_frame)
+        latencies.append(time.perf_counter() - frame_start)
+        stage_samples.append(stage_timer.collect())
+    elapsed = time.perf_counter() - start
+    stage_timer.enabled = False
+
+    names = list(STAGES) + sorted({name for sample in stage_samples for name in sample} - set(STAGES))
+    stages = {name: summarize([sample.get(name, 0.0) for sample in stage_samples]) for name in names}
+    # 단계로 구분되지 않은 시간 (위험도 판정 등)
+    stages['other'] = summarize([max(latency - sum(sample.values()), 0.0)
+                                 for latency, sample in zip(latencies, stage_samples)])
+    return {
+        'fps': round(total / elapsed, 2),
+        'latency_ms': summarize(latencies),
+        'stages_ms': stages
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_scenario(args):
+    source = os.path.abspath(args.source) if args.source else None
+    frames = load_frames(source, args.frames, args.width, args.height)
+    with tempfile.TemporaryDirectory() as evidence_dir:
+        run, engine = build_runner(args.scenario, evidence_dir)
+        result = run_benchmark(run, frames, args.frames, args.warmup)
+
+    height, width = frames[0].shape[:2]
+    return {
+        'scenario': SCENARIOS[args.scenario],
+        'source': source or 'synthetic',
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'resolution': [width, height],
+        'backend': engine.backend,
+        'device': str(engine.device),
+        'threads': int(os.environ['INFERENCE_THREADS']) if os.getenv('INFERENCE_THREADS') else None,
+        **result
+    }
+
+
+def run_all(args):
+    """시나리오마다 모듈 이름(utils 등)이 겹치므로 별도 프로세스로 실행"""
+    runs = []
+    for scenario in SCENARIOS:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            output = f.name
+        command = [sys.executable, os.path.abspath(__file__), '--scenario', scenario,
+                   '--frames', str(args.frames), '--warmup', str(args.warmup),
+                   '--width', str(args.width), '--height', str(args.height), '--output', output]
+        if args.source:
+            command += ['--source', os.path.abspath(args.source)]
+        try:
+            subprocess.run(command, check=True)
+            with open(output, encoding='utf-8') as f:
+                runs.append(json.load(f))
+        except subprocess.CalledProcessError as e:
+            runs.append({'scenario': SCENARIOS[scenario], 'error': f"exit code {e.returncode}"})
+        finally:
+            os.unlink(output)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SafeWatch 재생 벤치마크")
+    parser.add_argument('--scenario', choices=[*SCENARIOS, 'all'], default='all')
+    parser.add_argument('--source', help="녹화 영상 경로 (없으면 합성 프레임)")
+    parser.add_argument('--frames', type=int, default=300, help="측정 프레임 수")
+    parser.add_argument('--warmup', type=int, default=10, help="측정 전 워밍업 프레임 수")
+    parser.add_argument('--width', type=int, default=640, help="합성 프레임 너비")
+    parser.add_argument('--height', type=int, default=480, help="합성 프레임 높이")
+    parser.add_argument('--backend', help="추론 백엔드 (INFERENCE_BACKEND)")
+    parser.add_argument('--device', help="추론 장치 (INFERENCE_DEVICE)")
+    parser.add_argument('--threads', type=int, help="intra-op 스레드 수 (INFERENCE_THREADS)")
+    parser.add_argument('--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    args = parser.parse_args()
+
+    # 추론 엔진 설정은 환경 변수로 전달 (하위 프로세스에도 적용)
+    for name, value in (('INFERENCE_BACKEND', args.backend), ('INFERENCE_DEVICE', args.device),
+                        ('INFERENCE_THREADS', args.threads)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    output = os.path.abspath(args.output) if args.output != '-' else None
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version()
+        }
+    }
+    if args.scenario == 'all':
+        report['runs'] = run_all(args)
+    else:
+        report.update(benchmark_scenario(args))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output is None:
+        print(text)
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
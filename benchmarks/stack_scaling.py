@@ -0,0 +1,143 @@
+"""Scenario2 박스 적재 분석 규모별 벤치마크
+
+창고 통로처럼 박스가 많은 합성 장면(열마다 여러 층 적재)에서
+기존 경로(check_vertical_stack/check_irregular_stack + 사람 x 박스 check_overlap 반복)와
+적재 인덱스(utils.stack_analysis)의 프레임당 처리 시간을 박스 수별로 비교해 JSON으로 출력한다.
+박스 수마다 seed만 바꾼 장면 --scenes개에서 두 경로의 적재 상태(HIGH/IRREGULAR/SAFE) 일치율과
+불일치 유형(기존 -> 인덱스)별 장면 수도 함께 기록한다 (판정 기준이 다르므로 일치율은 100%가 아님).
+
+예)
+    python benchmarks/stack_scaling.py --boxes 10 100 500 1000 --persons 10
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'Scenario2'))
+
+from utils.detection_utils import check_overlap, check_vertical_stack, check_irregular_stack
+from utils.stack_analysis import analyze_stacks
+
+
+def synthetic_scene(box_count, person_count, height=1080, seed=0):
+    """통로를 따라 열마다 무작위 층수로 쌓인 박스와 통로의 사람 박스 (재현 가능하도록 seed 고정)
+
+    박스가 많을수록 장면이 옆으로 길어진다 (파노라마/광각 통로).
+    """
+    rng = np.random.default_rng(seed)
+    boxes = []
+    x = 0.0
+    while len(boxes) < box_count:
+        box_w, box_h = rng.uniform(40, 70), rng.uniform(30, 50)
+        levels = int(rng.integers(1, 9))
+        for level in range(min(levels, box_count - len(boxes))):
+            shift = rng.uniform(-0.1, 0.1) * box_w
+            y2 = height - level * box_h
+            boxes.append((int(x + shift), int(y2 - box_h), int(x + shift + box_w), int(y2)))
+        x += box_w * rng.uniform(1.1, 1.6)
+    persons = []
+    for _ in range(person_count):
+        px, py = rng.uniform(0, max(x - 120, 1)), rng.uniform(0, height - 300)
+        persons.append((int(px), int(py), int(px + 120), int(py + 300)))
+    return boxes, persons
+
+
+def legacy_status(boxes):
+    detections = {'box': [{'bbox': box} for box in boxes]}
+    if check_vertical_stack(detections):
+        return "HIGH"
+    if check_irregular_stack(detections):
+        return "IRREGULAR"
+    return "SAFE"
+
+
+def legacy_analysis(boxes, persons):
+    near = [any(check_overlap(person, box) for box in boxes) for person in persons]
+    return legacy_status(boxes), near
+
+
+def indexed_analysis(boxes, persons):
+    # 추론 엔진 출력과 같이 NumPy 배열로 전달
+    stacks, status = analyze_stacks(boxes)
+    near, _ = stacks.near(persons)
+    return status, near.tolist()
+
+
+def status_agreement(box_count, person_count, scenes):
+    """seed 0 ~ scenes-1 장면에서 적재 상태 일치율과 불일치 유형별 장면 수 ({'기존->인덱스': 장면 수})"""
+    matches, changes = 0, {}
+    for seed in range(scenes):
+        boxes, _ = synthetic_scene(box_count, person_count, seed=seed)
+        before, after = legacy_status(boxes), analyze_stacks(np.array(boxes))[1]
+        if before == after:
+            matches += 1
+        else:
+            changes[f"{before}->{after}"] = changes.get(f"{before}->{after}", 0) + 1
+    return {'scenes': scenes, 'rate': round(matches / scenes, 3) if scenes else None,
+            'changes': dict(sorted(changes.items()))}
+
+
+def time_per_call(func, *args, repeat=50):
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario2 적재 분석 규모별 벤치마크")
+    parser.add_argument('--boxes', type=int, nargs='+', default=[10, 50, 100, 200, 500, 1000])
+    parser.add_argument('--persons', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--scenes', type=int, default=200, help="적재 상태 일치율을 계산할 장면 수 (박스 수별)")
+    parser.add_argument('--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    args = parser.parse_args()
+
+    runs = []
+    for box_count in args.boxes:
+        boxes, persons = synthetic_scene(box_count, args.persons)
+        box_array, person_array = np.array(boxes), np.array(persons)
+        legacy_ms = time_per_call(legacy_analysis, boxes, persons, repeat=args.repeat)
+        indexed_ms = time_per_call(indexed_analysis, box_array, person_array, repeat=args.repeat)
+        stacks, status = analyze_stacks(box_array)
+        runs.append({
+            'boxes': box_count,
+            'persons': args.persons,
+            'columns': stacks.column_count,
+            'max_height': int(stacks.heights.max()) if stacks.column_count else 0,
+            'status': status,
+            'legacy_status': legacy_status(boxes),
+            'status_agreement': status_agreement(box_count, args.persons, args.scenes),
+            'legacy_ms': round(legacy_ms, 3),
+            'indexed_ms': round(indexed_ms, 3),
+            # 근접 판정은 두 경로가 같은 기준(check_overlap)이어야 함
+            'near_matches': legacy_analysis(boxes, persons)[1] == indexed_analysis(box_array, person_array)[1]
+        })
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version()
+        },
+        'runs': runs
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
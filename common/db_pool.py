@@ -0,0 +1,134 @@
+# common/db_pool.py
+import threading
+import time
+import cx_Oracle
+from common.metrics import DB_RECORDS, DB_WRITE_SECONDS
+
+
+class OracleInsertPool:
+    """세션 풀로 탐지 데이터를 INSERT 하는 공용 모듈 (Scenario2/3 공용)
+
+    INSERT마다 connect/close 하지 않고 세션 풀의 연결을 재사용한다.
+    비동기 저장은 DetectionSpool drainer가 insert_many를 sink로 호출해 처리한다.
+    """
+
+    def __init__(self, user, password, dsn, insert_query, min_sessions=1, max_sessions=4):
+        self.user = user
+        self.password = password
+        self.dsn = dsn
+        self.insert_query = insert_query
+        self.min_sessions = min_sessions
+        self.max_sessions = max_sessions
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+        # 메트릭
+        self.inserted = 0
+        self.failed = 0
+        self.last_latency = None
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def _get_pool(self):
+        """세션 풀은 첫 INSERT 시점에 생성 (DB 없이도 모듈 import 가능)"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = cx_Oracle.SessionPool(
+                    user=self.user, password=self.password, dsn=self.dsn,
+                    min=self.min_sessions, max=self.max_sessions, increment=1,
+                    threaded=True, getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT
+                )
+                print("DB 세션 풀 생성")
+            return self._pool
+
+    def insert(self, params):
+        """세션 풀에서 연결을 빌려 1건 INSERT (동기)"""
+        start = time.perf_counter()
+        pool = connection = cursor = None
+        try:
+            pool = self._get_pool()
+            connection = pool.acquire()
+            cursor = connection.cursor()
+            cursor.execute(self.insert_query, params)
+            connection.commit()
+        except cx_Oracle.DatabaseError:
+            if connection is not None:
+                connection.rollback()
+            with self._lock:
+                self.failed += 1
+            DB_RECORDS.labels('failed').inc()
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None:
+                pool.release(connection)
+
+        latency = time.perf_counter() - start
+        DB_WRITE_SECONDS.observe(latency)
+        DB_RECORDS.labels('inserted').inc()
+        with self._lock:
+            self.inserted += 1
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+
+    def insert_many(self, params_list):
+        """여러 건을 executemany로 한 트랜잭션에 INSERT (동기, 실패 시 전체 롤백 후 예외)"""
+        if not params_list:
+            return
+        start = time.perf_counter()
+        pool = connection = cursor = None
+        try:
+            pool = self._get_pool()
+            connection = pool.acquire()
+            cursor = connection.cursor()
+            cursor.executemany(self.insert_query, params_list)
+            connection.commit()
+        except cx_Oracle.DatabaseError:
+            if connection is not None:
+                connection.rollback()
+            with self._lock:
+                self.failed += len(params_list)
+            DB_RECORDS.labels('failed').inc(len(params_list))
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None:
+                pool.release(connection)
+
+        latency = time.perf_counter() - start
+        DB_WRITE_SECONDS.observe(latency)
+        DB_RECORDS.labels('inserted').inc(len(params_list))
+        with self._lock:
+            self.inserted += len(params_list)
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+
+    def get_metrics(self):
+        """세션 풀 사용률, INSERT 건수와 지연 시간"""
+        pool = self._pool
+        busy = pool.busy if pool is not None else 0
+        with self._lock:
+            completed = self.inserted
+            return {
+                "pool_opened": pool.opened if pool is not None else 0,
+                "pool_busy": busy,
+                "pool_max": self.max_sessions,
+                "pool_utilisation": round(busy / self.max_sessions, 3) if self.max_sessions else 0.0,
+                "inserted": completed,
+                "failed": self.failed,
+                "last_insert_latency_ms": None if self.last_latency is None
+                                          else round(self.last_latency * 1000, 2),
+                "avg_insert_latency_ms": round(self.total_latency / completed * 1000, 2) if completed else None,
+                "max_insert_latency_ms": round(self.max_latency * 1000, 2)
+            }
+
+    def close(self):
+        """세션 풀 종료"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
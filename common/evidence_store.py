@@ -0,0 +1,112 @@
+# common/evidence_store.py
+import hashlib
+import os
+import re
+import tempfile
+import cv2
+
+# 증거 ID: 전체 프레임 JPEG의 sha256 (+ 선택적으로 대상 박스 좌표)
+EVIDENCE_ID_PATTERN = re.compile(r'^[0-9a-f]{64}(\.\d+_\d+_\d+_\d+)?$')
+VARIANTS = ('frame', 'crop', 'thumb')
+
+
+class EvidenceStore:
+    """증거 이미지를 DB BLOB 대신 내용 주소(content-addressed) 디렉터리에 저장하는 저장소
+
+    <root>/<hash[:2]>/<hash>.jpg                 전체 프레임 (같은 내용은 한 번만 저장)
+    <root>/<hash[:2]>/<hash>.<bbox>.crop.jpg     위반 대상(사람/손) 영역 crop
+    <root>/<hash[:2]>/<evidence_id>.thumb.jpg    목록용 썸네일
+
+    DB의 IMAGE_URL 컬럼에는 이미지 대신 증거 ID("<hash>" 또는 "<hash>.<x1>_<y1>_<x2>_<y2>")만 저장한다.
+    """
+
+    def __init__(self, root_dir=None, crop_padding=0.15, thumbnail_size=160):
+        self.root_dir = root_dir or os.getenv("EVIDENCE_DIR", "evidence")
+        self.crop_padding = crop_padding
+        self.thumbnail_size = thumbnail_size
+
+    def save_evidence(self, frame, image_bytes=None, bbox=None):
+        """프레임(과 대상 영역)을 저장하고 증거 ID를 반환"""
+        if image_bytes is None:
+            image_bytes = self._encode(frame)
+        frame_hash = hashlib.sha256(image_bytes).hexdigest()
+        self._write_once(self._path(frame_hash, 'frame'), image_bytes)
+
+        evidence_id = frame_hash
+        focus = frame
+        if bbox is not None:
+            x1, y1, x2, y2 = self._padded_bbox(frame, bbox)
+            if x2 > x1 and y2 > y1:
+                evidence_id = f"{frame_hash}.{x1}_{y1}_{x2}_{y2}"
+                focus = frame[y1:y2, x1:x2]
+                crop_path = self._path(evidence_id, 'crop')
+                if not os.path.exists(crop_path):
+                    self._write_once(crop_path, self._encode(focus))
+
+        thumb_path = self._path(evidence_id, 'thumb')
+        if not os.path.exists(thumb_path):
+            self._write_once(thumb_path, self._encode(self._thumbnail(focus), quality=80))
+        return evidence_id
+
+    def path_for(self, evidence_id, variant='frame'):
+        """저장된 증거 이미지 경로 (잘못된 ID/없는 파일이면 None)"""
+        if not EVIDENCE_ID_PATTERN.match(evidence_id or '') or variant not in VARIANTS:
+            return None
+        if variant == 'crop' and '.' not in evidence_id:
+            variant = 'frame'
+        path = self._path(evidence_id, variant)
+        return path if os.path.exists(path) else None
+
+    def _path(self, evidence_id, variant):
+        frame_hash = evidence_id.split('.', 1)[0]
+        directory = os.path.join(self.root_dir, frame_hash[:2])
+        if variant == 'frame':
+            return os.path.join(directory, f"{frame_hash}.jpg")
+        return os.path.join(directory, f"{evidence_id}.{variant}.jpg")
+
+    def _padded_bbox(self, frame, bbox):
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        pad_x = int((x2 - x1) * self.crop_padding)
+        pad_y = int((y2 - y1) * self.crop_padding)
+        return (max(x1 - pad_x, 0), max(y1 - pad_y, 0),
+                min(x2 + pad_x, width), min(y2 + pad_y, height))
+
+    def _thumbnail(self, image):
+        height, width = image.shape[:2]
+        scale = self.thumbnail_size / max(height, width)
+        if scale >= 1:
+            return image
+        return cv2.resize(image, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _encode(image, quality=95):
+        success, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not success:
+            raise ValueError("이미지 인코딩 실패")
+        return buffer.tobytes()
+
+    @staticmethod
+    def _write_once(path, data):
+        """같은 내용의 파일이 이미 있으면 건너뛰고, 없으면 임시 파일에 쓴 뒤 원자적으로 교체"""
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # 스레드/프로세스마다 다른 임시 파일 (같은 증거를 동시에 저장해도 서로의 파일을 덮어쓰지 않음)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # mkstemp는 0600으로 만들므로 일반 파일과 같은 권한으로
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+# 증거 이미지 응답용 캐시 헤더 (내용 주소 기반이라 변경되지 않음)
+EVIDENCE_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
@@ -0,0 +1,276 @@
+# common/inference.py
+import ast
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from common.profiling import stage_timer
+
+BACKENDS = ('ultralytics', 'onnxruntime', 'openvino')
+
+
+class Detections:
+    """한 프레임의 탐지 결과 - 백엔드와 관계없이 xyxy(N,4)/cls(N,)/conf(N,) numpy 배열"""
+
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.asarray(cls).reshape(-1).astype(int)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0))
+
+    def __len__(self):
+        return len(self.conf)
+
+
+def to_numpy(value):
+    """torch 텐서/numpy 배열을 numpy 배열로 변환"""
+    if hasattr(value, 'cpu'):
+        value = value.cpu()
+    if hasattr(value, 'numpy'):
+        return value.numpy()
+    return np.asarray(value)
+
+
+def select_device(preferred=None):
+    """지정한 장치가 없으면 CUDA 사용 가능 여부로 선택 (불가능하면 CPU)"""
+    if preferred:
+        return preferred
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return 'cuda:0'
+    except ImportError:
+        pass
+    return 'cpu'
+
+
+class UltralyticsEngine:
+    """ultralytics YOLO(.pt) 추론 - GPU 실패 시 CPU로 전환"""
+
+    backend = 'ultralytics'
+
+    def __init__(self, model_path, device=None, threads=None, conf=0.25, iou=0.45, imgsz=640):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.device = select_device(device)
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.names = self.model.names
+        if threads:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
+
+    def __call__(self, source, conf=None, iou=None):
+        frames = source if isinstance(source, list) else [source]
+        start = time.perf_counter()
+        try:
+            results = self._predict(frames, conf, iou)
+        except Exception as e:
+            if self.device == 'cpu':
+                raise
+            print(f"{self.device} 추론 실패, CPU로 전환: {e}")
+            self.device = 'cpu'
+            results = self._predict(frames, conf, iou)
+        self._record_speed(results, time.perf_counter() - start)
+        with stage_timer.stage('postprocess'):
+            return [Detections(to_numpy(r.boxes.xyxy), to_numpy(r.boxes.cls), to_numpy(r.boxes.conf))
+                    for r in results]
+
+    @staticmethod
+    def _record_speed(results, elapsed):
+        """ultralytics가 측정한 단계별 시간(ms)을 기록 (없으면 전체를 model로 기록)"""
+        speeds = [getattr(r, 'speed', None) for r in results]
+        if not speeds or not all(speeds):
+            stage_timer.add('model', elapsed)
+            return
+        for key, stage in (('preprocess', 'preprocess'), ('inference', 'model'),
+                           ('postprocess', 'postprocess')):
+            stage_timer.add(stage, sum(speed.get(key) or 0.0 for speed in speeds) / 1000)
+
+    def _predict(self, frames, conf, iou):
+        return self.model(frames, conf=conf or self.conf, iou=iou or self.iou,
+                          imgsz=self.imgsz, device=self.device, verbose=False)
+
+
+class ExportedGraphEngine:
+    """ultralytics로 export한 YOLOv8 그래프(출력 (B, 4+클래스 수, N)) 공통 전처리/후처리
+
+    하위 클래스는 _forward(batch) 에서 (B, 4+nc, N) 배열을 반환한다.
+    """
+
+    backend = None
+
+    def __init__(self, conf=0.25, iou=0.45, imgsz=640, names=None, dynamic_batch=False):
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.names = names or {}
+        self.dynamic_batch = dynamic_batch
+
+    def __call__(self, source, conf=None, iou=None):
+        frames = source if isinstance(source, list) else [source]
+        if not frames:
+            return []
+        with stage_timer.stage('preprocess'):
+            blobs, metas = zip(*(self._letterbox(frame) for frame in frames))
+        with stage_timer.stage('model'):
+            if self.dynamic_batch:
+                outputs = self._forward(np.stack(blobs))
+            else:
+                # 배치 크기가 1로 고정된 그래프는 프레임별로 실행
+                outputs = np.concatenate([self._forward(blob[None]) for blob in blobs])
+        with stage_timer.stage('postprocess'):
+            return [self._postprocess(output, meta, conf or self.conf, iou or self.iou)
+                    for output, meta in zip(outputs, metas)]
+
+    def _forward(self, batch):
+        raise NotImplementedError
+
+    def _letterbox(self, frame):
+        """비율을 유지하며 imgsz 정사각형으로 맞추고 NCHW float(0~1) RGB로 변환"""
+        height, width = frame.shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        new_w, new_h = round(width * scale), round(height * scale)
+        left, top = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        canvas[top:top + new_h, left:left + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+        return np.ascontiguousarray(blob), (scale, left, top, width, height)
+
+    def _postprocess(self, output, meta, conf, iou):
+        scale, left, top, width, height = meta
+        preds = output.T  # (N, 4+nc)
+        scores = preds[:, 4:]
+        cls = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(cls)), cls]
+        keep = confidence >= conf
+        if not keep.any():
+            return Detections.empty()
+
+        boxes, cls, confidence = preds[keep, :4], cls[keep], confidence[keep]
+        # (cx, cy, w, h) -> (x, y, w, h) 후 클래스별 NMS
+        xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2,
+                                boxes[:, 2], boxes[:, 3]])
+        indices = np.asarray(cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), confidence.tolist(), cls.tolist(), conf, iou), dtype=int).reshape(-1)
+
+        xyxy = np.column_stack([xywh[indices, 0], xywh[indices, 1],
+                                xywh[indices, 0] + xywh[indices, 2],
+                                xywh[indices, 1] + xywh[indices, 3]])
+        # letterbox 여백 제거 후 원본 해상도로 복원
+        xyxy = (xyxy - [left, top, left, top]) / scale
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+        return Detections(xyxy, cls[indices], confidence[indices])
+
+
+class OnnxRuntimeEngine(ExportedGraphEngine):
+    """ONNX Runtime 추론 - CUDA provider가 없으면 CPU provider 사용"""
+
+    backend = 'onnxruntime'
+
+    def __init__(self, model_path, device=None, threads=None, conf=0.25, iou=0.45, imgsz=640):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        providers = ['CPUExecutionProvider']
+        if select_device(device).startswith('cuda') and \
+                'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+        self.session = ort.InferenceSession(model_path, options, providers=providers)
+        self.device = 'cuda' if self.session.get_providers()[0] == 'CUDAExecutionProvider' else 'cpu'
+        self.input_name = self.session.get_inputs()[0].name
+
+        shape = self.session.get_inputs()[0].shape
+        names = self.session.get_modelmeta().custom_metadata_map.get('names')
+        super().__init__(conf, iou,
+                         imgsz=shape[2] if isinstance(shape[2], int) else imgsz,
+                         names=ast.literal_eval(names) if names else None,
+                         dynamic_batch=not isinstance(shape[0], int))
+
+    def _forward(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINOEngine(ExportedGraphEngine):
+    """OpenVINO 추론 (export 디렉터리 또는 .xml/.onnx 파일)"""
+
+    backend = 'openvino'
+
+    def __init__(self, model_path, device=None, threads=None, conf=0.25, iou=0.45, imgsz=640):
+        import openvino as ov
+        names = None
+        if os.path.isdir(model_path):
+            names = _read_metadata_names(os.path.join(model_path, 'metadata.yaml'))
+            model_path = glob.glob(os.path.join(model_path, '*.xml'))[0]
+
+        core = ov.Core()
+        self.device = 'CPU' if not device or device == 'cpu' else device.upper()
+        config = {'INFERENCE_NUM_THREADS': threads} if threads else {}
+        model = core.read_model(model_path)
+        self.compiled = core.compile_model(model, self.device, config)
+        self.output = self.compiled.output(0)
+
+        shape = model.input(0).get_partial_shape()
+        super().__init__(conf, iou,
+                         imgsz=shape[2].get_length() if shape[2].is_static else imgsz,
+                         names=names, dynamic_batch=shape[0].is_dynamic)
+
+    def _forward(self, batch):
+        return self.compiled([batch])[self.output]
+
+
+def _read_metadata_names(path):
+    """ultralytics export의 metadata.yaml 에서 클래스 이름 읽기"""
+    try:
+        import yaml
+        with open(path, encoding='utf-8') as f:
+            return yaml.safe_load(f).get('names')
+    except (ImportError, OSError):
+        return None
+
+
+def _exported_path(model_path, backend):
+    """.pt 경로를 ultralytics export 결과 경로로 변환 (best.pt -> best.onnx / best_openvino_model)"""
+    stem, ext = os.path.splitext(model_path)
+    if ext != '.pt':
+        return model_path
+    return f"{stem}.onnx" if backend == 'onnxruntime' else f"{stem}_openvino_model"
+
+
+def create_engine(model_path, backend=None, device=None, threads=None, **kwargs):
+    """추론 엔진 생성
+
+    backend: ultralytics / onnxruntime / openvino / auto (기본: INFERENCE_BACKEND 환경 변수, 없으면 auto)
+    device: cpu / cuda:0 등 (기본: INFERENCE_DEVICE, 없으면 자동 선택)
+    threads: intra-op 스레드 수 (기본: INFERENCE_THREADS)
+    선택한 런타임이 설치되어 있지 않으면 ultralytics(.pt)로 대체한다.
+    """
+    backend = backend or os.getenv("INFERENCE_BACKEND", "auto")
+    device = device or os.getenv("INFERENCE_DEVICE") or None
+    threads = threads or int(os.getenv("INFERENCE_THREADS", "0")) or None
+
+    if backend == 'auto':
+        ext = os.path.splitext(model_path)[1]
+        backend = 'onnxruntime' if ext == '.onnx' else 'openvino' if ext == '.xml' else 'ultralytics'
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 추론 백엔드: {backend}")
+
+    if backend != 'ultralytics':
+        engine_class = OnnxRuntimeEngine if backend == 'onnxruntime' else OpenVINOEngine
+        try:
+            return engine_class(_exported_path(model_path, backend), device, threads, **kwargs)
+        except ImportError as e:
+            print(f"{backend} 런타임을 사용할 수 없어 ultralytics로 대체: {e}")
+    return UltralyticsEngine(model_path, device, threads, **kwargs)
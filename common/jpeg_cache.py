@@ -0,0 +1,103 @@
+# common/jpeg_cache.py
+import threading
+from collections import OrderedDict
+import cv2
+from common.profiling import stage_timer
+
+
+class EncodedFrameCache:
+    """(프레임 키, JPEG 품질) 별로 인코딩 결과를 보관하는 LRU 캐시
+
+    스트리밍, DB 증거 이미지, 스냅샷이 같은 프레임을 요청해도
+    프레임/품질 조합당 cv2.imencode는 최대 한 번만 수행된다.
+    프레임 키는 프레임 시퀀스 번호처럼 프레임 내용을 식별하는 hashable 값이어야 한다.
+    """
+
+    def __init__(self, max_entries=64, default_quality=95):
+        self.max_entries = max_entries
+        self.default_quality = default_quality
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.encodes = 0
+
+    def get(self, frame_key, quality=None):
+        """이미 인코딩된 바이트가 있으면 반환 (없으면 None)"""
+        key = (frame_key, quality or self.default_quality)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def put(self, frame_key, data, quality=None):
+        """다른 곳(작업 프로세스 등)에서 이미 인코딩한 바이트를 캐시에 추가"""
+        key = (frame_key, quality or self.default_quality)
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def encode(self, frame_key, frame, quality=None):
+        """캐시에 있으면 재사용하고, 없으면 한 번만 인코딩해서 저장
+
+        frame_key가 None이면 프레임을 식별할 수 없으므로 캐시를 거치지 않고 바로 인코딩한다
+        (키가 None인 서로 다른 프레임이 같은 캐시 항목을 돌려받지 않도록).
+        """
+        quality = quality or self.default_quality
+        if frame_key is None:
+            with self._lock:
+                self.encodes += 1
+            return self._imencode(frame, quality)
+        key = (frame_key, quality)
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            # 같은 프레임을 다른 스레드가 인코딩 중이면 끝날 때까지 기다림
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = threading.Event()
+
+        if not owner:
+            pending.wait()
+            with self._lock:
+                data = self._entries.get(key)
+                if data is not None:
+                    self.hits += 1
+                    return data
+            # 기다리는 사이 캐시에서 밀려난 경우에만 다시 인코딩
+            return self._imencode(frame, quality)
+
+        try:
+            data = self._imencode(frame, quality)
+            with self._lock:
+                self.encodes += 1
+                if data is not None:
+                    self._entries[key] = data
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set()
+
+    @staticmethod
+    def _imencode(frame, quality):
+        with stage_timer.stage('encode'):
+            success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        if not success:
+            return None
+        return buffer.tobytes()
+
+    def get_stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "encodes": self.encodes}
@@ -0,0 +1,165 @@
+# common/keyframe.py
+import math
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+
+class KeyframeSchedule:
+    """키프레임(전체 추론) 간격 K를 측정한 추론 지연에 맞춰 자동으로 조정
+
+    K = ceil(추론 지연 / (budget x 캡처 프레임 간격)) - 추론이 벽시계 시간의 budget 비율만 쓰도록 함
+    (budget 1.0: 추론이 끝나는 대로 다음 키프레임). 키프레임 사이가 max_seconds를 넘지 않도록
+    K 상한을 두어 추적 오차가 오래 쌓이지 않게 한다. 지연/프레임 간격은 지수 이동 평균(alpha).
+    """
+
+    def __init__(self, budget=0.5, min_k=1, max_k=30, max_seconds=1.0, alpha=0.2, gauge=None):
+        self.budget = budget
+        self.min_k = min_k
+        self.max_k = max_k
+        self.max_seconds = max_seconds
+        self.alpha = alpha
+        self.gauge = gauge
+        self.k = min_k
+        self.latency = None
+        self.frame_interval = None
+        self.last_tick_at = None
+        self.last_keyframe_seq = None
+        self.last_keyframe_at = None
+        self.keyframes = 0
+
+    def _average(self, current, value):
+        return value if current is None else current + self.alpha * (value - current)
+
+    def tick(self, now=None):
+        """캡처 프레임마다 호출 - 프레임 간격 측정"""
+        now = time.monotonic() if now is None else now
+        if self.last_tick_at is not None and now > self.last_tick_at:
+            self.frame_interval = self._average(self.frame_interval, now - self.last_tick_at)
+            self._update()
+        self.last_tick_at = now
+
+    def observe(self, latency):
+        """키프레임 추론 지연(초) 기록 후 K 재계산"""
+        self.latency = self._average(self.latency, latency)
+        self._update()
+
+    def _update(self):
+        if self.latency is None or not self.frame_interval:
+            return
+        # 부동소수점 오차로 한 프레임 더 올라가지 않도록 반올림 후 올림
+        k = math.ceil(round(self.latency / (self.budget * self.frame_interval), 6))
+        k = min(k, max(int(self.max_seconds / self.frame_interval), 1))
+        self.k = min(max(k, self.min_k), self.max_k)
+        if self.gauge is not None:
+            self.gauge.set(self.k)
+
+    def due(self, seq, now=None) -> bool:
+        """seq 프레임에서 전체 추론이 필요한지 (K 프레임이 지났거나 max_seconds가 지남)"""
+        if self.last_keyframe_seq is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return seq - self.last_keyframe_seq >= self.k or now - self.last_keyframe_at >= self.max_seconds
+
+    def mark(self, seq, now=None):
+        self.last_keyframe_seq = seq
+        self.last_keyframe_at = time.monotonic() if now is None else now
+        self.keyframes += 1
+
+    def stats(self) -> dict:
+        return {
+            'k': self.k,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'capture_fps': round(1 / self.frame_interval, 1) if self.frame_interval else None,
+            'keyframes': self.keyframes
+        }
+
+
+class BoxPropagator:
+    """키프레임 사이의 박스를 희소 광학 흐름(Lucas-Kanade)으로 현재 프레임까지 옮기는 가벼운 추적기
+
+    push(seq, frame): 프레임마다(캡처 속도) 축소 흑백 영상을 기록하고 박스를 직전 프레임에서 현재 프레임으로 이동
+    reseed(seq, boxes, payload): 키프레임 추론 결과(seq 프레임 기준 박스)로 다시 시작 - 추론이 끝났을 때 이미
+    지나간 프레임이어도 기록해 둔 seq 프레임 영상에서 다음 프레임으로 바로 흐름을 계산한다.
+    박스마다 특징점 이동량의 중앙값으로 위치를, 특징점 퍼짐 비율로 크기를 옮긴다 (특징점을 놓치면 제자리).
+    payload는 박스와 같은 순서의 부가 정보(탐지 결과 등)로, 박스와 함께 원자적으로 교체/반환된다.
+    """
+
+    def __init__(self, width=320, history=64, max_points=24, min_points=3):
+        self.width = width
+        self.max_points = max_points
+        self.min_points = min_points
+        self.history = deque(maxlen=history)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.payload = None
+        self.anchor = None
+        self.scale = 1.0
+        self.lock = threading.Lock()
+
+    def _gray(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(self.width / width, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame, scale
+
+    def push(self, seq, frame) -> tuple:
+        """프레임 기록 + 박스 이동 -> (원본 좌표 박스 (N,4), payload)"""
+        gray, scale = self._gray(frame)
+        with self.lock:
+            self.history.append((seq, gray))
+            if self.anchor is not None and len(self.boxes) and self.anchor.shape == gray.shape:
+                self.boxes = self._flow(self.anchor, gray, self.boxes * scale) / scale
+            self.anchor = gray
+            self.scale = scale
+            return self.boxes.copy(), self.payload
+
+    def reseed(self, seq, boxes, payload=None):
+        """seq 프레임의 탐지 결과로 추적 재시작 (seq 영상이 기록에 없으면 다음 프레임부터 제자리에서 시작)"""
+        with self.lock:
+            self.anchor = next((gray for history_seq, gray in self.history if history_seq == seq), None)
+            self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+            self.payload = payload
+
+    def _flow(self, prev, current, boxes):
+        """축소 좌표 박스(N,4)를 prev -> current 영상으로 이동"""
+        height, width = prev.shape
+        points, owners = [], []
+        for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+            ix1, iy1 = max(int(x1), 0), max(int(y1), 0)
+            ix2, iy2 = min(int(math.ceil(x2)), width), min(int(math.ceil(y2)), height)
+            if ix2 - ix1 < 4 or iy2 - iy1 < 4:
+                continue
+            corners = cv2.goodFeaturesToTrack(prev[iy1:iy2, ix1:ix2], self.max_points, 0.01, 3)
+            if corners is None or len(corners) < self.min_points:
+                continue
+            points.append(corners.reshape(-1, 2) + (ix1, iy1))
+            owners.append(np.full(len(corners), i))
+        if not points:
+            return boxes
+
+        # 모든 박스의 특징점을 한 번의 피라미드 LK 호출로 추적
+        points = np.concatenate(points).astype(np.float32)
+        owners = np.concatenate(owners)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, current, points.reshape(-1, 1, 2), None,
+                                                    winSize=(15, 15), maxLevel=3)
+        moved = moved.reshape(-1, 2)
+        tracked = status.reshape(-1) == 1
+
+        boxes = boxes.copy()
+        for i in np.unique(owners).tolist():
+            mask = tracked & (owners == i)
+            if np.count_nonzero(mask) < self.min_points:
+                continue
+            before, after = points[mask], moved[mask]
+            shift = np.median(after - before, axis=0)
+            spread_before = np.median(np.linalg.norm(before - np.median(before, axis=0), axis=1))
+            spread_after = np.median(np.linalg.norm(after - np.median(after, axis=0), axis=1))
+            ratio = float(np.clip(spread_after / spread_before, 0.8, 1.25)) if spread_before > 0 else 1.0
+            x1, y1, x2, y2 = boxes[i]
+            cx, cy = (x1 + x2) / 2 + shift[0], (y1 + y2) / 2 + shift[1]
+            half_w, half_h = (x2 - x1) / 2 * ratio, (y2 - y1) / 2 * ratio
+            boxes[i] = (cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+        return boxes
@@ -0,0 +1,289 @@
+# common/metrics.py
+import bisect
+import threading
+import time
+from common.profiling import stage_timer
+
+# 지연 시간 히스토그램 기본 구간(초) - 1ms ~ 5s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """라벨 값별 하위 지표 (한 번 만든 객체는 캐시하므로 핫 패스에서 미리 받아 두고 사용)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        """라벨이 없는 지표의 기본 하위 지표"""
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """(suffix, 라벨 값, 추가 라벨, 값) 목록"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} "
+                         f"{_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class _Value:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    """증가만 하는 지표 - 이름은 _total 없이 지정 (노출 시 _total 접미사가 붙음)"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def _samples(self):
+        return [('_total', key, (), child.value) for key, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    """값을 직접 설정하거나, set_function()으로 수집 시점에 값을 계산하는 지표"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        """function() -> 값 (라벨 없음) 또는 {라벨 값 튜플: 값}"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is None:
+            return [('', key, (), child.value) for key, child in list(self._children.items())]
+        try:
+            result = self._function()
+        except Exception:
+            return []
+        if isinstance(result, dict):
+            return [('', tuple(str(v) for v in key), (), value) for key, value in result.items()]
+        return [('', (), (), result)]
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def _samples(self):
+        samples = []
+        for key, child in list(self._children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Prometheus 텍스트 형식(0.0.4)으로 노출하는 지표 모음 (같은 이름은 같은 지표를 반환)"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+class RateMeter:
+    """tick() 횟수로 최근 window초 동안의 초당 발생률을 게이지에 기록 (캡처 FPS 등)"""
+
+    def __init__(self, gauge, window=1.0):
+        self.gauge = gauge
+        self.window = window
+        self._count = 0
+        self._started_at = time.monotonic()
+
+    def tick(self):
+        self._count += 1
+        now = time.monotonic()
+        elapsed = now - self._started_at
+        if elapsed >= self.window:
+            self.gauge.set(self._count / elapsed)
+            self._count = 0
+            self._started_at = now
+
+
+# 프로세스 공용 지표 모음 (Scenario1/2 앱이 같은 이름으로 노출)
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'safewatch_stage_seconds',
+    "Per-frame processing time by stage (preprocess/model/postprocess/draw/encode/persist)",
+    ['stage'])
+INFERENCE_SECONDS = registry.histogram(
+    'safewatch_inference_seconds', "Model call latency (one forward pass over a frame or a batch)")
+FRAME_LATENCY_SECONDS = registry.histogram(
+    'safewatch_frame_latency_seconds',
+    "Per-frame latency from pipeline intake to published output (queueing, inference, drawing, encoding)")
+FRAMES_CAPTURED = registry.counter(
+    'safewatch_frames_captured', "Frames read from the camera", ['camera'])
+CAPTURE_FPS = registry.gauge(
+    'safewatch_capture_fps', "Camera capture rate over the last second", ['camera'])
+FRAMES_DROPPED = registry.counter(
+    'safewatch_frames_dropped', "Frames replaced or discarded before a consumer read them",
+    ['camera', 'stream'])
+STREAM_CLIENTS = registry.gauge(
+    'safewatch_stream_clients', "Connected MJPEG stream clients", ['camera', 'stream'])
+DETECTIONS = registry.counter(
+    'safewatch_detections', "Detection results by risk level", ['risk_level'])
+DB_WRITE_SECONDS = registry.histogram(
+    'safewatch_db_write_seconds', "Latency of one DB insert (or one batched insert)")
+DB_QUEUE_DEPTH = registry.gauge(
+    'safewatch_db_queue_depth', "Detection records waiting to be written to the DB", ['spool'])
+DB_RECORDS = registry.counter(
+    'safewatch_db_records', "Detection records by DB write result (inserted/failed/rejected)",
+    ['result'])
+PIPELINE_OCCUPANCY = registry.gauge(
+    'safewatch_pipeline_occupancy', "Fraction of time a pipeline stage's workers were busy (0-1, per worker)",
+    ['stage'])
+PIPELINE_QUEUE_DEPTH = registry.gauge(
+    'safewatch_pipeline_queue_depth', "Jobs waiting in a pipeline stage's input queue", ['stage'])
+SPOOL_PENDING = registry.gauge(
+    'safewatch_spool_pending', "Detection events in the local spool not yet stored in the DB", ['spool'])
+SPOOL_LAG = registry.gauge(
+    'safewatch_spool_lag_seconds', "Age of the oldest undrained spool event (drain lag)", ['spool'])
+SPOOL_EVENTS = registry.counter(
+    'safewatch_spool_events', "Spool events by result (spooled/drained/retried/dead/rejected)",
+    ['spool', 'result'])
+KEYFRAME_INTERVAL = registry.gauge(
+    'safewatch_keyframe_interval', "Frames between full detections in keyframe mode (adaptive K)", ['camera'])
+FRAMES_TRACKED = registry.counter(
+    'safewatch_frames_tracked', "Stream frames annotated with tracker-propagated boxes instead of a detection",
+    ['camera'])
+DETECTION_REQUESTS = registry.counter(
+    'safewatch_detection_requests', "Polled detection requests by how they were served (cached/joined/inferred)",
+    ['camera', 'served'])
+
+
+def _observe_stage(name, seconds):
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+
+def enable_stage_metrics():
+    """StageTimer의 단계별 시간을 safewatch_stage_seconds 히스토그램으로 기록"""
+    if _observe_stage not in stage_timer.observers:
+        stage_timer.observers.append(_observe_stage)
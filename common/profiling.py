@@ -0,0 +1,52 @@
+# common/profiling.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """프레임 처리 단계(preprocess/model/postprocess/draw/encode)별 소요 시간 측정
+
+    벤치마크에서 enabled=True 로 켜면 스레드별로 누적되고 collect()로 꺼내면서 초기화된다.
+    observers(이름, 초)가 등록되어 있으면 매 측정값을 전달한다 (/metrics 히스토그램).
+    둘 다 없으면 시간 측정 없이 통과한다.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.observers = []
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled and not self.observers:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        for observer in self.observers:
+            observer(name, seconds)
+        if not self.enabled:
+            return
+        stages = self._stages()
+        stages[name] = stages.get(name, 0.0) + seconds
+
+    def collect(self):
+        """현재 스레드에서 누적된 단계별 시간(초)을 반환하고 초기화"""
+        stages = self._stages()
+        self._local.stages = {}
+        return stages
+
+    def _stages(self):
+        if not hasattr(self._local, 'stages'):
+            self._local.stages = {}
+        return self._local.stages
+
+
+# 추론 엔진과 각 시나리오 탐지기가 공유하는 타이머
+stage_timer = StageTimer()
@@ -0,0 +1,380 @@
+# common/spool.py
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from common.metrics import DB_QUEUE_DEPTH, DB_RECORDS, DB_WRITE_SECONDS, SPOOL_EVENTS, SPOOL_LAG, SPOOL_PENDING
+
+
+def _encode_value(value):
+    """JSON으로 표현할 수 없는 값(datetime, bytes)을 태그를 붙여 변환"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"spool에 저장할 수 없는 값: {type(value).__name__}")
+
+
+def _decode_value(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+# 연결/네트워크 장애 - DB가 돌아오면 성공하므로 횟수 제한 없이 재시도 (DB-API 예외 클래스 이름 기준)
+TRANSIENT_ERRORS = {'OperationalError', 'InterfaceError'}
+# 데이터/SQL 자체가 잘못된 경우 - 몇 번을 다시 시도해도 실패하므로 바로 dead 테이블로
+PERMANENT_ERRORS = {'DatabaseError', 'DataError', 'IntegrityError', 'ProgrammingError', 'NotSupportedError'}
+# cx_Oracle이 DatabaseError로 올려 보내는 연결 끊김/인스턴스 중지 오류 (ORA-xxxxx)
+TRANSIENT_ORACLE_CODES = {1012, 1033, 1034, 1089, 3113, 3114, 3135, 12170, 12514, 12528, 12537, 12541, 12543, 12571, 28547}
+
+
+def classify_error(error) -> str:
+    """sink 예외 분류 - 'transient'(계속 재시도), 'permanent'(바로 dead), 'unknown'(max_attempts까지 재시도)"""
+    if isinstance(error, OSError):
+        return 'transient'
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & TRANSIENT_ERRORS:
+        return 'transient'
+    code = getattr(error.args[0], 'code', None) if error.args else None
+    if code in TRANSIENT_ORACLE_CODES:
+        return 'transient'
+    if names & PERMANENT_ERRORS:
+        return 'permanent'
+    return 'unknown'
+
+
+# 프로세스 안에서 열려 있는 spool (이름별) - DB 쓰기 대기열 지표를 spool마다 따로 노출
+_spools = {}
+_spools_lock = threading.Lock()
+
+
+def _queue_depths():
+    with _spools_lock:
+        spools = list(_spools.items())
+    return {(name,): spool.pending for name, spool in spools}
+
+
+DB_QUEUE_DEPTH.set_function(_queue_depths)
+
+
+def spool_path(name):
+    """시나리오별 spool 파일 경로 - SPOOL_DIR(기본 spool) 아래 <name>.db (시나리오끼리 파일을 공유하지 않음)"""
+    return os.path.join(os.getenv("SPOOL_DIR", "spool"), f"{name}.db")
+
+
+class ReconnectingSink:
+    """spool drainer용 sink - DB 객체(insert_detections/close)를 처음 저장할 때 연결하고,
+    저장에 실패하면 연결을 버려 다음 재시도에서 다시 연결한다 (시작 시 DB가 내려가 있어도 됨)
+    배치 INSERT 지연과 결과 건수를 DB 쓰기 지표(DB_WRITE_SECONDS/DB_RECORDS)로 기록한다.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.db = None
+
+    def __call__(self, records):
+        try:
+            if self.db is None:
+                self.db = self.connect()
+            start = time.perf_counter()
+            self.db.insert_detections(records)
+        except Exception:
+            DB_RECORDS.labels('failed').inc(len(records))
+            self.close()
+            raise
+        DB_WRITE_SECONDS.observe(time.perf_counter() - start)
+        DB_RECORDS.labels('inserted').inc(len(records))
+
+    def close(self):
+        if self.db is not None:
+            try:
+                self.db.close()
+            except Exception:
+                pass
+            self.db = None
+
+
+class DetectionSpool:
+    """탐지 이벤트를 먼저 로컬 SQLite 저널에 기록하고 백그라운드에서 DB로 옮기는 write-ahead spool
+
+    - append(): 디스크에 커밋만 하고 바로 반환 (추론 루프가 네트워크/DB를 기다리지 않음)
+    - drainer 스레드: 가장 오래된 이벤트부터 batch_size개씩 sink(records)로 저장하고, 성공한 이벤트만 삭제
+      실패하면 같은 배치를 지수 백오프(retry_delay ~ max_retry_delay)로 다시 시도하므로 순서가 유지된다.
+    - 프로세스가 죽거나 DB가 내려가도 이벤트는 파일에 남고, 다음 시작 시 이어서 저장된다.
+    - spool에 max_pending개 이상 쌓이면 append가 put_timeout까지 자리가 나기를 기다린 뒤 거부한다
+      (backpressure - DB 장애가 길어져도 디스크를 끝없이 채우지 않음).
+    - 실패한 이벤트는 classify_error로 나눠 처리한다: 연결 장애는 DB가 돌아올 때까지 계속 재시도하고,
+      데이터 오류(IntegrityError 등)는 바로, 그 밖의 오류는 단독으로 max_attempts번 실패하면
+      dead 테이블로 옮겨 뒤의 이벤트를 막지 않는다 (max_attempts=None이면 무제한).
+    """
+
+    def __init__(self, path, sink, name="detections", batch_size=32, retry_delay=1.0,
+                 max_retry_delay=60.0, max_attempts=10, poll_interval=1.0, max_pending=100000,
+                 put_timeout=0.5):
+        self.path = path
+        self.sink = sink
+        self.name = name
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # append(호출 스레드)와 drainer가 함께 사용하므로 스레드 검사 해제 후 lock으로 보호
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            # 커밋마다 fsync - 전원이 나가도 append가 반환된 이벤트는 남음
+            self.connection.execute("PRAGMA synchronous=FULL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS spool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    record TEXT NOT NULL
+                )
+            """)
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS dead (
+                    id INTEGER PRIMARY KEY,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    error TEXT
+                )
+            """)
+            self.connection.commit()
+            # 이전 실행에서 남은 이벤트 포함 - append마다 COUNT(*)를 하지 않도록 메모리에서 관리
+            self.pending = self.connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        # drainer가 이벤트를 지우면 자리를 기다리는 append를 깨움
+        self._space = threading.Condition()
+
+        # 통계
+        self.spooled = 0
+        self.drained = 0
+        self.retries = 0
+        self.rejected = 0
+        self.batches = 0
+        self.last_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.last_error = None
+        self.last_drained_at = None
+        self.failing = False
+        self._pending_gauge = SPOOL_PENDING.labels(name)
+        self._lag_gauge = SPOOL_LAG.labels(name)
+        # DB 쓰기 대기열 = 아직 저장되지 않은 spool 이벤트 (DB_QUEUE_DEPTH{spool=name})
+        with _spools_lock:
+            _spools[name] = self
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"spool-{name}", daemon=True)
+        self.thread.start()
+
+    def append(self, record: dict) -> bool:
+        """이벤트를 디스크에 기록 (실패 시 False - spool이 가득 찼거나 디스크 오류)"""
+        with self._space:
+            if not self._space.wait_for(lambda: self.pending < self.max_pending, timeout=self.put_timeout):
+                self._reject(f"spool is full ({self.pending} events pending)")
+                return False
+        try:
+            data = json.dumps(record, default=_encode_value, ensure_ascii=False)
+            with self.lock:
+                self.connection.execute("INSERT INTO spool (enqueued_at, record) VALUES (?, ?)",
+                                        (time.time(), data))
+                self.connection.commit()
+                self.pending += 1
+        except Exception as e:
+            self._reject(e)
+            return False
+        self.spooled += 1
+        SPOOL_EVENTS.labels(self.name, 'spooled').inc()
+        self._wake.set()
+        return True
+
+    def _reject(self, reason):
+        self.rejected += 1
+        SPOOL_EVENTS.labels(self.name, 'rejected').inc()
+        DB_RECORDS.labels('rejected').inc()
+        print(f"Error writing detection to spool: {reason}")
+
+    def insert_detection(self, camera_id, detection_time, detection_object, risk_level, content, image_url) -> bool:
+        """OracleDB와 같은 인터페이스 (SafetyDetector의 db_connection 자리에 사용)"""
+        return self.append({
+            'camera_id': camera_id,
+            'detection_time': detection_time,
+            'detection_object': detection_object,
+            'risk_level': risk_level,
+            'content': content,
+            'image_url': image_url
+        })
+
+    def _oldest(self, limit):
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id, enqueued_at, attempts, record FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stop.is_set():
+            # 실패 중에는 맨 앞 이벤트 하나만 시도 (문제가 있는 이벤트를 배치와 분리)
+            rows = self._oldest(1 if self.failing else self.batch_size)
+            self._update_gauges()
+            if not rows:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            if self._drain(rows):
+                delay = self.retry_delay
+                continue
+            # 실패 - DB가 돌아올 때까지 같은 배치를 백오프로 재시도 (새 이벤트가 와도 기다림, 종료 요청 시 중단)
+            self._backoff(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _backoff(self, delay):
+        """재시도 대기 - 대기 중에도 spool 크기/지연 지표는 주기적으로 갱신"""
+        deadline = time.monotonic() + delay
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._stop.wait(min(remaining, self.poll_interval))
+            self._update_gauges()
+
+    def _drain(self, rows) -> bool:
+        """배치를 sink로 저장하고 성공하면 spool에서 삭제"""
+        records, corrupt = [], []
+        for row in rows:
+            try:
+                records.append(json.loads(row[3], object_hook=_decode_value))
+            except Exception as e:
+                corrupt.append((row, e))
+        if corrupt:
+            # 읽을 수 없는 행(파일 손상 등)은 재시도해도 소용없으므로 바로 dead 테이블로 - 다음 루프에서 나머지를 다시 읽음
+            print(f"Skipping {len(corrupt)} undecodable detection event(s) in the spool: {corrupt[0][1]}")
+            with self.lock:
+                self._move_to_dead([row for row, _ in corrupt], f"decode error: {corrupt[0][1]}")
+                self.connection.commit()
+            return True
+        ids = [row[0] for row in rows]
+        start = time.perf_counter()
+        try:
+            self.sink(records)
+        except Exception as e:
+            kind = classify_error(e)
+            self.failing = True
+            self.last_error = str(e)
+            self.retries += 1
+            SPOOL_EVENTS.labels(self.name, 'retried').inc(len(rows))
+            print(f"Error draining detection spool ({len(rows)} events, {kind}, will retry): {e}")
+            if kind == 'permanent' and len(rows) > 1:
+                # 배치 중 어느 이벤트가 문제인지 모르므로 기다리지 않고 한 건씩 다시 시도
+                return True
+            # 단독으로 시도해도 실패하는 이벤트만 옆으로 치움 (연결 장애는 횟수와 관계없이 계속 재시도)
+            dead = len(rows) == 1 and (kind == 'permanent' or (
+                kind == 'unknown' and self.max_attempts is not None and rows[0][2] + 1 >= self.max_attempts))
+            with self.lock:
+                self.connection.executemany("UPDATE spool SET attempts = attempts + 1 WHERE id = ?",
+                                            [(i,) for i in ids])
+                if dead:
+                    self._move_to_dead(rows, str(e))
+                self.connection.commit()
+            return dead
+
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.connection.execute("DELETE FROM spool WHERE id <= ?", (ids[-1],))
+            self.connection.commit()
+            self.pending -= len(rows)
+        self._notify_space()
+        self.failing = False
+        self.drained += len(rows)
+        self.batches += 1
+        self.last_flush_latency = latency
+        self.total_flush_latency += latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.last_drained_at = datetime.now()
+        SPOOL_EVENTS.labels(self.name, 'drained').inc(len(rows))
+        return True
+
+    def _move_to_dead(self, rows, error):
+        self.connection.executemany(
+            "INSERT INTO dead (id, enqueued_at, attempts, record, error) VALUES (?, ?, ?, ?, ?)",
+            [(row_id, enqueued_at, attempts + 1, record, error) for row_id, enqueued_at, attempts, record in rows])
+        self.connection.executemany("DELETE FROM spool WHERE id = ?", [(row[0],) for row in rows])
+        self.pending -= len(rows)
+        SPOOL_EVENTS.labels(self.name, 'dead').inc(len(rows))
+        print(f"Moved {len(rows)} detection event(s) to the spool dead table: {error}")
+        self._notify_space()
+
+    def _notify_space(self):
+        with self._space:
+            self._space.notify_all()
+
+    def _update_gauges(self):
+        pending, lag = self.backlog()
+        self._pending_gauge.set(pending)
+        self._lag_gauge.set(lag)
+
+    def backlog(self) -> tuple:
+        """(아직 DB에 저장되지 않은 이벤트 수, 가장 오래된 이벤트의 대기 시간(초) = drain lag)"""
+        with self.lock:
+            pending, oldest = self.connection.execute("SELECT COUNT(*), MIN(enqueued_at) FROM spool").fetchone()
+        return pending, max(time.time() - oldest, 0.0) if oldest is not None else 0.0
+
+    def get_stats(self) -> dict:
+        pending, lag = self.backlog()
+        with self.lock:
+            dead = self.connection.execute("SELECT COUNT(*) FROM dead").fetchone()[0]
+        return {
+            'path': self.path,
+            'pending': pending,
+            'drain_lag_seconds': round(lag, 3),
+            'file_bytes': sum(os.path.getsize(path) for path in (self.path, self.path + '-wal')
+                              if os.path.exists(path)),
+            'max_pending': self.max_pending,
+            'spooled': self.spooled,
+            'drained': self.drained,
+            'batches': self.batches,
+            'retries': self.retries,
+            'rejected': self.rejected,
+            'dead': dead,
+            'failing': self.failing,
+            'last_error': self.last_error,
+            'last_drained_at': self.last_drained_at,
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 2),
+            'avg_flush_latency_ms': round(self.total_flush_latency / self.batches * 1000, 2) if self.batches else 0.0,
+            'max_flush_latency_ms': round(self.max_flush_latency * 1000, 2)
+        }
+
+    def close(self, timeout=5.0):
+        """timeout 동안 남은 이벤트 저장을 시도한 뒤 종료 (저장하지 못한 이벤트는 파일에 남아 다음 시작 시 저장)"""
+        deadline = time.monotonic() + timeout
+        while self.backlog()[0] and not self.failing and time.monotonic() < deadline:
+            self._wake.set()
+            time.sleep(0.05)
+        self._stop.set()
+        self._wake.set()
+        with _spools_lock:
+            if _spools.get(self.name) is self:
+                del _spools[self.name]
+        self.thread.join(timeout=max(deadline - time.monotonic(), 0.1))
+        if not self.thread.is_alive():
+            with self.lock:
+                self.connection.close()
+            if hasattr(self.sink, 'close'):
+                self.sink.close()